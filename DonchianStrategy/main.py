@@ -1,8 +1,11 @@
 from AlgorithmImports import *
+from HotPathTimer import HotPathTimer, timed
 
 class DonchianBTCTrend(QCAlgorithm):
 
     def Initialize(self):
+        self.hot_path_timer = HotPathTimer(("OnData", "UpdateStop", "CalculatePositionSize"))
+
         self.SetStartDate(2021, 1, 1)
         self.SetEndDate(2025, 1, 1)
         self.SetCash(100000)
@@ -36,6 +39,7 @@ class DonchianBTCTrend(QCAlgorithm):
 
         self.SetWarmUp(300)
 
+    @timed
     def OnData(self, data: Slice):
 
         if self.IsWarmingUp:
@@ -93,6 +97,7 @@ class DonchianBTCTrend(QCAlgorithm):
                 self.Liquidate(self.symbol)
                 self.stop_ticket = None
 
+    @timed
     def UpdateStop(self, new_price):
         if self.stop_ticket is None:
             return
@@ -101,8 +106,13 @@ class DonchianBTCTrend(QCAlgorithm):
         update_fields.StopPrice = round(new_price, 2)
         self.stop_ticket.Update(update_fields)
 
+    @timed
     def CalculatePositionSize(self):
         atr = self.atr.Current.Value
         risk_dollars = self.Portfolio.TotalPortfolioValue * self.risk_per_trade
         qty = risk_dollars / (atr * self.atr_stop_mult)
         return round(qty, 4)
+
+    def OnEndOfAlgorithm(self):
+        for line in self.hot_path_timer.lines():
+            self.Log(line)
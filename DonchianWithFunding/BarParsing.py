@@ -0,0 +1,164 @@
+"""
+Общий быстрый разбор строк для Reader'ов PythonData.
+
+Reader вызывается на каждую строку файла, поэтому здесь:
+- время разбирается по фиксированным позициям; дата (datetime полуночи) кэшируется
+  по строке дня, время суток — по строке "HH:MM:SS", так что на строку остается
+  один поиск в словаре и одно сложение;
+- один split на строку;
+- исключения только на невалидных строках: заголовок и пустые строки
+  отсекаются проверкой первого символа, разбор даты с int() — только при промахе кэша.
+
+Файл одинаковый в DonchianWithFunding и MyOfflineStrategy: каталог проекта Lean
+должен быть самодостаточным. Правки вносить в обе копии.
+"""
+
+from datetime import datetime, timedelta
+
+# Если объема нет или он 0, ставим искусственный объем.
+# Без этого ордера могут не исполняться!
+FALLBACK_VOLUME = 100000.0
+
+# Кэш дней ограничен: ~11 лет дневных ключей, дальше сбрасывается
+_MAX_CACHED_DAYS = 4096
+
+_day_cache = {}
+_clock_cache = {}
+
+
+def _cache_day(key: str, year: int, month: int, day: int):
+    """Промах кэша дней: datetime полуночи или None для невалидной даты"""
+    try:
+        value = datetime(year, month, day)
+    except ValueError:
+        return None
+    if len(_day_cache) >= _MAX_CACHED_DAYS:
+        _day_cache.clear()
+    _day_cache[key] = value
+    return value
+
+
+def _cache_clock(key: str, hour: int, minute: int, second: int):
+    """Промах кэша времени суток: timedelta от полуночи или None"""
+    if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60):
+        return None
+    value = timedelta(hours=hour, minutes=minute, seconds=second)
+    _clock_cache[key] = value
+    return value
+
+
+def _iso_day(key: str):
+    if not (key[:4].isdigit() and key[5:7].isdigit() and key[8:10].isdigit()):
+        return None
+    return _cache_day(key, int(key[:4]), int(key[5:7]), int(key[8:10]))
+
+
+def _iso_clock(key: str):
+    if not (key[:2].isdigit() and key[3:5].isdigit() and key[6:8].isdigit()):
+        return None
+    return _cache_clock(key, int(key[:2]), int(key[3:5]), int(key[6:8]))
+
+
+def _compact_day(key: str):
+    if not key.isdigit():
+        return None
+    return _cache_day(key, int(key[:4]), int(key[4:6]), int(key[6:8]))
+
+
+def _compact_clock(key: str):
+    if not key.isdigit():
+        return None
+    return _cache_clock(key, int(key[:2]), int(key[2:4]), int(key[4:6]))
+
+
+def parse_iso_time(text: str):
+    """
+    "YYYY-MM-DD HH:MM:SS[...]" -> datetime (суффикс вроде "+00:00" игнорируется).
+
+    Returns:
+        datetime или None
+    """
+    day_key = text[:10]
+    day = _day_cache.get(day_key)
+    if day is None:
+        day = _iso_day(day_key)
+        if day is None:
+            return None
+    clock_key = text[11:19]
+    clock = _clock_cache.get(clock_key)
+    if clock is None:
+        clock = _iso_clock(clock_key)
+        if clock is None:
+            return None
+    return day + clock
+
+
+def parse_compact_time(text: str):
+    """
+    "YYYYMMDD HHMMSS" -> datetime.
+
+    Returns:
+        datetime или None
+    """
+    day_key = text[:8]
+    day = _day_cache.get(day_key)
+    if day is None:
+        day = _compact_day(day_key)
+        if day is None:
+            return None
+    clock_key = text[9:15]
+    clock = _clock_cache.get(clock_key)
+    if clock is None:
+        clock = _compact_clock(clock_key)
+        if clock is None:
+            return None
+    return day + clock
+
+
+def parse_ohlcv_line(line: str):
+    """
+    Строка свечи "YYYY-MM-DD HH:MM:SS[+00:00],open,high,low,close[,volume]".
+
+    Returns:
+        tuple: (time, open, high, low, close, volume) или None для заголовка/невалидной строки;
+        пустой или нулевой объем заменяется на FALLBACK_VOLUME
+    """
+    if not line or not line[0].isdigit():
+        return None
+    items = line.split(",")
+    if len(items) < 5 or len(items[0]) < 19:
+        return None
+    time = parse_iso_time(items[0])
+    if time is None:
+        return None
+    try:
+        open_, high, low, close = float(items[1]), float(items[2]), float(items[3]), float(items[4])
+        volume = float(items[5]) if len(items) > 5 and items[5].strip() else 0.0
+    except ValueError:
+        return None
+    return time, open_, high, low, close, (volume if volume > 0 else FALLBACK_VOLUME)
+
+
+def parse_value_line(line: str):
+    """
+    Строка значения "YYYYMMDD HHMMSS,value" (funding rate).
+
+    Returns:
+        tuple: (time, value) или None для невалидной строки
+    """
+    if not line or not line[0].isdigit():
+        return None
+    items = line.split(",")
+    if len(items) != 2:
+        return None
+    stamp = items[0].strip()
+    if len(stamp) != 15:  # "YYYYMMDD HHMMSS" = 15 символов
+        return None
+    time = parse_compact_time(stamp)
+    if time is None:
+        return None
+    try:
+        value = float(items[1])
+    except ValueError:
+        return None
+    return time, value
@@ -1,5 +1,5 @@
 from AlgorithmImports import *
-from datetime import datetime
+from BarParsing import parse_value_line
 import os
 
 
@@ -43,45 +43,35 @@ class BinanceFundingRateData(PythonData):
         Returns:
             BinanceFundingRateData или None если строка невалидна
         """
-        # Пропускаем пустые строки
-        if not line or line.strip() == "":
+        # Пустые строки, заголовок и невалидные строки -> None
+        parsed = parse_value_line(line)
+        if parsed is None:
             return None
+        time, funding_rate = parsed
         
-        try:
-            # Разделяем строку по запятой
-            parts = line.strip().split(',')
-            if len(parts) != 2:
-                return None
-            
-            # Парсим дату и время: "YYYYMMDD HHMMSS"
-            date_str = parts[0].strip()
-            if len(date_str) != 15:  # "YYYYMMDD HHMMSS" = 15 символов
-                return None
-            
-            # Извлекаем дату и время
-            year = int(date_str[0:4])
-            month = int(date_str[4:6])
-            day = int(date_str[6:8])
-            hour = int(date_str[9:11])
-            minute = int(date_str[11:13])
-            second = int(date_str[13:15])
-            
-            # Создаем объект DateTime
-            time = datetime(year, month, day, hour, minute, second)
-            
-            # Парсим funding rate
-            funding_rate = float(parts[1].strip())
-            
-            # Создаем объект данных
-            data = BinanceFundingRateData()
-            data.Symbol = config.Symbol
-            data.Time = time
-            data.Value = funding_rate
-            data.EndTime = time  # Время окончания периода (можно настроить по необходимости)
-            
-            return data
-            
-        except (ValueError, IndexError) as e:
-            # Если не удалось распарсить строку, возвращаем None
-            return None
+        # Создаем объект данных
+        data = type(self)()
+        data.Symbol = config.Symbol
+        data.Time = time
+        data.Value = funding_rate
+        data.EndTime = time  # Время окончания периода (можно настроить по необходимости)
+        
+        return data
+
 
+class BinanceFundingRateDataMonthly(BinanceFundingRateData):
+    """
+    Funding rate, разложенный convert_data_to_lean.py по месяцам:
+    custom/lean_funding_rates/BTC/YYYYMM.zip (формат строк: YYYYMMDD HHMMSS,funding_rate).
+    Funding приходит 3 раза в сутки, поэтому месячные файлы вместо дневных.
+    """
+    
+    def GetSource(self, config, date, isLiveMode):
+        file_path = os.path.join(
+            Globals.DataFolder, "custom", "lean_funding_rates", "BTC", f"{date.strftime('%Y%m')}.zip")
+        
+        return SubscriptionDataSource(
+            file_path,
+            SubscriptionTransportMedium.LOCAL_FILE,
+            FileFormat.CSV
+        )
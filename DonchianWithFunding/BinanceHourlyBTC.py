@@ -1,5 +1,5 @@
 from AlgorithmImports import *
-from datetime import datetime
+from BarParsing import parse_ohlcv_line
 import os
 
 # --- 2. КЛАСС ДАННЫХ ---
@@ -9,29 +9,31 @@ class BinanceHourlyBTC(PythonData):
         return SubscriptionDataSource(source_path, SubscriptionTransportMedium.LocalFile)
 
     def Reader(self, config, line, date, isLiveMode):
-        if not (line.strip() and line[0].isdigit()): return None
-        data = BinanceHourlyBTC()
+        bar = parse_ohlcv_line(line)
+        if bar is None:
+            return None
+        time, open_, high, low, close, volume = bar
+        data = type(self)()
         data.Symbol = config.Symbol
-        try:
-            items = line.split(',')
-            date_str = items[0][:19] 
-            data.Time = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-            data["Open"] = float(items[1])
-            data["High"] = float(items[2])
-            data["Low"] = float(items[3])
-            data["Close"] = float(items[4])
-            data.Value = float(items[4])
+        data.Time = time
+        data["Open"] = open_
+        data["High"] = high
+        data["Low"] = low
+        data["Close"] = close
+        data.Value = close
+        # Пустой/нулевой объем заменен на FALLBACK_VOLUME (см. BarParsing)
+        data["Volume"] = volume
+        return data
 
-            # --- ХАК ДЛЯ ОБЪЕМА ---
-            # Если объема нет или он 0, ставим искусственный объем.
-            # Без этого ордера могут не исполняться!
-            vol = 0
-            if len(items) > 5 and items[5].strip():
-                vol = float(items[5])
-            
-            data["Volume"] = vol if vol > 0 else 100000.0 
 
+class BinanceHourlyBTCDaily(BinanceHourlyBTC):
+    """
+    Те же свечи, разложенные convert_data_to_lean.py по дням:
+    custom/Binance/BTCUSDT/hour/YYYYMMDD.zip (формат строк как в исходном CSV).
+    На каждую дату Lean открывает только файл этого дня.
+    """
 
-        except ValueError:
-            return None
-        return data
+    def GetSource(self, config, date, isLiveMode):
+        source_path = os.path.join(
+            Globals.DataFolder, "custom", "Binance", "BTCUSDT", "hour", f"{date.strftime('%Y%m%d')}.zip")
+        return SubscriptionDataSource(source_path, SubscriptionTransportMedium.LocalFile, FileFormat.Csv)
@@ -0,0 +1,99 @@
+"""
+Потоковая запись кривой equity прогона в компактный бинарный файл.
+
+Файл <strategy_version_run>.equity.bin:
+- заголовок (16 байт): магическое EQTY, версия формата (uint16), размер
+  записи (uint16), время первой точки (int64, секунды Unix);
+- записи по 8 байт: (uint32 — секунд от предыдущей точки, float32 — equity).
+
+Точки копятся пачкой по batch_size и дописываются в конец файла, поэтому
+в памяти держится только текущая пачка, а после каждой пачки файл целый и
+читаемый. Год часовых точек — ~70 КБ. Чтение (read_equity_log) — один
+np.frombuffer и cumsum смещений времени.
+"""
+
+from array import array
+from datetime import datetime
+import os
+import struct
+
+import numpy as np
+
+FILE_SUFFIX = ".equity.bin"
+MAGIC = b"EQTY"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHq")
+RECORD_DTYPE = np.dtype([("delta", "<u4"), ("equity", "<f4")])
+DEFAULT_BATCH_SIZE = 1024
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def equity_log_path(export_path: str, strategy_version_run: str) -> str:
+    return os.path.join(export_path, strategy_version_run + FILE_SUFFIX)
+
+
+class EquitySink:
+    """Точки (время, equity) -> файл прогона; время точек не убывает"""
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.deltas = array("I")
+        self.values = array("f")
+        self.count = 0
+        self._last_seconds = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Перезапуск прогона не должен дописывать к старой кривой
+        if os.path.exists(path):
+            os.remove(path)
+
+    def add(self, time: datetime, equity: float):
+        seconds = int((time - _EPOCH).total_seconds())
+        if self._last_seconds is None:
+            with open(self.path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD_DTYPE.itemsize, seconds))
+            self._last_seconds = seconds
+        self.deltas.append(seconds - self._last_seconds)
+        self.values.append(equity)
+        self._last_seconds = seconds
+        self.count += 1
+        if len(self.deltas) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.deltas:
+            return
+        records = np.empty(len(self.deltas), dtype=RECORD_DTYPE)
+        records["delta"] = self.deltas
+        records["equity"] = self.values
+        with open(self.path, "ab") as f:
+            f.write(records.tobytes())
+        self.deltas = array("I")
+        self.values = array("f")
+
+    def close(self):
+        self.flush()
+
+    @property
+    def location(self) -> str:
+        return self.path
+
+
+def read_equity_log(path: str) -> tuple:
+    """
+    Returns:
+        tuple: (время точек datetime64[s], equity float32)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        return np.array([], dtype="datetime64[s]"), np.array([], dtype=np.float32)
+    magic, version, record_size, start = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path}: неизвестный формат кривой equity")
+    # Недописанная последняя запись (прерванный прогон) отбрасывается
+    n = (len(data) - HEADER.size) // record_size
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=n, offset=HEADER.size)
+    seconds = start + np.cumsum(records["delta"], dtype=np.int64)
+    return seconds.astype("datetime64[s]"), records["equity"].copy()
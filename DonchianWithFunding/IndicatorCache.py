@@ -0,0 +1,118 @@
+"""
+Индикаторы из общего кэша (optim/indicator_cache.py) вместо живых.
+
+Массивы открываются через np.load(mmap_mode="r"): параллельные прогоны делят
+одну копию из page cache. Адаптеры повторяют ту часть API индикаторов Lean,
+которой пользуется стратегия: Current.Value, Previous.Value, IsReady,
+UpperBand / LowerBand у Donchian.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class _Point:
+    __slots__ = ("Value",)
+
+    def __init__(self, value):
+        self.Value = value
+
+
+class CachedIndicator:
+    """Ряд значений по барам кэша; текущая позиция — у IndicatorCache"""
+
+    def __init__(self, cache, values, ready_index):
+        self._cache = cache
+        self._values = values
+        self._ready = ready_index
+
+    @property
+    def IsReady(self) -> bool:
+        return self._cache.index >= self._ready
+
+    @property
+    def Current(self) -> _Point:
+        return _Point(float(self._values[self._cache.index]))
+
+    @property
+    def Previous(self) -> _Point:
+        return _Point(float(self._values[self._cache.index - 1]))
+
+
+class _ShiftedIndicator(CachedIndicator):
+    """Ряд, где уже лежит Previous (в кэше есть только UpperBand.Previous Donchian)"""
+
+    @property
+    def Current(self) -> _Point:
+        raise NotImplementedError("в кэше индикаторов есть только UpperBand.Previous")
+
+    @property
+    def Previous(self) -> _Point:
+        return _Point(float(self._values[self._cache.index]))
+
+
+class CachedDonchian:
+    def __init__(self, cache, upper_prev, lower, period):
+        self.UpperBand = _ShiftedIndicator(cache, upper_prev, period - 1)
+        self.LowerBand = CachedIndicator(cache, lower, period - 1)
+        self._cache = cache
+        self._ready = period - 1
+
+    @property
+    def IsReady(self) -> bool:
+        return self._cache.index >= self._ready
+
+
+class IndicatorCache:
+    """
+    Папка кэша индикаторов для одного периода бэктеста.
+
+    advance(time) на каждом баре сдвигает позицию; бары, которых нет в кэше,
+    делают все индикаторы неготовыми (index = -1).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.times = self._load("times")
+        self.index = -1
+        self._cursor = 0
+
+    def _load(self, name: str):
+        return np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+
+    def matches(self, start_date: datetime, warmup_bars: int, dc_lengths, atr_periods, ema_periods) -> bool:
+        """Кэш посчитан для этого периода и содержит все нужные длины"""
+        meta = self.meta
+        return (
+            meta.get("start_date") == start_date.strftime("%Y-%m-%d")
+            and meta.get("warmup_bars") == warmup_bars
+            and set(dc_lengths) <= set(meta.get("dc_lengths", []))
+            and {str(p) for p in atr_periods} <= set(meta.get("atr_ready", {}))
+            and {str(p) for p in ema_periods} <= set(meta.get("ema_ready", {}))
+        )
+
+    def advance(self, time: datetime):
+        seconds = int((time - EPOCH).total_seconds())
+        times = self.times
+        cursor = self._cursor
+        # Бары идут по возрастанию: позиция только растет
+        while cursor < len(times) and times[cursor] < seconds:
+            cursor += 1
+        self._cursor = cursor
+        self.index = cursor if cursor < len(times) and times[cursor] == seconds else -1
+
+    def ema(self, period: int) -> CachedIndicator:
+        return CachedIndicator(self, self._load(f"ema{period}"), self.meta["ema_ready"][str(period)])
+
+    def atr(self, period: int) -> CachedIndicator:
+        return CachedIndicator(self, self._load(f"atr_{period}"), self.meta["atr_ready"][str(period)])
+
+    def donchian(self, period: int) -> CachedDonchian:
+        return CachedDonchian(self, self._load(f"dc_upper_prev_{period}"), self._load(f"dc_lower_{period}"), period)
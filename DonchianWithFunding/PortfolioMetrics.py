@@ -0,0 +1,105 @@
+"""
+Метрики портфеля по дневному equity и сделкам — в формате строки метрик прогона.
+
+Общий код для optim/fast_backtest.py и режима нескольких конфигураций
+(VirtualStrategy): у виртуальных под-стратегий нет статистики Lean, и их
+метрики считаются так же, как у быстрого бэктестера.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from ScoringStrategy import ScoringStrategy
+
+
+def compute_metrics(params_list, trades, daily_equity, initial_cash, start, end):
+    """
+    Метрики в формате строки run_metrics и score по ScoringStrategy.
+
+    Args:
+        params_list: параметры конфигураций (попадают в строки как есть)
+        trades: сделки с колонкой config (номер в params_list)
+        daily_equity: матрица дневного equity (дни x конфигурации), первая строка — старт
+        initial_cash: стартовый капитал
+        start, end: период (для CAGR)
+
+    Returns:
+        pd.DataFrame: строка на конфигурацию
+    """
+    n = len(params_list)
+    end_equity = daily_equity[-1]
+
+    # --- портфель по дневному equity ---
+    peaks = np.maximum.accumulate(daily_equity, axis=0)
+    max_dd = np.max(1.0 - daily_equity / peaks, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        daily_ret = daily_equity[1:] / daily_equity[:-1] - 1.0
+        ret_std = daily_ret.std(axis=0, ddof=1) if len(daily_ret) > 1 else np.zeros(n)
+        sharpe = np.where(ret_std > 0, daily_ret.mean(axis=0) / ret_std * np.sqrt(365), 0.0)
+        downside = np.sqrt(np.mean(np.minimum(daily_ret, 0.0) ** 2, axis=0)) if len(daily_ret) else np.zeros(n)
+        sortino = np.where(downside > 0, daily_ret.mean(axis=0) / downside * np.sqrt(365), 0.0)
+    years = (end - start).days / 365.0
+    cagr = (end_equity / initial_cash) ** (1.0 / years) - 1.0
+    calmar = np.where(max_dd > 0, cagr / np.where(max_dd > 0, max_dd, 1.0), 0.0)
+
+    # --- статистика сделок ---
+    stats = pd.DataFrame(index=pd.RangeIndex(n))
+    if len(trades):
+        t = trades.assign(
+            win=trades["pnl"] > 0,
+            gross_win=trades["pnl"].clip(lower=0),
+            gross_loss=-trades["pnl"].clip(upper=0),
+            ret=trades["pnl"] / (trades["entry_price"] * trades["quantity"]),
+        )
+        g = t.groupby("config")
+        stats["total_trades"] = g.size()
+        stats["win_rate"] = g["win"].mean()
+        stats["gross_win"] = g["gross_win"].sum()
+        stats["gross_loss"] = g["gross_loss"].sum()
+        stats["avg_R"] = g["R"].mean()
+        stats["median_R"] = g["R"].median()
+        stats["average_win_rate"] = t[t["win"]].groupby("config")["ret"].mean()
+        stats["average_loss_rate"] = t[~t["win"]].groupby("config")["ret"].mean()
+        stats["average_trade_hours"] = g["holding_hours"].mean()
+    stats = stats.reindex(columns=[
+        "total_trades", "win_rate", "gross_win", "gross_loss", "avg_R", "median_R",
+        "average_win_rate", "average_loss_rate", "average_trade_hours"
+    ]).fillna(0.0)
+
+    profit_factor = np.where(
+        stats["gross_loss"] > 0, stats["gross_win"] / stats["gross_loss"].replace(0, 1.0), 0.0
+    )
+    loss_rate = np.where(stats["total_trades"] > 0, 1.0 - stats["win_rate"], 0.0)
+    pl_ratio = np.where(
+        stats["average_loss_rate"] < 0,
+        stats["average_win_rate"] / stats["average_loss_rate"].abs().replace(0, 1.0), 0.0
+    )
+    expectancy = stats["win_rate"] * pl_ratio - loss_rate
+
+    rows = []
+    for i in range(n):
+        row = {k: v for k, v in params_list[i].items()}
+        row.update({
+            "sharpe": float(sharpe[i]),
+            "sortino": float(sortino[i]),
+            "calmar": float(calmar[i]),
+            "expectancy": float(expectancy[i]),
+            "cagr": float(cagr[i]),
+            "win_rate": float(stats["win_rate"].iat[i]),
+            "average_win_rate": float(stats["average_win_rate"].iat[i]),
+            "average_loss_rate": float(stats["average_loss_rate"].iat[i]),
+            "max_drawdown_pct": float(max_dd[i]),
+            "end_equity": float(end_equity[i]),
+            "start_equity": float(initial_cash),
+            "total_trades": int(stats["total_trades"].iat[i]),
+            # Колонка и тип — как average_trade_duration Lean (TimeSpan)
+            "average_trade_duration": timedelta(hours=float(stats["average_trade_hours"].iat[i])),
+            "profit_factor": float(profit_factor[i]),
+            "avg_R": float(stats["avg_R"].iat[i]),
+            "median_R": float(stats["median_R"].iat[i]),
+        })
+        row["score"] = ScoringStrategy.score_strategy(row)
+        rows.append(row)
+    return pd.DataFrame(rows)
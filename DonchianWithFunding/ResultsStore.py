@@ -0,0 +1,168 @@
+import json
+import sqlite3
+from datetime import datetime, timezone
+
+
+class ResultsStore:
+    """
+    Хранилище строк метрик прогонов в SQLite (WAL) вместо run_metrics.csv.
+
+    - Строка прогона вставляется одной транзакцией BEGIN IMMEDIATE: параллельные
+      прогоны ждут друг друга (busy timeout), а не перемешивают записи.
+    - Новые параметры и метрики добавляются колонками (ALTER TABLE) в той же
+      транзакции — строки с разным набором параметров не съезжают.
+    - Индексы: score, strategy_version_run, набор параметров (params_json)
+      и каждая колонка параметра.
+    - Повторная запись того же run_id заменяет строку.
+
+    Файл не используется из нескольких контейнеров через сетевые/Docker Desktop
+    монтирования (WAL требует общей памяти) — оптимизатор пишет общий файл
+    только с хоста.
+    """
+
+    FILENAME = "results.db"
+    TABLE = "runs"
+
+    # Служебные колонки, которых нет в строке метрик
+    INTERNAL_COLUMNS = ("recorded_at", "params_json")
+
+    def __init__(self, path: str, timeout: float = 60.0):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+        self._create_schema()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    # ===== SCHEMA =====
+
+    def _create_schema(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    run_id TEXT PRIMARY KEY,
+                    strategy_version_run TEXT,
+                    score REAL,
+                    recorded_at TEXT,
+                    params_json TEXT
+                )""")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS param_columns (name TEXT PRIMARY KEY)")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_runs_score ON {self.TABLE}(score DESC)")
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_runs_version ON {self.TABLE}(strategy_version_run)")
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_runs_params ON {self.TABLE}(params_json)")
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def columns(self) -> list:
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info({self.TABLE})")]
+
+    def param_columns(self) -> list:
+        return [row[0] for row in self.conn.execute("SELECT name FROM param_columns ORDER BY name")]
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"' + str(name).replace('"', '""') + '"'
+
+    @staticmethod
+    def _to_sql(value):
+        """Значения Lean (decimal, TimeSpan ...) -> типы sqlite"""
+        if value is None or isinstance(value, (int, float, str)):
+            return value
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return str(value)
+
+    # ===== WRITE =====
+
+    def insert(self, row: dict, param_names=()) -> None:
+        """
+        Атомарно записывает строку метрик прогона.
+
+        Args:
+            row: строка метрик (должна содержать run_id)
+            param_names: какие ключи row — параметры запуска (для индексов и params_json)
+        """
+        param_names = [name for name in param_names if name in row]
+        values = {name: self._to_sql(value) for name, value in row.items()}
+        values["recorded_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        values["params_json"] = json.dumps({name: row[name] for name in param_names},
+                                           sort_keys=True, default=str)
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = set(self.columns())
+            for name in values:
+                if name not in existing:
+                    # NUMERIC: числа из GetParameter ("20") хранятся как числа
+                    self.conn.execute(f"ALTER TABLE {self.TABLE} ADD COLUMN {self._quote(name)} NUMERIC")
+
+            known_params = set(self.param_columns())
+            for name in param_names:
+                if name not in known_params:
+                    self.conn.execute("INSERT INTO param_columns (name) VALUES (?)", (name,))
+                    self.conn.execute(
+                        f"CREATE INDEX IF NOT EXISTS {self._quote('idx_runs_param_' + name)} "
+                        f"ON {self.TABLE}({self._quote(name)})")
+
+            names = list(values)
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} ({', '.join(self._quote(n) for n in names)}) "
+                f"VALUES ({', '.join('?' for _ in names)})",
+                [values[n] for n in names])
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    # ===== READ =====
+
+    def query(self, where: str = "", args=(), order_by: str = "", limit: int = None,
+              columns=None) -> tuple:
+        """
+        Выборка строк.
+
+        Args:
+            where: условие SQL без WHERE (значения — через ? и args)
+            order_by: выражение ORDER BY без ключевого слова
+            limit: максимум строк
+            columns: какие колонки вернуть (по умолчанию — все, кроме служебных)
+
+        Returns:
+            tuple: (имена колонок, список строк)
+        """
+        if columns is None:
+            columns = [c for c in self.columns() if c not in self.INTERNAL_COLUMNS]
+        sql = f"SELECT {', '.join(self._quote(c) for c in columns)} FROM {self.TABLE}"
+        if where:
+            sql += f" WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return list(columns), self.conn.execute(sql, tuple(args)).fetchall()
+
+    def rows(self) -> list:
+        """Все строки как (dict строки, список параметров) — для переноса в другое хранилище"""
+        params = self.param_columns()
+        columns, rows = self.query()
+        result = []
+        for values in rows:
+            row = {c: v for c, v in zip(columns, values) if v is not None}
+            result.append((row, [p for p in params if p in row]))
+        return result
@@ -0,0 +1,218 @@
+"""
+Инкрементальные скользящие статистики с O(1) (percentile — O(log n) поиск)
+стоимостью на обновление, независимо от длины окна.
+
+Все индикаторы — PythonIndicator: их можно регистрировать через
+RegisterIndicator(symbol, indicator, resolution) или обновлять вручную Add(value).
+Из Python состояние читается через атрибуты (Mean, StdDev, Min, Max, Samples ...),
+а не через Current: Current обновляется только при вызове Update со стороны Lean.
+"""
+
+from AlgorithmImports import *
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+import math
+
+
+class RollingZScore(PythonIndicator):
+    """
+    Скользящие среднее и дисперсия (Welford с вычитанием выпадающего значения)
+    и z-score последнего значения по окну.
+
+    Value = (последнее - Mean) / StdDev, 0 при нулевом разбросе.
+    Дисперсия — по генеральной совокупности (деление на число точек в окне).
+    """
+
+    def __init__(self, name, period):
+        super().__init__()
+        self.Name = name
+        self.WarmUpPeriod = period
+        self.Value = 0.0
+        self.period = period
+        self.window = deque()
+        self.Mean = 0.0
+        self._m2 = 0.0
+        # Сброс накопленной ошибки округления: раз в period вытеснений M2 пересчитывается
+        self._evictions = 0
+
+    @property
+    def Samples(self) -> int:
+        return len(self.window)
+
+    @property
+    def IsFull(self) -> bool:
+        return len(self.window) >= self.period
+
+    @property
+    def Variance(self) -> float:
+        n = len(self.window)
+        return self._m2 / n if n else 0.0
+
+    @property
+    def StdDev(self) -> float:
+        return math.sqrt(self.Variance)
+
+    def Update(self, input) -> bool:
+        self.Add(input.Value)
+        return self.IsFull
+
+    def Add(self, value: float) -> None:
+        value = float(value)
+        window = self.window
+        if len(window) == self.period:
+            old = window.popleft()
+            window.append(value)
+            old_mean = self.Mean
+            self.Mean = old_mean + (value - old) / self.period
+            self._m2 += (value - old) * (value - self.Mean + old - old_mean)
+            self._evictions += 1
+            if self._evictions >= self.period:
+                self._resync()
+        else:
+            window.append(value)
+            delta = value - self.Mean
+            self.Mean += delta / len(window)
+            self._m2 += delta * (value - self.Mean)
+        if self._m2 < 0.0:
+            self._m2 = 0.0
+
+        std = self.StdDev
+        self.Value = (value - self.Mean) / std if std > 0.0 else 0.0
+
+    def ZScore(self, value: float) -> float:
+        """z-score произвольного значения относительно текущего окна"""
+        std = self.StdDev
+        return (value - self.Mean) / std if std > 0.0 else 0.0
+
+    def _resync(self):
+        n = len(self.window)
+        self.Mean = math.fsum(self.window) / n
+        self._m2 = math.fsum((x - self.Mean) ** 2 for x in self.window)
+        self._evictions = 0
+
+    def Reset(self):
+        self.window.clear()
+        self.Mean = 0.0
+        self._m2 = 0.0
+        self._evictions = 0
+        self.Value = 0.0
+
+
+class RollingPercentileRank(PythonIndicator):
+    """
+    Процентильный ранг последнего значения в скользящем окне: доля значений окна,
+    которые меньше него (равные считаются наполовину), от 0 до 1.
+
+    Окно хранится отсортированным: поиск — bisect, вставка/удаление — сдвиг
+    массива в C, поэтому на обновление нет пересортировки окна.
+    """
+
+    def __init__(self, name, period):
+        super().__init__()
+        self.Name = name
+        self.WarmUpPeriod = period
+        self.Value = 0.0
+        self.period = period
+        self.window = deque()
+        self.sorted_values = []
+
+    @property
+    def Samples(self) -> int:
+        return len(self.window)
+
+    @property
+    def IsFull(self) -> bool:
+        return len(self.window) >= self.period
+
+    def Update(self, input) -> bool:
+        self.Add(input.Value)
+        return self.IsFull
+
+    def Add(self, value: float) -> None:
+        value = float(value)
+        if len(self.window) == self.period:
+            old = self.window.popleft()
+            del self.sorted_values[bisect_left(self.sorted_values, old)]
+        self.window.append(value)
+        insort(self.sorted_values, value)
+        self.Value = self.Rank(value)
+
+    def Rank(self, value: float) -> float:
+        """Процентильный ранг произвольного значения относительно текущего окна"""
+        n = len(self.sorted_values)
+        if not n:
+            return 0.0
+        below = bisect_left(self.sorted_values, value)
+        equal = bisect_right(self.sorted_values, value) - below
+        return (below + 0.5 * equal) / n
+
+    def Reset(self):
+        self.window.clear()
+        self.sorted_values.clear()
+        self.Value = 0.0
+
+
+class RollingMinMax(PythonIndicator):
+    """
+    Скользящие минимум и максимум на монотонных очередях (амортизированно O(1)).
+
+    Value — положение последнего значения в диапазоне окна: 0 = Min, 1 = Max
+    (0.5 при нулевом диапазоне).
+    """
+
+    def __init__(self, name, period):
+        super().__init__()
+        self.Name = name
+        self.WarmUpPeriod = period
+        self.Value = 0.0
+        self.period = period
+        self.Min = 0.0
+        self.Max = 0.0
+        self._count = 0
+        # (номер значения, значение): минимумы по возрастанию, максимумы по убыванию
+        self._mins = deque()
+        self._maxs = deque()
+
+    @property
+    def Samples(self) -> int:
+        return min(self._count, self.period)
+
+    @property
+    def IsFull(self) -> bool:
+        return self._count >= self.period
+
+    def Update(self, input) -> bool:
+        self.Add(input.Value)
+        return self.IsFull
+
+    def Add(self, value: float) -> None:
+        value = float(value)
+        index = self._count
+        self._count += 1
+
+        mins, maxs = self._mins, self._maxs
+        while mins and mins[-1][1] >= value:
+            mins.pop()
+        mins.append((index, value))
+        while maxs and maxs[-1][1] <= value:
+            maxs.pop()
+        maxs.append((index, value))
+
+        expired = index - self.period
+        if mins[0][0] <= expired:
+            mins.popleft()
+        if maxs[0][0] <= expired:
+            maxs.popleft()
+
+        self.Min = mins[0][1]
+        self.Max = maxs[0][1]
+        width = self.Max - self.Min
+        self.Value = (value - self.Min) / width if width > 0.0 else 0.5
+
+    def Reset(self):
+        self._mins.clear()
+        self._maxs.clear()
+        self._count = 0
+        self.Min = 0.0
+        self.Max = 0.0
+        self.Value = 0.0
@@ -4,17 +4,35 @@ import os
 
 
 class TradeLogger:
-    """Класс для логирования сделок и экспорта в CSV"""
+    """
+    Класс для логирования сделок и экспорта в CSV.
+
+    С sink (TradeSink.ColumnarTradeSink) сделки не копятся в памяти,
+    а пачками уходят в колоночный лог прогона.
+    """
     
-    def __init__(self, export_path=None):
+    def __init__(self, export_path=None, sink=None):
         self.trade_logs = []
         self.export_path = export_path or "/Lean/Data/exports"
+        self.sink = sink
     
     def log_trade(self, trade_context):
         """Логирует завершенную сделку"""
         if trade_context is None:
             return
-        self.trade_logs.append(trade_context.to_dict())
+        if self.sink is not None:
+            self.sink.add(trade_context.to_dict())
+        else:
+            self.trade_logs.append(trade_context.to_dict())
+    
+    def finish(self, debug_callback=None):
+        """Дописывает последнюю пачку в sink или, без sink, экспортирует CSV"""
+        if self.sink is None:
+            self.export_to_csv(debug_callback=debug_callback)
+            return
+        self.sink.close()
+        if debug_callback:
+            debug_callback(f"Exported {self.sink.count} trades to {self.sink.location}")
     
     def export_to_csv(self, filename="trade_log.csv", debug_callback=None):
         """Экспортирует все логированные сделки в CSV файл"""
@@ -0,0 +1,171 @@
+"""
+Потоковая колоночная запись сделок.
+
+Закрытые сделки копятся пачкой по batch_size штук; пачка превращается в колонки
+numpy и сжатой записывается как часть (part-00000, part-00001 ...). В памяти
+держится только текущая пачка, поэтому длинный бэктест не растит память.
+
+Форматы:
+- файл <strategy_version_run>.trades.zip: для каждой части записи
+  part-NNNNN/<колонка>.npy (deflate); дописывается после каждой пачки;
+- ObjectStore Lean: ключи trade_logs/<strategy_version_run>/part-NNNNN.npz
+  (np.savez_compressed), локально — такие же файлы в папке storage.
+
+Чтение (read_trade_log) не разбирает текст: колонки частей склеиваются np.concatenate.
+"""
+
+import io
+import os
+import zipfile
+from datetime import datetime
+
+import numpy as np
+
+FILE_SUFFIX = ".trades.zip"
+OBJECT_STORE_PREFIX = "trade_logs"
+PART_FORMAT = "part-{:05d}"
+DEFAULT_BATCH_SIZE = 500
+
+
+def encode_columns(records: list) -> dict:
+    """
+    Список dict сделок -> {колонка: np.ndarray}.
+
+    Тип колонки — по первому непустому значению: datetime -> datetime64[us],
+    bool/int -> int64 (float64, если есть пропуски), float -> float64, прочее -> str.
+    """
+    names = []
+    for record in records:
+        for name in record:
+            if name not in names:
+                names.append(name)
+
+    columns = {}
+    for name in names:
+        values = [record.get(name) for record in records]
+        sample = next((v for v in values if v is not None), None)
+        if isinstance(sample, datetime):
+            columns[name] = np.array(values, dtype="datetime64[us]")
+        elif isinstance(sample, (bool, int, np.integer)) and None not in values:
+            columns[name] = np.array(values, dtype=np.int64)
+        elif isinstance(sample, str) or sample is None:
+            columns[name] = np.array(["" if v is None else v for v in values], dtype=str)
+        else:
+            try:
+                columns[name] = np.array([np.nan if v is None else float(v) for v in values])
+            except (TypeError, ValueError):
+                columns[name] = np.array(["" if v is None else str(v) for v in values], dtype=str)
+    return columns
+
+
+def _npy_bytes(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+class ColumnarTradeSink:
+    """Пачки сделок -> колоночные части; запись части — в наследниках"""
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.batch = []
+        self.parts = 0
+        self.count = 0
+
+    def add(self, record: dict):
+        self.batch.append(record)
+        self.count += 1
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.batch:
+            return
+        self._write_part(PART_FORMAT.format(self.parts), encode_columns(self.batch))
+        self.parts += 1
+        self.batch = []
+
+    def close(self):
+        self.flush()
+
+    def _write_part(self, part: str, columns: dict):
+        raise NotImplementedError
+
+    @property
+    def location(self) -> str:
+        raise NotImplementedError
+
+
+class FileTradeSink(ColumnarTradeSink):
+    """Части в одном zip-файле прогона; после каждой пачки файл целый и читаемый"""
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Перезапуск прогона не должен дописывать к старым сделкам
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _write_part(self, part: str, columns: dict):
+        with zipfile.ZipFile(self.path, "a", compression=zipfile.ZIP_DEFLATED) as zf:
+            for name, array in columns.items():
+                zf.writestr(f"{part}/{name}.npy", _npy_bytes(array))
+
+    @property
+    def location(self) -> str:
+        return self.path
+
+
+class ObjectStoreTradeSink(ColumnarTradeSink):
+    """Части в ObjectStore Lean: по ключу на пачку"""
+
+    def __init__(self, object_store, strategy_version_run: str, batch_size: int = DEFAULT_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.object_store = object_store
+        self.prefix = f"{OBJECT_STORE_PREFIX}/{strategy_version_run}"
+
+    def _write_part(self, part: str, columns: dict):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **columns)
+        self.object_store.SaveBytes(f"{self.prefix}/{part}.npz", bytearray(buffer.getvalue()))
+
+    @property
+    def location(self) -> str:
+        return f"ObjectStore:{self.prefix}"
+
+
+def trade_log_path(export_path: str, strategy_version_run: str) -> str:
+    return os.path.join(export_path, strategy_version_run + FILE_SUFFIX)
+
+
+def read_trade_log(path: str) -> dict:
+    """
+    Читает сделки прогона: zip-файл FileTradeSink или папку с part-*.npz
+    (ObjectStore, выгруженный локально).
+
+    Returns:
+        dict: {колонка: np.ndarray} по всем частям в порядке записи
+    """
+    parts = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.startswith("part-") and name.endswith(".npz"):
+                with np.load(os.path.join(path, name), allow_pickle=False) as npz:
+                    parts.append({key: npz[key] for key in npz.files})
+    else:
+        with zipfile.ZipFile(path) as zf:
+            grouped = {}
+            for entry in zf.namelist():
+                part, _, filename = entry.partition("/")
+                with zf.open(entry) as f:
+                    grouped.setdefault(part, {})[filename[:-len(".npy")]] = np.load(
+                        io.BytesIO(f.read()), allow_pickle=False)
+            parts = [grouped[part] for part in sorted(grouped)]
+
+    if not parts:
+        return {}
+    # Колонки, которые есть во всех частях, — чтобы строки не съехали
+    names = [name for name in parts[0] if all(name in columns for columns in parts)]
+    return {name: np.concatenate([columns[name] for columns in parts]) for name in names}
@@ -0,0 +1,195 @@
+"""
+Виртуальная под-стратегия для режима нескольких конфигураций (параметр configs).
+
+Один экземпляр DonchianBTCWithFunding ведет список конфигураций за один проход
+по данным: бары, funding и индикаторы общие (индикатор каждой длины создается
+один раз), а позиция, стоп, кэш и лог сделок — свои у каждой конфигурации.
+Ордера Lean не выставляются: исполнение моделируется так же, как в
+optim/fast_backtest.py, сделки которого совпадают с Lean (fast_parity.py):
+
+- стоп срабатывает, если low бара ниже цены стопа, по min(стоп, close);
+- вход и выходы по рынку — по close бара;
+- комиссия FEE_PERCENT от close бара (как PercentageFeeModel от Security.Price).
+
+Метрики портфеля считаются по дневному equity (PortfolioMetrics), а не
+статистикой Lean, поэтому sharpe/drawdown близки к обычному прогону, но не равны.
+"""
+
+import os
+
+from ResultsStore import ResultsStore
+from RollingIndicators import RollingZScore
+from TradeContext import TradeContext
+from TradeLogger import TradeLogger
+
+EXIT_STOP = "StopMarket"
+EXIT_MARKET = "Market"
+EXIT_SOFT = "SoftExit_EMA"
+
+
+class VirtualStrategy:
+
+    def __init__(self, algorithm, params: dict, raw_params: dict, export_path: str):
+        """
+        Args:
+            algorithm: DonchianBTCWithFunding, владелец общих данных и индикаторов
+            params: типизированные параметры (read_strategy_parameters)
+            raw_params: параметры строками, как их отдал бы GetParameter
+            export_path: папка results.db и лога сделок конфигурации
+        """
+        self.algorithm = algorithm
+        self.params = params
+        self.raw_params = raw_params
+        self.export_path = export_path
+        self.strategy_version_run = algorithm.make_strategy_version_run(raw_params)
+
+        self.dc_entry = algorithm._donchian(params["dc_entry_len"])
+        self.dc_exit = algorithm._donchian(params["dc_exit_len"])
+        self.atr = algorithm._atr(params["atr_period"])
+        self.funding_stats = algorithm._funding_stats(params["funding_window_len"])
+        self.atr_stats = RollingZScore("atr_stats", 50)
+        self.position_manager = algorithm.create_position_manager(params)
+
+        self.trade_logger = TradeLogger(
+            export_path=export_path,
+            sink=algorithm._create_trade_sink(self.strategy_version_run, export_path))
+
+        # ===== SHADOW PORTFOLIO =====
+        self.cash = float(algorithm.INITIAL_CASH)
+        self.quantity = 0.0
+        self.stop_price = None
+        self.trade_context = None
+
+        self.run_r = []
+        self.trades = []
+        self.daily_equity = [self.cash]
+
+    @property
+    def invested(self) -> bool:
+        return self.quantity != 0
+
+    def equity(self, price: float) -> float:
+        return self.cash + self.quantity * price
+
+    def on_bar(self, bar):
+        """Один бар BTC после прогрева: стоп, затем логика OnData"""
+        if self.invested and bar.Low < self.stop_price:
+            self._close(min(self.stop_price, bar.Close), bar.Close, EXIT_STOP)
+
+        if not self._ready():
+            return
+
+        # _check_volatility_filter
+        atr_value = self.atr.Current.Value
+        self.atr_stats.Add(atr_value)
+        if not self.atr_stats.IsFull or not atr_value > self.atr_stats.Mean:
+            return
+
+        if not self.invested:
+            self._try_long_entry(bar)
+            return
+
+        self._manage_position(bar.Close)
+
+    def _ready(self) -> bool:
+        algorithm = self.algorithm
+        return (
+            algorithm.last_funding_rate is not None
+            and self.dc_entry.IsReady and self.dc_exit.IsReady
+            and algorithm.ema200.IsReady and algorithm.ema50.IsReady
+            and self.atr.IsReady
+        )
+
+    def _try_long_entry(self, bar):
+        algorithm = self.algorithm
+        price = bar.Close
+        z = algorithm.FundingZScore(self.funding_stats)
+        atr_value = self.atr.Current.Value
+
+        breakout = self.dc_entry.UpperBand.IsReady and bar.High > self.dc_entry.UpperBand.Previous.Value
+        trend_ok = price > algorithm.ema200.Current.Value
+        volatility_ok = atr_value > 1.2 * self.atr_stats.Mean if z > 1.0 else True
+        if not (breakout and trend_ok and volatility_ok):
+            return
+
+        # Позиции нет — стоимость портфеля равна кэшу
+        qty = self.position_manager.calculate_position_size(
+            atr_value=atr_value,
+            portfolio_value=self.cash,
+            price=price,
+            funding_z=z,
+            base_risk_per_trade=algorithm.base_risk_per_trade,
+            min_risk_per_trade=algorithm.min_risk_per_trade,
+            max_risk_per_trade=algorithm.max_risk_per_trade
+        )
+        if qty <= 0:
+            return
+
+        stop_multiplier = self.position_manager.get_atr_stop_multiplier(z)
+        self.trade_context = TradeContext(
+            entry_time=algorithm.Time,
+            entry_price=price,
+            quantity=qty,
+            funding_z=z,
+            atr_at_entry=atr_value,
+            stop_multiplier=stop_multiplier,
+            risk_multiplier=self.position_manager.get_risk_multiplier(z),
+            initial_stop=price - stop_multiplier * atr_value,
+            features=algorithm._calculate_entry_features(price, z, atr_value, self.atr_stats.Mean)
+        )
+        self.quantity = qty
+        self.cash -= qty * price + price * qty * algorithm.FEE_PERCENT
+        self.stop_price = round(self.trade_context.initial_stop, algorithm.BTC_PRICE_ROUND)
+
+    def _manage_position(self, close_price: float):
+        tc = self.trade_context
+        params = self.params
+        tc.max_price = max(tc.max_price, close_price)
+        r = (close_price - tc.entry_price) / (tc.atr_at_entry * tc.stop_multiplier)
+
+        # 1. Donchian hard exit
+        if self.dc_exit.IsReady and close_price < self.dc_exit.LowerBand.Current.Value:
+            self._close(close_price, close_price, EXIT_MARKET)
+            return
+
+        # 2. Breakeven stop
+        if r > params["breakeven_r"] and tc.max_price > tc.entry_price + params["breakeven_atr_frac"] * tc.atr_at_entry:
+            tc.current_stop = tc.entry_price
+            self._update_stop(tc.current_stop)
+
+        # 3. ATR trailing stop (только улучшаем)
+        if r > params["trail_start_r"]:
+            trail = tc.max_price - tc.stop_multiplier * self.atr.Current.Value
+            if trail > tc.current_stop:
+                tc.current_stop = trail
+                self._update_stop(tc.current_stop)
+
+        # 4. Soft EMA exit
+        if r > params["soft_exit_r"] and close_price < self.algorithm.ema50.Current.Value:
+            self._close(close_price, close_price, EXIT_SOFT)
+
+    def _update_stop(self, price: float):
+        self.stop_price = round(price, self.algorithm.BTC_PRICE_ROUND)
+
+    def _close(self, fill_price: float, close_price: float, reason: str):
+        tc = self.trade_context
+        qty = self.quantity
+        self.cash += qty * fill_price - close_price * qty * self.algorithm.FEE_PERCENT
+        self.quantity = 0.0
+        self.stop_price = None
+        self.trade_context = None
+
+        tc.close(self.algorithm.Time, fill_price, reason)
+        self.trade_logger.log_trade(tc)
+        self.run_r.append(tc.r_multiple)
+        self.trades.append((tc.pnl, tc.entry_price, tc.quantity, tc.r_multiple, tc.holding_hours))
+
+    def record_equity(self, price: float):
+        """Equity на конец дня (последний бар дня)"""
+        self.daily_equity.append(self.equity(price))
+
+    def save(self, row: dict, debug_callback=None):
+        """Дописывает лог сделок и пишет строку метрик в results.db конфигурации"""
+        self.trade_logger.finish(debug_callback=debug_callback)
+        with ResultsStore(os.path.join(self.export_path, ResultsStore.FILENAME)) as store:
+            store.insert(row, param_names=self.raw_params.keys())
@@ -1,17 +1,23 @@
 from AlgorithmImports import *
 from datetime import datetime
-from BinanceFundingRateData import BinanceFundingRateData
-from BinanceHourlyBTC import BinanceHourlyBTC
+from BinanceFundingRateData import BinanceFundingRateData, BinanceFundingRateDataMonthly
+from BinanceHourlyBTC import BinanceHourlyBTC, BinanceHourlyBTCDaily
 from ScoringStrategy import ScoringStrategy
+from PortfolioMetrics import compute_metrics
 from TradeLogger import TradeLogger
-from collections import deque
+from TradeSink import FileTradeSink, ObjectStoreTradeSink, trade_log_path
+from EquitySink import EquitySink, equity_log_path
 from TradeContext import TradeContext
 import statistics
-import csv
 import os
 import hashlib
 import json
 from PercentageFeeModel import PercentageFeeModel
+from ResultsStore import ResultsStore
+from RollingIndicators import RollingZScore
+from IndicatorCache import IndicatorCache
+from HotPathTimer import HotPathTimer, timed
+from VirtualStrategy import VirtualStrategy
 
 class DonchianBTCWithFunding(QCAlgorithm):
 
@@ -21,45 +27,44 @@ class DonchianBTCWithFunding(QCAlgorithm):
     BTC_TICK_SIZE = 0.01
     BTC_PRICE_ROUND = 2
 
-    def Initialize(self):
-        self.SetStartDate(2024, 1, 1)
-        self.SetEndDate(2026, 1, 1)
-        self.SetCash(100000)
-
-        # ===== OPTIMIZATION PARAMETERS =====
-
-        # --- Donchian ---
-        self.dc_entry_len = int(self.GetParameter("dc_entry_len") or 20)
-        self.dc_exit_len  = int(self.GetParameter("dc_exit_len") or 10)
+    # Служебные параметры: не влияют на правила торговли, поэтому не попадают
+    # ни в strategy_version_run, ни в строку метрик прогона (период уже есть в run_id)
+    SERVICE_PARAMETERS = (
+        "export_path", "start_date", "end_date", "data_layout", "trade_log", "indicator_cache", "configs"
+    )
 
-        # --- ATR / Stops ---
-        self.atr_period = int(self.GetParameter("atr_period") or 14)
+    WARMUP_BARS = 300
+    INITIAL_CASH = 100000
+    FEE_PERCENT = 0.001
 
-        self.atr_stop_negative = float(self.GetParameter("atr_stop_negative") or 3.0)
-        self.atr_stop_neutral  = float(self.GetParameter("atr_stop_neutral")  or 2.0)
-        self.atr_stop_positive = float(self.GetParameter("atr_stop_positive") or 2.0)
+    DEFAULT_START_DATE = datetime(2024, 1, 1)
+    DEFAULT_END_DATE = datetime(2026, 1, 1)
 
-        # --- Risk multipliers ---
-        self.risk_boost_negative = float(self.GetParameter("risk_boost_negative") or 1.5)
-        self.risk_neutral        = float(self.GetParameter("risk_neutral") or 1.0)
-        self.risk_cut_positive   = float(self.GetParameter("risk_cut_positive") or 0.5)
+    # Методы со счетчиками времени (@timed; OnEndOfAlgorithm — вручную)
+    HOT_PATH_METHODS = (
+        "OnData", "_update_funding_rate", "_should_process_data", "_check_volatility_filter",
+        "_try_long_entry", "_manage_position", "OnOrderEvent", "OnEndOfAlgorithm",
+    )
 
-        # --- Breakeven ---
-        self.breakeven_r = float(self.GetParameter("breakeven_r") or 1.0)
-        self.breakeven_atr_frac = float(self.GetParameter("breakeven_atr_frac") or 0.75)
-
-        # --- Trailing / exits ---
-        self.trail_start_r = float(self.GetParameter("trail_start_r") or 1.8)
-        self.soft_exit_r   = float(self.GetParameter("soft_exit_r") or 3.0)
+    def Initialize(self):
+        self.hot_path_timer = HotPathTimer(DonchianBTCWithFunding.HOT_PATH_METHODS)
 
-        # ===== END OPTIMIZATION PARAMETERS =====
+        # Период бэктеста задается параметрами (YYYY-MM-DD) для оценки на коротких окнах
+        start_date = self._date_parameter("start_date", DonchianBTCWithFunding.DEFAULT_START_DATE)
+        end_date = self._date_parameter("end_date", DonchianBTCWithFunding.DEFAULT_END_DATE)
+        self.SetStartDate(start_date.year, start_date.month, start_date.day)
+        self.SetEndDate(end_date.year, end_date.month, end_date.day)
+        self.SetCash(DonchianBTCWithFunding.INITIAL_CASH)
 
-        version_hash = hashlib.md5(
-            json.dumps(dict(self.GetParameters()), sort_keys=True).encode()).hexdigest()[:8]
+        for name, value in self.read_strategy_parameters(self.GetParameter).items():
+            setattr(self, name, value)
 
-        self.strategy_version_run = f"{self.STRATEGY_VERSION}-{version_hash}"
+        self.strategy_version_run = self.make_strategy_version_run(self._optimization_parameters())
         self.SetRuntimeStatistic("strategy_version_run", self.strategy_version_run)
 
+        # configs — JSON со списком конфигураций: все считаются за один проход
+        # как виртуальные под-стратегии (см. VirtualStrategy.py)
+        self.configs = self._load_configs()
 
         self.trade_context = None
 
@@ -68,8 +73,6 @@ class DonchianBTCWithFunding(QCAlgorithm):
         self.last_funding_rate = 0.0
         self.last_funding_time = None
 
-        self.funding_window = deque(maxlen=168)  # ~7 дней
-
         self.min_funding_samples = 30
         self.prev_quantity = 0
 
@@ -78,12 +81,23 @@ class DonchianBTCWithFunding(QCAlgorithm):
         if not export_path:
             # Используем правильный путь относительно DataFolder
             export_path = os.path.join(Globals.DataFolder, "exports")
-            os.makedirs(export_path, exist_ok=True)
-        self.trade_logger = TradeLogger(export_path=export_path)
+        os.makedirs(export_path, exist_ok=True)
+        self.export_path = export_path
+        if self.configs is None:
+            self.trade_logger = TradeLogger(
+                export_path=export_path, sink=self._create_trade_sink(self.strategy_version_run))
+            # Часовая кривая equity — для анализа просадок (optim/drawdowns.py)
+            self.equity_sink = EquitySink(equity_log_path(export_path, self.strategy_version_run))
+
+        # data_layout=partitioned — данные, разложенные convert_data_to_lean.py
+        # по дням/месяцам (Lean открывает только файлы нужных дат); иначе — исходные CSV
+        partitioned = self.GetParameter("data_layout") == "partitioned"
+        bars_type = BinanceHourlyBTCDaily if partitioned else BinanceHourlyBTC
+        funding_type = BinanceFundingRateDataMonthly if partitioned else BinanceFundingRateData
 
         # 1. Добавляем ваши кастомные данные
         # LEAN создаст инструмент с дефолтными настройками (LotSize=1, Market=Empty)
-        self.symbol = self.AddData(BinanceHourlyBTC, "BTC", Resolution.Hour).Symbol
+        self.symbol = self.AddData(bars_type, "BTC", Resolution.Hour).Symbol
         
         # 2. Получаем доступ к объекту этого инструмента
         security = self.Securities[self.symbol]
@@ -93,11 +107,12 @@ class DonchianBTCWithFunding(QCAlgorithm):
         # LotSize = 0.00001 (позволяет торговать дробным BTC)
         binance_like_props = SymbolProperties("BTC Binance", "USD", 1, 0.01, 0.00001, "BTC")
         security.SymbolProperties = binance_like_props
-        security.FeeModel = PercentageFeeModel(0.001)  # 0.1% комиссия
+        security.FeeModel = PercentageFeeModel(DonchianBTCWithFunding.FEE_PERCENT)  # 0.1% комиссия
         security.SetLeverage(1.5)
 
         # ===== FUNDING DATA =====
-        self.funding_symbol = self.AddData(BinanceFundingRateData,"BTC_FUNDING",Resolution.Hour).Symbol
+        self.funding_symbol = self.AddData(funding_type,"BTC_FUNDING",Resolution.Hour).Symbol
+
         self.last_funding_rate = None
 
         self.funding_buckets = [
@@ -109,39 +124,209 @@ class DonchianBTCWithFunding(QCAlgorithm):
         ]
 
         # ===== INDICATORS =====
-        self.dc_entry = DonchianChannel(self.dc_entry_len)
-        self.dc_exit  = DonchianChannel(self.dc_exit_len)
-
-        self.ema200 = self.EMA(self.symbol, 200, Resolution.Hour)
-        self.ema50  = self.EMA(self.symbol, 50, Resolution.Hour)
-        self.atr = self.ATR(self.symbol, self.atr_period, type=MovingAverageType.Simple, resolution=Resolution.Hour)
-
-        self.atr_sma = SimpleMovingAverage(50)
-
-        self.RegisterIndicator(self.symbol, self.dc_entry, Resolution.Hour)
-        self.RegisterIndicator(self.symbol, self.dc_exit, Resolution.Hour)
-        self.RegisterIndicator(self.symbol, self.atr, Resolution.Hour)
+        # Индикаторы одной длины создаются один раз (_donchian, _atr, _funding_stats)
+        # и общие для всех конфигураций. indicator_cache — папка optim/indicator_cache.py:
+        # значения берутся из предрасчитанных массивов, живые индикаторы не создаются
+        self._indicators = {}
+        run_params = self.configs_parameters() if self.configs is not None else [self._strategy_params()]
+        self.indicator_cache = self._open_indicator_cache(
+            start_date,
+            dc_lengths={n for p in run_params for n in (p["dc_entry_len"], p["dc_exit_len"])},
+            atr_periods={p["atr_period"] for p in run_params},
+        )
+        if self.indicator_cache is not None:
+            self.ema200 = self.indicator_cache.ema(200)
+            self.ema50 = self.indicator_cache.ema(50)
+        else:
+            self.ema200 = self.EMA(self.symbol, 200, Resolution.Hour)
+            self.ema50  = self.EMA(self.symbol, 50, Resolution.Hour)
 
         # ===== RISK =====
         self.base_risk_per_trade = 0.01
         self.max_risk_per_trade = 0.02
         self.min_risk_per_trade = 0.003
 
-        # ===== POSITION MANAGER =====
-        self.position_manager = PositionManager(
+        if self.configs is not None:
+            self.virtual_strategies = [
+                VirtualStrategy(self, config_params, config["params"], config.get("export_path") or export_path)
+                for config, config_params in zip(self.configs, run_params)
+            ]
+            self._last_bar_day = None
+            self._last_close = None
+        else:
+            self.dc_entry = self._donchian(self.dc_entry_len)
+            self.dc_exit = self._donchian(self.dc_exit_len)
+            self.atr = self._atr(self.atr_period)
+
+            # Окно z-score funding в точках funding (по умолчанию 168).
+            # Статистики инкрементальные, стоимость обновления не зависит от длины окна
+            self.funding_stats = self._funding_stats(self.funding_window_len)
+
+            # Среднее ATR по последним 50 обработанным барам (обновляется в _check_volatility_filter)
+            self.atr_stats = RollingZScore("atr_stats", 50)
+
+            # ===== POSITION MANAGER =====
+            self.position_manager = self.create_position_manager(self._strategy_params())
+
+        # Прогрев нужен и с кэшем индикаторов: на нем копится окно funding z-score
+        self.SetWarmUp(DonchianBTCWithFunding.WARMUP_BARS)
+
+    @staticmethod
+    def read_strategy_parameters(get) -> dict:
+        """
+        Параметры торговли с умолчаниями.
+
+        Args:
+            get: функция имя -> строковое значение или None (GetParameter или dict.get)
+        """
+        return {
+            # --- Donchian ---
+            "dc_entry_len": int(get("dc_entry_len") or 20),
+            "dc_exit_len": int(get("dc_exit_len") or 10),
+
+            # --- ATR / Stops ---
+            "atr_period": int(get("atr_period") or 14),
+            "atr_stop_negative": float(get("atr_stop_negative") or 3.0),
+            "atr_stop_neutral": float(get("atr_stop_neutral") or 2.0),
+            "atr_stop_positive": float(get("atr_stop_positive") or 2.0),
+
+            # --- Risk multipliers ---
+            "risk_boost_negative": float(get("risk_boost_negative") or 1.5),
+            "risk_neutral": float(get("risk_neutral") or 1.0),
+            "risk_cut_positive": float(get("risk_cut_positive") or 0.5),
+
+            # --- Breakeven ---
+            "breakeven_r": float(get("breakeven_r") or 1.0),
+            "breakeven_atr_frac": float(get("breakeven_atr_frac") or 0.75),
+
+            # --- Trailing / exits ---
+            "trail_start_r": float(get("trail_start_r") or 1.8),
+            "soft_exit_r": float(get("soft_exit_r") or 3.0),
+
+            # --- Funding ---
+            "funding_window_len": int(get("funding_window") or 168),
+        }
+
+    def _strategy_params(self) -> dict:
+        return {name: getattr(self, name) for name in self.read_strategy_parameters(lambda _: None)}
+
+    @classmethod
+    def make_strategy_version_run(cls, params: dict) -> str:
+        """Версия стратегии + хэш параметров запуска (значения — строки, как из GetParameter)"""
+        version_hash = hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()[:8]
+        return f"{cls.STRATEGY_VERSION}-{version_hash}"
+
+    @staticmethod
+    def create_position_manager(params: dict):
+        return PositionManager(
             price_round=DonchianBTCWithFunding.BTC_PRICE_ROUND,
-            atr_stop_negative=self.atr_stop_negative,
-            atr_stop_neutral=self.atr_stop_neutral,
-            atr_stop_positive=self.atr_stop_positive,
-            risk_boost_negative=self.risk_boost_negative,
-            risk_neutral=self.risk_neutral,
-            risk_cut_positive=self.risk_cut_positive
+            atr_stop_negative=params["atr_stop_negative"],
+            atr_stop_neutral=params["atr_stop_neutral"],
+            atr_stop_positive=params["atr_stop_positive"],
+            risk_boost_negative=params["risk_boost_negative"],
+            risk_neutral=params["risk_neutral"],
+            risk_cut_positive=params["risk_cut_positive"]
         )
 
-        self.SetWarmUp(300)
+    def _load_configs(self):
+        """
+        Конфигурации из файла параметра configs или None (обычный прогон).
+
+        Файл — JSON-список {"params": {...}, "export_path": "..."}; export_path
+        необязателен (по умолчанию — общий export_path прогона).
+        """
+        path = self.GetParameter("configs")
+        if not path:
+            return None
+        with open(path) as f:
+            configs = json.load(f)
+        for config in configs:
+            # Значения — строками, как их отдал бы GetParameter: тот же strategy_version_run
+            config["params"] = {
+                name: str(value) for name, value in config["params"].items()
+                if name not in DonchianBTCWithFunding.SERVICE_PARAMETERS
+            }
+        return configs
+
+    def configs_parameters(self) -> list:
+        return [self.read_strategy_parameters(config["params"].get) for config in self.configs]
+
+    # ===== SHARED INDICATORS =====
+
+    def _donchian(self, period: int):
+        key = ("donchian", period)
+        if key not in self._indicators:
+            if self.indicator_cache is not None:
+                self._indicators[key] = self.indicator_cache.donchian(period)
+            else:
+                self._indicators[key] = DonchianChannel(period)
+                self.RegisterIndicator(self.symbol, self._indicators[key], Resolution.Hour)
+        return self._indicators[key]
+
+    def _atr(self, period: int):
+        key = ("atr", period)
+        if key not in self._indicators:
+            if self.indicator_cache is not None:
+                self._indicators[key] = self.indicator_cache.atr(period)
+            else:
+                # self.ATR уже подписывает индикатор, RegisterIndicator — второй раз
+                # (ATR обновляется дважды за бар; так считает и fast_backtest)
+                atr = self.ATR(self.symbol, period, type=MovingAverageType.Simple, resolution=Resolution.Hour)
+                self.RegisterIndicator(self.symbol, atr, Resolution.Hour)
+                self._indicators[key] = atr
+        return self._indicators[key]
+
+    def _funding_stats(self, window: int):
+        key = ("funding", window)
+        if key not in self._indicators:
+            stats = RollingZScore(f"funding_z_{window}", window)
+            self.RegisterIndicator(self.funding_symbol, stats, Resolution.Hour)
+            self._indicators[key] = stats
+        return self._indicators[key]
+
+    def _open_indicator_cache(self, start_date, dc_lengths, atr_periods):
+        """IndicatorCache из параметра indicator_cache или None (живые индикаторы)"""
+        path = self.GetParameter("indicator_cache")
+        if not path:
+            return None
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            self.Debug(f"Indicator cache not found: {path}, using live indicators")
+            return None
+        cache = IndicatorCache(path)
+        if not cache.matches(start_date, DonchianBTCWithFunding.WARMUP_BARS,
+                             dc_lengths=dc_lengths, atr_periods=atr_periods, ema_periods=(200, 50)):
+            self.Debug(f"Indicator cache {path} does not match this run, using live indicators")
+            return None
+        return cache
+
+    def _date_parameter(self, name, default):
+        """Дата из параметра в формате YYYY-MM-DD или default"""
+        value = self.GetParameter(name)
+        if not value:
+            return default
+        return datetime.strptime(value, "%Y-%m-%d")
+
+    def _optimization_parameters(self) -> dict:
+        """Параметры запуска без служебных (пути экспорта и т.п.)"""
+        params = self.GetParameters()
+        if not params:
+            return {}
+        return {
+            name: value for name, value in dict(params).items()
+            if name not in DonchianBTCWithFunding.SERVICE_PARAMETERS
+        }
 
+    @timed
     def OnData(self, data: Slice):
         self._update_funding_rate(data)
+        if self.indicator_cache is not None and data.ContainsKey(self.symbol):
+            self.indicator_cache.advance(data[self.symbol].Time)
+
+        if self.configs is not None:
+            self._on_data_configs(data)
+            return
+        
+        self._record_equity(data)
         
         if not self._should_process_data(data):
             return
@@ -159,13 +344,37 @@ class DonchianBTCWithFunding(QCAlgorithm):
 
         self._manage_position(close_price)
 
+    def _on_data_configs(self, data: Slice):
+        """OnData режима configs: бар — каждой виртуальной под-стратегии"""
+        if self.IsWarmingUp or not data.ContainsKey(self.symbol):
+            return
+        bar = data[self.symbol]
+
+        # Первый бар нового дня: equity прошлого дня — по close его последнего бара
+        day = bar.Time.date()
+        if self._last_bar_day is not None and day != self._last_bar_day:
+            for strategy in self.virtual_strategies:
+                strategy.record_equity(self._last_close)
+        self._last_bar_day = day
+        self._last_close = bar.Close
+
+        for strategy in self.virtual_strategies:
+            strategy.on_bar(bar)
+
+    def _record_equity(self, data: Slice):
+        """Точка кривой equity на каждом часовом баре после прогрева"""
+        if self.IsWarmingUp or not data.ContainsKey(self.symbol):
+            return
+        self.equity_sink.add(self.Time, float(self.Portfolio.TotalPortfolioValue))
+
+    @timed
     def _update_funding_rate(self, data: Slice):
         if data.ContainsKey(self.funding_symbol):
             funding = data[self.funding_symbol].Value
             self.last_funding_rate = funding
             self.last_funding_time = self.Time
-            self.funding_window.append(funding)
 
+    @timed
     def _should_process_data(self, data: Slice) -> bool:
         """Проверяет все условия для продолжения обработки данных"""
         if self.last_funding_rate is None:
@@ -184,17 +393,20 @@ class DonchianBTCWithFunding(QCAlgorithm):
         
         return True
 
+    @timed
     def _check_volatility_filter(self) -> bool:
         """Проверяет фильтр волатильности: торгуем только при высокой волатильности"""
-        self.atr_sma.Update(self.Time, self.atr.Current.Value)
+        self.atr_stats.Add(self.atr.Current.Value)
         
-        if not self.atr_sma.IsReady:
+        if not self.atr_stats.IsFull:
             return False
         
         # Торгуем только если текущая волатильность выше средней
-        return self.atr.Current.Value > self.atr_sma.Current.Value
+        return self.atr.Current.Value > self.atr_stats.Mean
 
-    def _calculate_entry_features(self, price, funding_z, atr):
+    def _calculate_entry_features(self, price, funding_z, atr, atr_mean=None):
+        if atr_mean is None:
+            atr_mean = self.atr_stats.Mean
         dt = self.Time
         weekday = dt.weekday()
         hour = dt.hour
@@ -208,11 +420,12 @@ class DonchianBTCWithFunding(QCAlgorithm):
             "funding_extreme": int(abs(funding_z) > 1.5),
             "atr_pct": atr / price,
             "ema_distance_pct": (price - self.ema200.Current.Value) / price,
-            "volatility_regime": self.GetVolatilityRegime(atr, self.atr_sma.Current.Value),
+            "volatility_regime": self.GetVolatilityRegime(atr, atr_mean),
             "funding": self.last_funding_rate,
             "bucket": self.FundingBucket(funding_z)
         }
 
+    @timed
     def _try_long_entry(self, price: float, data: Slice):
         z = self.FundingZScore()
 
@@ -225,7 +438,7 @@ class DonchianBTCWithFunding(QCAlgorithm):
 
         # Если рынок перегрет (crowding) — требуем усиленный сетап
         if z > 1.0:
-            volatility_ok = self.atr.Current.Value > 1.2 * self.atr_sma.Current.Value
+            volatility_ok = self.atr.Current.Value > 1.2 * self.atr_stats.Mean
         else:
             volatility_ok = True
 
@@ -271,6 +484,7 @@ class DonchianBTCWithFunding(QCAlgorithm):
         stop_ticket = self.StopMarketOrder(self.symbol, -qty, stop_price)
         self.position_manager.set_stop_ticket(stop_ticket)
 
+    @timed
     def _manage_position(self, close_price: float):
         """Управляет открытой позицией: выходы и обновление стоп-лосса"""
         tc = self.trade_context
@@ -315,20 +529,18 @@ class DonchianBTCWithFunding(QCAlgorithm):
 
 
 
-    def FundingZScore(self):
+    def FundingZScore(self, stats=None):
 
-        if len(self.funding_window) < self.min_funding_samples:
+        stats = stats or self.funding_stats
+        if stats.Samples < self.min_funding_samples:
             return 0.0
 
-        mean = sum(self.funding_window) / len(self.funding_window)
-        var = sum((x - mean) ** 2 for x in self.funding_window) / len(self.funding_window)
-
-        std = var ** 0.5
+        std = stats.StdDev
 
         if std < 1e-6:
             return 0.0   # funding стабилен → нет сигнала
 
-        z = (self.last_funding_rate - mean) / std
+        z = (self.last_funding_rate - stats.Mean) / std
 
         # 🔒 защита от числовых выбросов
         return max(-5.0, min(5.0, z))
@@ -356,6 +568,7 @@ class DonchianBTCWithFunding(QCAlgorithm):
                 return f"{low}:{high}"
         return "unknown"
 
+    @timed
     def OnOrderEvent(self, orderEvent):
         if orderEvent.Status != OrderStatus.Filled:
             return
@@ -383,8 +596,55 @@ class DonchianBTCWithFunding(QCAlgorithm):
 
         self.prev_quantity = current_qty
 
+    def _create_trade_sink(self, strategy_version_run, export_path=None):
+        """
+        trade_log: columnar (по умолчанию) — <strategy_version_run>.trades.zip в export_path,
+        objectstore — ObjectStore Lean, csv — прежний trade_log.csv в конце прогона.
+        """
+        mode = self.GetParameter("trade_log") or "columnar"
+        if mode == "csv":
+            return None
+        if mode == "objectstore":
+            return ObjectStoreTradeSink(self.ObjectStore, strategy_version_run)
+        return FileTradeSink(trade_log_path(export_path or self.export_path, strategy_version_run))
+
+    def _run_id(self, strategy_version_run):
+        return self.StartDate.strftime("%Y%m%d") + "_" + self.EndDate.strftime("%Y%m%d") + "_" + strategy_version_run
+
+    def _end_configs(self):
+        """Строки метрик всех конфигураций режима configs — по дневному equity и сделкам"""
+        strategies = self.virtual_strategies
+        if self._last_close is not None:
+            for strategy in strategies:
+                strategy.record_equity(self._last_close)
+
+        trades = pd.DataFrame(
+            [(i,) + trade for i, strategy in enumerate(strategies) for trade in strategy.trades],
+            columns=["config", "pnl", "entry_price", "quantity", "R", "holding_hours"])
+        equity = np.array([strategy.daily_equity for strategy in strategies], dtype=float).T
+        metrics = compute_metrics([strategy.raw_params for strategy in strategies], trades, equity,
+                                  DonchianBTCWithFunding.INITIAL_CASH, self.StartDate, self.EndDate)
+
+        for strategy, row in zip(strategies, metrics.to_dict("records")):
+            row = {"run_id": self._run_id(strategy.strategy_version_run), **row,
+                   "strategy_version_run": strategy.strategy_version_run}
+            strategy.save(row, debug_callback=self.Debug)
+        self.Debug(f"Saved metrics of {len(strategies)} configs")
+
+        # Время общего прохода не делится между конфигурациями — только в лог
+        self.hot_path_timer.stop("OnEndOfAlgorithm")
+        for line in self.hot_path_timer.lines():
+            self.Debug(line)
+
     def OnEndOfAlgorithm(self):
-        self.trade_logger.export_to_csv(debug_callback=self.Debug)
+        self.hot_path_timer.start("OnEndOfAlgorithm")
+        if self.configs is not None:
+            self._end_configs()
+            return
+
+        self.trade_logger.finish(debug_callback=self.Debug)
+        self.equity_sink.close()
+        self.Debug(f"Exported {self.equity_sink.count} equity points to {self.equity_sink.location}")
 
         if self.run_r:
             avg_r = sum(self.run_r) / len(self.run_r)
@@ -410,14 +670,13 @@ class DonchianBTCWithFunding(QCAlgorithm):
         profit_factor = self.statistics.total_performance.trade_statistics.profit_factor
 
         row = {
-            "run_id": self.StartDate.strftime("%Y%m%d") + "_" + self.EndDate.strftime("%Y%m%d") + "_" + self.strategy_version_run,
+            "run_id": self._run_id(self.strategy_version_run),
         }
 
         # --- parameters from GetParameter ---
-        params = self.GetParameters()
-        if params:
-            for param_name, param_value in params.items():
-                row[param_name] = param_value
+        params = self._optimization_parameters()
+        for param_name, param_value in params.items():
+            row[param_name] = param_value
 
         # --- metrics from Lean ---
         row.update({
@@ -443,17 +702,13 @@ class DonchianBTCWithFunding(QCAlgorithm):
         score = ScoringStrategy.score_strategy(row)
         row["score"] = score
 
-        # Используем правильный путь относительно DataFolder
-        exports_dir = os.path.join(Globals.DataFolder, "exports")
-        os.makedirs(exports_dir, exist_ok=True)
-        path = os.path.join(exports_dir, "run_metrics.csv")
-        file_exists = os.path.isfile(path)
-
-        with open(path, mode="a", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=row.keys())
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(row)
+        # --- hot-path timings (OnEndOfAlgorithm — без записи строки) ---
+        self.hot_path_timer.stop("OnEndOfAlgorithm")
+        row.update(self.hot_path_timer.row())
+
+        # export_path по умолчанию — DataFolder/exports, оптимизатор передает отдельную папку на прогон
+        with ResultsStore(os.path.join(self.export_path, ResultsStore.FILENAME)) as store:
+            store.insert(row, param_names=params.keys())
 
 
 class PositionManager:
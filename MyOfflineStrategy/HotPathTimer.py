@@ -0,0 +1,109 @@
+"""
+Счетчики времени горячих методов стратегии: число вызовов, суммарное время,
+p50 / p99 длительности вызова.
+
+Метод подключается декоратором @timed в теле класса алгоритма; таймер
+берется из атрибута hot_path_timer экземпляра (до его создания вызовы не
+считаются). Время включающее: если OnData вызывает _try_long_entry, время
+_try_long_entry входит и в OnData.
+
+Накладные расходы на вызов — два perf_counter_ns и append в array('q')
+(8 байт на вызов), поэтому счетчики не выключаются и в прогонах оптимизатора.
+Перцентили считаются один раз в конце прогона сортировкой.
+
+Файл одинаковый в DonchianWithFunding, DonchianStrategy и MyOfflineStrategy:
+каталог проекта Lean должен быть самодостаточным. Правки вносить во все копии.
+"""
+
+from array import array
+from functools import wraps
+import math
+from time import perf_counter_ns
+
+# Префикс колонок в строке метрик: perf_<метод>_calls, _total_ms, _p50_us, _p99_us
+COLUMN_PREFIX = "perf_"
+
+
+def timed(method):
+    """Декоратор метода алгоритма: длительность вызова -> self.hot_path_timer"""
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        timer = getattr(self, "hot_path_timer", None)
+        if timer is None:
+            return method(self, *args, **kwargs)
+        start = perf_counter_ns()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            timer.record(name, perf_counter_ns() - start)
+
+    return wrapper
+
+
+class HotPathTimer:
+
+    def __init__(self, names=()):
+        """
+        Args:
+            names: методы, которые попадут в сводку даже без единого вызова
+        """
+        self.durations = {name: array("q") for name in names}
+        self._started = {}
+
+    def record(self, name: str, duration_ns: int):
+        durations = self.durations.get(name)
+        if durations is None:
+            durations = self.durations[name] = array("q")
+        durations.append(duration_ns)
+
+    def start(self, name: str):
+        """Ручной замер участка (например, OnEndOfAlgorithm до записи строки метрик)"""
+        self._started[name] = perf_counter_ns()
+
+    def stop(self, name: str):
+        started = self._started.pop(name, None)
+        if started is not None:
+            self.record(name, perf_counter_ns() - started)
+
+    @staticmethod
+    def _percentile(ordered, q: float) -> int:
+        # nearest-rank: наименьшее значение, не меньше которого q доли вызовов
+        rank = max(1, math.ceil(len(ordered) * q))
+        return ordered[rank - 1]
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: метод -> {calls, total_ms, p50_us, p99_us}
+        """
+        result = {}
+        for name, durations in self.durations.items():
+            if not durations:
+                result[name] = {"calls": 0, "total_ms": 0.0, "p50_us": 0.0, "p99_us": 0.0}
+                continue
+            ordered = sorted(durations)
+            result[name] = {
+                "calls": len(ordered),
+                "total_ms": sum(ordered) / 1e6,
+                "p50_us": self._percentile(ordered, 0.50) / 1e3,
+                "p99_us": self._percentile(ordered, 0.99) / 1e3,
+            }
+        return result
+
+    def row(self) -> dict:
+        """Сводка колонками строки метрик прогона"""
+        return {
+            f"{COLUMN_PREFIX}{name}_{stat}": value
+            for name, stats in self.summary().items()
+            for stat, value in stats.items()
+        }
+
+    def lines(self) -> list:
+        """Сводка текстом — для self.Log / self.Debug"""
+        return [
+            f"{name}: calls={s['calls']} total={s['total_ms']:.1f}ms "
+            f"p50={s['p50_us']:.1f}us p99={s['p99_us']:.1f}us"
+            for name, s in self.summary().items()
+        ]
@@ -1,6 +1,6 @@
 from AlgorithmImports import *
-from datetime import datetime
-import os
+from YahooHourlyCrypto import YahooHourlyCrypto
+from HotPathTimer import HotPathTimer, timed
 
 # --- 1. ВСПОМОГАТЕЛЬНЫЙ КЛАСС КОМИССИИ ---
 # Добавляем этот класс, чтобы считать комиссию в процентах
@@ -14,44 +14,14 @@ class PercentageFeeModel(FeeModel):
         # Возвращаем размер комиссии в валюте котировки (обычно USD)
         return OrderFee(CashAmount(val, parameters.Security.QuoteCurrency.Symbol))
 
-# --- 2. КЛАСС ДАННЫХ ---
-class YahooHourlyCrypto(PythonData):
-    def GetSource(self, config, date, isLiveMode):
-        source_path = os.path.join(Globals.DataFolder, "custom", "btc_1h.csv")
-        return SubscriptionDataSource(source_path, SubscriptionTransportMedium.LocalFile)
-
-    def Reader(self, config, line, date, isLiveMode):
-        if not (line.strip() and line[0].isdigit()): return None
-        data = YahooHourlyCrypto()
-        data.Symbol = config.Symbol
-        try:
-            items = line.split(',')
-            date_str = items[0][:19] 
-            data.Time = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-            data["Open"] = float(items[1])
-            data["High"] = float(items[2])
-            data["Low"] = float(items[3])
-            data["Close"] = float(items[4])
-            data.Value = float(items[4])
-
-            # --- ХАК ДЛЯ ОБЪЕМА ---
-            # Если объема нет или он 0, ставим искусственный объем.
-            # Без этого ордера могут не исполняться!
-            vol = 0
-            if len(items) > 5 and items[5].strip():
-                vol = float(items[5])
-            
-            data["Volume"] = vol if vol > 0 else 100000.0 
-
-
-        except ValueError:
-            return None
-        return data
+# --- 2. КЛАСС ДАННЫХ --- см. YahooHourlyCrypto.py
 
 # --- 3. СТРАТЕГИЯ ---
 class RealisticBitcoinStrategy(QCAlgorithm):
 
     def Initialize(self):
+        self.hot_path_timer = HotPathTimer(("OnData", "OnOrderEvent", "OnEndOfAlgorithm"))
+
         self.SetStartDate(2025, 1, 1) 
         self.SetEndDate(2026, 1, 1)
         self.SetCash(100000)
@@ -90,6 +60,7 @@ class RealisticBitcoinStrategy(QCAlgorithm):
         chart.AddSeries(Series("Sell", SeriesType.Scatter, 0))
         self.AddChart(chart)
 
+    @timed
     def OnData(self, data):
         if not data.ContainsKey(self.symbol) or self.IsWarmingUp:
             return
@@ -134,6 +105,7 @@ class RealisticBitcoinStrategy(QCAlgorithm):
                 self.Plot("Trade Plot", "Buy", price)
                 self.Debug(f"BUY at {price}")
 
+    @timed
     def OnOrderEvent(self, orderEvent):
         if orderEvent.Status == OrderStatus.Filled:
             order = self.Transactions.GetOrderById(orderEvent.OrderId)
@@ -145,9 +117,13 @@ class RealisticBitcoinStrategy(QCAlgorithm):
                 else: self.losses += 1
 
     def OnEndOfAlgorithm(self):
+        self.hot_path_timer.start("OnEndOfAlgorithm")
         self.Log(f"\n--- Strategy Report ---")
         self.Log(f"Total Trades: {self.trade_count}")
         win_rate = (self.wins / self.trade_count * 100) if self.trade_count > 0 else 0
         self.Log(f"Win Rate: {win_rate:.2f}%")
         self.Log(f"Realized PnL: ${self.realized_pnl:.2f}")
-        self.Log(f"Final Equity: ${self.Portfolio.TotalPortfolioValue:.2f}")
\ No newline at end of file
+        self.Log(f"Final Equity: ${self.Portfolio.TotalPortfolioValue:.2f}")
+        self.hot_path_timer.stop("OnEndOfAlgorithm")
+        for line in self.hot_path_timer.lines():
+            self.Log(line)
@@ -0,0 +1,131 @@
+"""
+Раскладывает исходные CSV в формат, который Lean читает по датам.
+
+- Свечи Binance (BTCUSDT_Binance_1h.csv) ->
+  * Data/custom/Binance/BTCUSDT/hour/YYYYMMDD.zip — по файлу на день для BinanceHourlyBTCDaily;
+  * Data/crypto/binance/hour/btcusdt_trade.zip — нативный формат Lean для AddCrypto
+    (строки "YYYYMMDD HH:mm,open,high,low,close,volume", время открытия бара в UTC).
+- Funding rate (binance_funding_rate_BTC.csv) ->
+  * Data/custom/lean_funding_rates/BTC/YYYYMM.zip — по файлу на месяц
+    для BinanceFundingRateDataMonthly.
+
+Файлы пишутся атомарно (временный файл + os.replace); партиции с неизменившимся
+содержимым не перезаписываются, поэтому повторный запуск после докачки
+переписывает только последние дни/месяц.
+"""
+
+import argparse
+import os
+import zipfile
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(PROJECT_ROOT, "Data")
+
+BARS_CSV = os.path.join(DATA_DIR, "custom", "Binance", "BTCUSDT_Binance_1h.csv")
+FUNDING_CSV = os.path.join(DATA_DIR, "custom", "lean_funding_rates", "binance_funding_rate_BTC.csv")
+
+
+def write_zip(path: str, entry_name: str, lines: list) -> bool:
+    """
+    Пишет zip с одним CSV внутри, если содержимое отличается от существующего.
+
+    Returns:
+        bool: True, если файл был (пере)записан
+    """
+    content = "".join(line + "\n" for line in lines).encode()
+    if os.path.exists(path):
+        try:
+            with zipfile.ZipFile(path) as zf:
+                if zf.namelist() == [entry_name] and zf.read(entry_name) == content:
+                    return False
+        except zipfile.BadZipFile:
+            pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(entry_name, content)
+    os.replace(tmp_path, path)
+    return True
+
+
+def read_data_lines(path: str):
+    """Строки данных без заголовка и пустых строк"""
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and line[0].isdigit():
+                yield line
+
+
+def write_partitions(lines, key_func, path_func) -> tuple:
+    """
+    Группирует отсортированные по времени строки по ключу партиции и пишет zip на каждую.
+
+    Returns:
+        tuple: (всего партиций, перезаписано)
+    """
+    total = written = 0
+    key, chunk = None, []
+
+    def flush():
+        nonlocal total, written
+        if chunk:
+            total += 1
+            path = path_func(key)
+            written += write_zip(path, os.path.basename(path)[:-4] + ".csv", chunk)
+
+    for line in lines:
+        line_key = key_func(line)
+        if line_key != key:
+            flush()
+            key, chunk = line_key, []
+        chunk.append(line)
+    flush()
+    return total, written
+
+
+def convert_bars(bars_csv: str = BARS_CSV, data_dir: str = DATA_DIR) -> None:
+    """Свечи: дневные партиции для custom-данных и нативный hour-файл Lean"""
+    day_dir = os.path.join(data_dir, "custom", "Binance", "BTCUSDT", "hour")
+    # "2024-01-01 00:00:00+00:00,..." -> ключ дня "20240101"
+    total, written = write_partitions(
+        read_data_lines(bars_csv),
+        key_func=lambda line: line[0:4] + line[5:7] + line[8:10],
+        path_func=lambda day: os.path.join(day_dir, f"{day}.zip"),
+    )
+    print(f"Свечи: {total} дневных файлов, обновлено {written} -> {day_dir}")
+
+    native_lines = []
+    for line in read_data_lines(bars_csv):
+        items = line.split(",")
+        ts = items[0]
+        native_lines.append(
+            f"{ts[0:4]}{ts[5:7]}{ts[8:10]} {ts[11:16]}," + ",".join(items[1:6])
+        )
+    native_path = os.path.join(data_dir, "crypto", "binance", "hour", "btcusdt_trade.zip")
+    written = write_zip(native_path, "btcusdt.csv", native_lines)
+    print(f"Свечи: нативный файл Lean {'обновлен' if written else 'без изменений'} -> {native_path}")
+
+
+def convert_funding(funding_csv: str = FUNDING_CSV, data_dir: str = DATA_DIR) -> None:
+    """Funding rate: месячные партиции"""
+    month_dir = os.path.join(data_dir, "custom", "lean_funding_rates", "BTC")
+    # "20240101 000000,0.0001" -> ключ месяца "202401"
+    total, written = write_partitions(
+        read_data_lines(funding_csv),
+        key_func=lambda line: line[0:6],
+        path_func=lambda month: os.path.join(month_dir, f"{month}.zip"),
+    )
+    print(f"Funding: {total} месячных файлов, обновлено {written} -> {month_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Конвертация CSV в формат Lean по датам")
+    parser.add_argument("--bars", default=BARS_CSV, help="CSV свечей Binance")
+    parser.add_argument("--funding", default=FUNDING_CSV, help="CSV funding rate")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Папка Data проекта")
+    args = parser.parse_args()
+
+    convert_bars(args.bars, args.data_dir)
+    convert_funding(args.funding, args.data_dir)
@@ -1,61 +1,245 @@
-import requests
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+import os
+import random
+import shutil
+import tempfile
 import time
-import csv
 
-def fetch_binance_ohlcv(symbol, interval, start_ts, end_ts):
-    url = "https://api.binance.com/api/v3/klines"
-    all_data = []
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://api.binance.com"
+KLINES_PATH = "/api/v3/klines"
+KLINES_LIMIT = 1000
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Data")
+HEADER = "Date,Open,High,Low,Close,Volume"
+
+# Лимит веса Binance в минуту; при приближении к нему делаем паузу заранее
+WEIGHT_LIMIT_PER_MINUTE = 6000
+WEIGHT_SOFT_LIMIT = 0.8
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000,
+    "1w": 604_800_000,
+}
+
+
+# ===== HTTP =====
+
+def make_session(pool_size: int = 8) -> requests.Session:
+    """Session с пулом соединений на pool_size параллельных запросов"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_json(session, url, params, retries: int = 8, base_delay: float = 0.5, timeout: float = 30):
+    """
+    GET с повторами.
+
+    429/418 (rate limit) — пауза по Retry-After, 5xx и сетевые ошибки —
+    экспоненциальная пауза с джиттером. Если заголовок X-MBX-USED-WEIGHT-1M
+    показывает, что минутный лимит почти выбран, ждем начала следующей минуты.
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+            time.sleep(base_delay * 2 ** attempt * (1 + random.random()))
+            continue
+
+        if response.status_code in (418, 429):
+            retry_after = float(response.headers.get("Retry-After") or base_delay * 2 ** attempt)
+            if attempt == retries:
+                response.raise_for_status()
+            time.sleep(retry_after)
+            continue
+        if response.status_code >= 500:
+            if attempt == retries:
+                response.raise_for_status()
+            time.sleep(base_delay * 2 ** attempt * (1 + random.random()))
+            continue
+        response.raise_for_status()
+
+        used_weight = int(response.headers.get("X-MBX-USED-WEIGHT-1M") or 0)
+        if used_weight > WEIGHT_LIMIT_PER_MINUTE * WEIGHT_SOFT_LIMIT:
+            time.sleep(60 - time.time() % 60)
+        return response.json()
+
+
+# ===== ФОРМАТ =====
+
+def format_row(row) -> str:
+    """Строка kline -> "YYYY-MM-DD HH:MM:SS+00:00,open,high,low,close,volume" """
+    dt = datetime.fromtimestamp(row[0] / 1000, tz=timezone.utc)
+    return f"{dt:%Y-%m-%d %H:%M:%S}+00:00,{row[1]},{row[2]},{row[3]},{row[4]},{row[5]}"
+
+
+def parse_row_time(line: str) -> int:
+    """Время открытия свечи из строки CSV в мс"""
+    dt = datetime.strptime(line[:19], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
 
-    while True:
+def read_last_timestamp(path: str):
+    """Время открытия последней свечи в CSV (мс) или None; читается только хвост файла"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        tail = f.read().decode(errors="ignore")
+    for line in reversed(tail.splitlines()):
+        line = line.strip()
+        if line and line[0].isdigit():
+            return parse_row_time(line)
+    return None
+
+
+# ===== ЗАГРУЗКА =====
+
+def split_range(start_ms: int, end_ms: int, interval_ms: int, chunks: int) -> list:
+    """
+    Делит [start_ms, end_ms] на непересекающиеся куски, выровненные по свечам
+    и кратные странице (KLINES_LIMIT свечей).
+    """
+    candles = max(1, (end_ms - start_ms) // interval_ms + 1)
+    pages = -(-candles // KLINES_LIMIT)
+    pages_per_chunk = max(1, -(-pages // max(1, chunks)))
+    step = pages_per_chunk * KLINES_LIMIT * interval_ms
+
+    ranges = []
+    chunk_start = start_ms
+    while chunk_start <= end_ms:
+        chunk_end = min(end_ms, chunk_start + step - 1)
+        ranges.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + 1
+    return ranges
+
+
+def fetch_chunk(session, base_url, symbol, interval, start_ms, end_ms, out_file, now_ms) -> int:
+    """
+    Постранично качает свечи [start_ms, end_ms] и сразу пишет строки в out_file.
+    Незакрытая текущая свеча (close time в будущем) не записывается.
+
+    Returns:
+        int: число записанных свечей
+    """
+    written = 0
+    while start_ms <= end_ms:
         params = {
             "symbol": symbol,
             "interval": interval,
-            "startTime": start_ts,
-            "endTime": end_ts,
-            "limit": 1000
+            "startTime": start_ms,
+            "endTime": end_ms,
+            "limit": KLINES_LIMIT,
         }
-        response = requests.get(url, params=params)
-        data = response.json()
-
+        data = get_json(session, base_url + KLINES_PATH, params)
         if not data:
             break
 
-        all_data.extend(data)
-        last_time = data[-1][0]
-        start_ts = last_time + 1
+        for row in data:
+            if row[6] >= now_ms:
+                break
+            out_file.write(format_row(row) + "\n")
+            written += 1
 
-        if len(data) < 1000:
+        start_ms = data[-1][0] + 1
+        if len(data) < KLINES_LIMIT:
             break
+    return written
 
-        time.sleep(0.2)
 
-    return all_data
+def download_klines(symbol: str, interval: str, start_ms: int, end_ms: int, output: str,
+                    workers: int = 4, full: bool = False, base_url: str = BASE_URL) -> int:
+    """
+    Докачивает свечи в CSV.
+
+    Если файл есть (и не задан full), загрузка начинается со свечи после последней
+    сохраненной. Диапазон делится на куски, которые качаются параллельно в
+    отдельные временные файлы; затем копия CSV с дописанными кусками атомарно
+    заменяет исходный файл — при ошибке исходный CSV не меняется.
+
+    Returns:
+        int: число новых свечей
+    """
+    interval_ms = INTERVAL_MS[interval]
+    last_ts = None if full else read_last_timestamp(output)
+    if last_ts is not None:
+        start_ms = max(start_ms, last_ts + interval_ms)
+    now_ms = int(time.time() * 1000)
+    end_ms = min(end_ms, now_ms)
+    if start_ms > end_ms:
+        return 0
+
+    ranges = split_range(start_ms, end_ms, interval_ms, workers)
+    out_dir = os.path.dirname(os.path.abspath(output))
+    os.makedirs(out_dir, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(dir=out_dir) as tmp_dir, make_session(workers) as session:
+        part_paths = [os.path.join(tmp_dir, f"part_{i:05d}.csv") for i in range(len(ranges))]
+
+        def fetch(i):
+            with open(part_paths[i], "w", newline="") as f:
+                return fetch_chunk(session, base_url, symbol, interval, *ranges[i], f, now_ms)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            counts = list(pool.map(fetch, range(len(ranges))))
+
+        total = sum(counts)
+        if not total:
+            return 0
+
+        merged_path = os.path.join(tmp_dir, "merged.csv")
+        if last_ts is not None:
+            shutil.copyfile(output, merged_path)
+        else:
+            with open(merged_path, "w", newline="") as f:
+                f.write(HEADER + "\n")
+        with open(merged_path, "a", newline="") as merged:
+            for part_path in part_paths:
+                with open(part_path) as part:
+                    shutil.copyfileobj(part, merged)
+            merged.flush()
+            os.fsync(merged.fileno())
+        os.replace(merged_path, output)
+    return total
+
+
+def to_ms(value: str) -> int:
+    """YYYY-MM-DD или YYYY-MM-DD HH:MM (UTC) -> мс"""
+    fmt = "%Y-%m-%d %H:%M" if " " in value else "%Y-%m-%d"
+    return int(datetime.strptime(value, fmt).replace(tzinfo=timezone.utc).timestamp() * 1000)
 
-def save_to_csv(data, filename):
-    with open(filename, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
-        for row in data:
-            # Дата в формате YYYY-MM-DD HH:MM:SS+00:00
-            dt = datetime.fromtimestamp(row[0]/1000, tz=timezone.utc)
-            dt_str = dt.strftime("%Y-%m-%d %H:%M:%S+00:00")
-            writer.writerow([
-                dt_str,
-                row[1],
-                row[2],
-                row[3],
-                row[4],
-                row[5]
-            ])
 
 if __name__ == "__main__":
-    symbol = "BTCUSDT"
-    interval = "1h"
+    parser = argparse.ArgumentParser(description="Загрузка свечей Binance в CSV (с докачкой)")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--interval", default="1h", choices=sorted(INTERVAL_MS))
+    parser.add_argument("--start", default="2020-01-01 15:00", help="UTC: YYYY-MM-DD[ HH:MM]")
+    parser.add_argument("--end", default=None, help="UTC: YYYY-MM-DD[ HH:MM], по умолчанию — сейчас")
+    parser.add_argument("--output", default=None,
+                        help="CSV (по умолчанию Data/custom/Binance/<SYMBOL>_Binance_<interval>.csv)")
+    parser.add_argument("--workers", "-j", type=int, default=4, help="Параллельных кусков")
+    parser.add_argument("--full", action="store_true", help="Перекачать все, не продолжая существующий файл")
+    parser.add_argument("--base-url", default=BASE_URL, help="Адрес API (например, локальная заглушка)")
+    args = parser.parse_args()
 
-    start = int(datetime(2020, 1, 1, 15, 0, tzinfo=timezone.utc).timestamp() * 1000)
-    end = int(datetime(2026, 1, 1, 19, 0, tzinfo=timezone.utc).timestamp() * 1000)
+    output = args.output or os.path.join(
+        DATA_DIR, "custom", "Binance", f"{args.symbol}_Binance_{args.interval}.csv")
+    end_ms = to_ms(args.end) if args.end else int(time.time() * 1000)
 
-    ohlcv_data = fetch_binance_ohlcv(symbol, interval, start, end)
-    save_to_csv(ohlcv_data, "BTCUSDT_Binance_1h.csv")
-    print(f"Сохранено {len(ohlcv_data)} свечей в BTCUSDT_1h.csv")
+    started = time.time()
+    added = download_klines(args.symbol, args.interval, to_ms(args.start), end_ms, output,
+                            workers=args.workers, full=args.full, base_url=args.base_url)
+    print(f"Добавлено {added} свечей в {output} за {time.time() - started:.1f} с")
@@ -1,58 +1,196 @@
-import yfinance as yf
-import pandas as pd
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 import os
-from datetime import datetime, timedelta
 
-# Настройки
-ticker = "BTC-USD"
-end_date = datetime.now()
-start_date = end_date - timedelta(days=730) 
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Data", "custom")
+
+# Тикер -> файл в Data/custom. SPY — бенчмарк для сравнения доходности (TODO.md)
+TICKERS = {
+    "BTC-USD": "btc_1h.csv",
+    "SPY": "spy.csv",
+}
+
+COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume"]
+
+# Ограничения Yahoo: насколько глубоко доступна история интервала
+# и какой диапазон отдается за один запрос
+HISTORY_DAYS = {"1m": 29, "5m": 59, "15m": 59, "30m": 59, "1h": 729, "1d": 36500}
+CHUNK_DAYS = {"1m": 7, "5m": 59, "15m": 59, "30m": 59, "1h": 180, "1d": 3650}
+INTERVAL_DELTA = {
+    "1m": timedelta(minutes=1), "5m": timedelta(minutes=5), "15m": timedelta(minutes=15),
+    "30m": timedelta(minutes=30), "1h": timedelta(hours=1), "1d": timedelta(days=1),
+}
+
+
+# ===== FETCH =====
+
+def fetch_yfinance(ticker: str, start: datetime, end: datetime, interval: str) -> pd.DataFrame:
+    """
+    Один запрос к Yahoo через yfinance.
+
+    Returns:
+        pd.DataFrame: индекс — время свечи (tz-aware), колонки Open/High/Low/Close/Volume
+    """
+    import yfinance as yf
+
+    return yf.Ticker(ticker).history(start=start, end=end, interval=interval)
+
+
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Ответ провайдера -> колонки COLUMNS, время в UTC, по возрастанию, без повторов"""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+
+    index = pd.DatetimeIndex(df.index)
+    index = index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")
+    out = pd.DataFrame({"Date": index})
+    for column in COLUMNS[1:]:
+        out[column] = df[column].to_numpy() if column in df.columns else 0.0
+
+    # Заменяем volume
+    out.loc[out["Volume"] == 0, "Volume"] = 100000
+    out = out.dropna(subset=["Open", "High", "Low", "Close"])
+    return out.drop_duplicates("Date", keep="last").sort_values("Date", kind="mergesort")
+
+
+def split_chunks(start: datetime, end: datetime, interval: str) -> list:
+    """[start, end) -> куски не длиннее, чем отдает провайдер за один запрос"""
+    step = timedelta(days=CHUNK_DAYS[interval])
+    chunks = []
+    while start < end:
+        chunks.append((start, min(end, start + step)))
+        start += step
+    return chunks
+
+
+# ===== MERGE =====
+
+def format_time(ts: pd.Timestamp) -> str:
+    return ts.strftime("%Y-%m-%d %H:%M:%S+00:00")
+
+
+def read_last_time(path: str):
+    """
+    Время последней полной строки файла (UTC) или None.
+
+    Недописанная последняя строка (файл без \\n в конце после сбоя) обрезается,
+    чтобы следующая дозапись продолжила файл с целой строки.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        tail = f.read()
+        if tail and not tail.endswith(b"\n"):
+            f.truncate(size - (len(tail) - tail.rfind(b"\n") - 1))
+            tail = tail[:tail.rfind(b"\n") + 1]
+    for line in reversed(tail.decode(errors="ignore").splitlines()):
+        if line[:1].isdigit():
+            return pd.Timestamp(line[:19], tz="UTC")
+    return None
+
+
+def merge_into_file(path: str, df: pd.DataFrame, last_time=None) -> int:
+    """
+    Дописывает в CSV только строки новее последней сохраненной; существующая
+    история не переписывается. Новый блок пишется одним write + fsync.
+
+    Returns:
+        int: число дописанных строк
+    """
+    if last_time is not None:
+        df = df[df["Date"] > last_time]
+    if df.empty:
+        return 0
+
+    body = df.assign(Date=df["Date"].map(format_time)).to_csv(index=False, header=False)
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", newline="") as f:
+        if new_file:
+            f.write(",".join(COLUMNS) + "\n")
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(df)
 
-print(f"Скачиваем {ticker} (1h) с Yahoo Finance...")
 
-df = yf.download(ticker, start=start_date, end=end_date, interval="1h")
+# ===== DOWNLOAD =====
 
-# Убираем мультииндекс
-if isinstance(df.columns, pd.MultiIndex):
-    df.columns = df.columns.get_level_values(0)
+def download(tickers: dict, interval: str = "1h", end: datetime = None, data_dir: str = DATA_DIR,
+             workers: int = 4, fetch=fetch_yfinance) -> dict:
+    """
+    Докачивает тикеры параллельно по кускам (тикер x кусок) и дописывает в файлы.
 
-# Сбрасываем индекс, чтобы Date/Datetime стала колонкой
-df.reset_index(inplace=True)
+    Args:
+        tickers: {тикер: имя файла в data_dir}
+        interval: интервал свечей
+        end: конец диапазона (по умолчанию — сейчас)
+        workers: параллельных запросов
+        fetch: callback(ticker, start, end, interval) -> DataFrame (подменяется в проверках без сети)
 
-# Заменяем volume
-if 'Volume' in df.columns:
-    df.loc[df['Volume'] == 0, 'Volume'] = 100000
+    Returns:
+        dict: {тикер: число новых строк}
+    """
+    end = (end or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    delta = INTERVAL_DELTA[interval]
+    earliest = end - timedelta(days=HISTORY_DAYS[interval])
 
-# ==========================================
-# УПРАВЛЕНИЕ ПОРЯДКОМ КОЛОНОК
-# ==========================================
+    tasks = []
+    last_times = {}
+    for ticker, filename in tickers.items():
+        path = os.path.join(data_dir, filename)
+        last_time = read_last_time(path)
+        last_times[ticker] = last_time
+        start = earliest if last_time is None else max(earliest, (last_time + delta).to_pydatetime())
+        tasks.extend((ticker, chunk) for chunk in split_chunks(start, end, interval))
 
-# 1. Определяем желаемый порядок.
-# Примечание: yfinance для часовиков обычно называет колонку времени "Datetime".
-# "Adj Close" мы исключаем, так как он часто не нужен для бектестов.
-desired_columns = ['Datetime', 'Open', 'High', 'Low', 'Close', 'Volume']
+    def run(task):
+        ticker, (chunk_start, chunk_end) = task
+        return ticker, normalize(fetch(ticker, chunk_start, chunk_end, interval))
 
-# 2. (Опционально) Если вы хотите переименовать 'Datetime' просто в 'Date':
-df.rename(columns={'Datetime': 'Date'}, inplace=True)
-# Если переименовали, то и в списке выше поменяйте 'Datetime' на 'Date':
-desired_columns = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+    frames = {ticker: [] for ticker in tickers}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for ticker, df in pool.map(run, tasks):
+            frames[ticker].append(df)
 
-# 3. Применяем сортировку и фильтрацию
-# Этот код выберет только перечисленные колонки в указанном порядке.
-# Если какой-то колонки нет в данных (чтобы скрипт не упал), добавим проверку:
-final_cols = [c for c in desired_columns if c in df.columns]
-df = df[final_cols]
+    # Незакрытая текущая свеча еще изменится — не сохраняем
+    complete_before = pd.Timestamp(end).tz_convert("UTC")
+    added = {}
+    for ticker, filename in tickers.items():
+        chunks = [df for df in frames[ticker] if not df.empty]
+        if not chunks:
+            added[ticker] = 0
+            continue
+        df = pd.concat(chunks, ignore_index=True)
+        df = df.drop_duplicates("Date", keep="last").sort_values("Date", kind="mergesort")
+        df = df[df["Date"] + delta <= complete_before]
+        added[ticker] = merge_into_file(os.path.join(data_dir, filename), df, last_times[ticker])
+    return added
 
-# ==========================================
 
-os.makedirs("Data/custom", exist_ok=True)
-output_path = "Data/custom/btc_1h.csv"
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Загрузка свечей Yahoo Finance (несколько тикеров, с докачкой)")
+    parser.add_argument("tickers", nargs="*", help="TICKER или TICKER=file.csv (по умолчанию BTC-USD и SPY)")
+    parser.add_argument("--interval", default="1h", choices=sorted(CHUNK_DAYS))
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--workers", "-j", type=int, default=4)
+    args = parser.parse_args()
 
-# Сохраняем. header=False часто нужен для Lean Custom Data, 
-# но если вам нужен заголовок, оставьте header=True (по умолчанию).
-df.to_csv(output_path, index=False) 
+    tickers = TICKERS
+    if args.tickers:
+        tickers = {}
+        for item in args.tickers:
+            ticker, _, filename = item.partition("=")
+            tickers[ticker] = filename or f"{ticker.lower().replace('-', '_')}_{args.interval}.csv"
 
-print(f"Файл сохранен: {output_path}")
-print("Порядок колонок:")
-print(df.columns.tolist())
-print(df.head(1))
\ No newline at end of file
+    print(f"Скачиваем {', '.join(tickers)} ({args.interval}) с Yahoo Finance...")
+    for ticker, count in download(tickers, args.interval, data_dir=args.data_dir, workers=args.workers).items():
+        print(f"{ticker}: добавлено {count} строк -> {os.path.join(args.data_dir, tickers[ticker])}")
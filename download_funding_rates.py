@@ -0,0 +1,167 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+import os
+import shutil
+import tempfile
+import time
+
+from download_data_from_binance import DATA_DIR, get_json, make_session, to_ms
+
+FUTURES_BASE_URL = "https://fapi.binance.com"
+FUNDING_PATH = "/fapi/v1/fundingRate"
+EXCHANGE_INFO_PATH = "/fapi/v1/exchangeInfo"
+FUNDING_LIMIT = 1000
+
+# Формат, который читает BinanceFundingRateData: "YYYYMMDD HHMMSS,rate"
+FUNDING_DIR = os.path.join(DATA_DIR, "custom", "lean_funding_rates")
+QUOTE_ASSETS = ("USDT", "USDC", "BUSD")
+
+
+def output_path(symbol: str, out_dir: str = FUNDING_DIR) -> str:
+    """BTCUSDT -> .../binance_funding_rate_BTC.csv (USDC/BUSD-контракты — с суффиксом)"""
+    asset = symbol[:-4] if symbol.endswith("USDT") else symbol
+    return os.path.join(out_dir, f"binance_funding_rate_{asset}.csv")
+
+
+def format_time(ms: int) -> str:
+    return datetime.fromtimestamp(ms // 1000, tz=timezone.utc).strftime("%Y%m%d %H%M%S")
+
+
+def read_last_time(path: str):
+    """Последний сохраненный момент funding ("YYYYMMDD HHMMSS") или None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 1024))
+        tail = f.read().decode(errors="ignore")
+    for line in reversed(tail.splitlines()):
+        line = line.strip()
+        if len(line) > 15 and line[0].isdigit():
+            return line[:15]
+    return None
+
+
+def perpetual_symbols(session, base_url: str = FUTURES_BASE_URL) -> list:
+    """Все торгуемые бессрочные контракты"""
+    info = get_json(session, base_url + EXCHANGE_INFO_PATH, {})
+    return sorted(
+        s["symbol"] for s in info["symbols"]
+        if s.get("contractType") == "PERPETUAL" and s.get("status") == "TRADING"
+        and s.get("quoteAsset") in QUOTE_ASSETS
+    )
+
+
+def fetch_funding(session, symbol: str, start_ms: int, end_ms: int, base_url: str = FUTURES_BASE_URL) -> list:
+    """
+    Постранично качает историю funding.
+
+    Returns:
+        list: [("YYYYMMDD HHMMSS", rate_str)] по возрастанию времени, без повторов
+    """
+    rows = []
+    seen = set()
+    while start_ms <= end_ms:
+        params = {"symbol": symbol, "startTime": start_ms, "endTime": end_ms, "limit": FUNDING_LIMIT}
+        data = get_json(session, base_url + FUNDING_PATH, params)
+        if not data:
+            break
+        for item in data:
+            stamp = format_time(int(item["fundingTime"]))
+            if stamp not in seen:
+                seen.add(stamp)
+                rows.append((stamp, item["fundingRate"]))
+        start_ms = int(data[-1]["fundingTime"]) + 1
+        if len(data) < FUNDING_LIMIT:
+            break
+    rows.sort()
+    return rows
+
+
+def update_symbol(session, symbol: str, start_ms: int, end_ms: int, out_dir: str = FUNDING_DIR,
+                  base_url: str = FUTURES_BASE_URL) -> int:
+    """
+    Докачивает funding одного символа: с момента после последней сохраненной точки,
+    дописывает только новые моменты. Файл заменяется атомарно.
+
+    Returns:
+        int: число новых точек
+    """
+    path = output_path(symbol, out_dir)
+    last_time = read_last_time(path)
+    if last_time is not None:
+        last_ms = int(datetime.strptime(last_time, "%Y%m%d %H%M%S")
+                      .replace(tzinfo=timezone.utc).timestamp() * 1000)
+        start_ms = max(start_ms, last_ms + 1000)
+
+    rows = [row for row in fetch_funding(session, symbol, start_ms, end_ms, base_url)
+            if last_time is None or row[0] > last_time]
+    if not rows:
+        return 0
+
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", newline="") as out:
+            if last_time is not None:
+                with open(path) as existing:
+                    shutil.copyfileobj(existing, out)
+            out.writelines(f"{stamp},{rate}\n" for stamp, rate in rows)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(rows)
+
+
+def update_all(symbols: list, start_ms: int, end_ms: int, workers: int = 8, out_dir: str = FUNDING_DIR,
+               base_url: str = FUTURES_BASE_URL) -> dict:
+    """
+    Обновляет символы параллельно (не больше workers одновременно, общий пул соединений).
+
+    Returns:
+        dict: {symbol: число новых точек или Exception}
+    """
+    results = {}
+    with make_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(update_symbol, session, symbol, start_ms, end_ms, out_dir, base_url): symbol
+            for symbol in symbols
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                results[symbol] = e
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Загрузка истории funding rate Binance Futures (с докачкой)")
+    parser.add_argument("symbols", nargs="*", default=["BTCUSDT"], help="Символы (по умолчанию BTCUSDT)")
+    parser.add_argument("--all", action="store_true", help="Все бессрочные контракты биржи")
+    parser.add_argument("--start", default="2019-09-01", help="UTC: YYYY-MM-DD[ HH:MM]")
+    parser.add_argument("--end", default=None, help="UTC: YYYY-MM-DD[ HH:MM], по умолчанию — сейчас")
+    parser.add_argument("--out-dir", default=FUNDING_DIR)
+    parser.add_argument("--workers", "-j", type=int, default=8, help="Параллельных символов")
+    parser.add_argument("--base-url", default=FUTURES_BASE_URL, help="Адрес API (например, локальная заглушка)")
+    args = parser.parse_args()
+
+    symbols = args.symbols
+    if args.all:
+        with make_session(1) as session:
+            symbols = perpetual_symbols(session, args.base_url)
+    end_ms = to_ms(args.end) if args.end else int(time.time() * 1000)
+
+    started = time.time()
+    results = update_all(symbols, to_ms(args.start), end_ms, args.workers, args.out_dir, args.base_url)
+    failed = {s: r for s, r in results.items() if isinstance(r, Exception)}
+    added = sum(r for r in results.values() if not isinstance(r, Exception))
+    print(f"Символов: {len(symbols)}, новых точек: {added}, за {time.time() - started:.1f} с")
+    for symbol, error in sorted(failed.items()):
+        print(f"Ошибка {symbol}: {error}")
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Пересчет score по всей таблице метрик без повторных backtest'ов.
+
+ScoringStrategy.score_strategy считается внутри алгоритма по одной строке,
+и его результат записан в строку метрик прогона. Здесь та же формула
+считается колонками по всей таблице для любого профиля из SCORING_PROFILES:
+профиль — именованный и версионированный набор отсечек и весов. Колонка
+результата score_<имя>_v<версия>: правка весов профиля поднимает версию,
+и оценки разных версий не смешиваются.
+
+Профиль "default" повторяет ScoringStrategy и дает ровно те же значения,
+что и построчный расчет (включая поведение clamp на NaN и round до 3 знаков);
+проверка — флаг --verify.
+
+Примеры:
+    python batch_scoring.py --profile default --profile low_drawdown
+    python batch_scoring.py --verify
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from collect_results import load_results
+from fast_backtest import py_round
+from paths import STRATEGY_DIR
+
+# Признаки формулы: имя -> (колонка строки метрик, значение при отсутствии колонки).
+# Имена колонок — как читает ScoringStrategy (Expectancy и Average Holding Time с заглавной)
+FEATURES = {
+    "cagr": ("cagr", 0.0),
+    "dd": ("max_drawdown_pct", 1.0),
+    "sharpe": ("sharpe", 0.0),
+    "calmar": ("calmar", 0.0),
+    "pf": ("profit_factor", 0.0),
+    "total_trades": ("total_trades", 0),
+    "expectancy": ("Expectancy", 0.0),
+    "avg_holding": ("Average Holding Time", 0.0),
+}
+
+# Профиль: отсечки (min_trades, max_drawdown -> reject_score) и слагаемые
+# (признак, сдвиг, масштаб, min, max, вес): вес * clamp((признак - сдвиг) / масштаб, min, max).
+# Порядок слагаемых — порядок сложения; менять веса — только с новой версией
+SCORING_PROFILES = {
+    "default": {
+        "version": 1,
+        "min_trades": 30,
+        "max_drawdown": 0.35,
+        "reject_score": -999,
+        "terms": [
+            ("calmar", 0.0, 2.0, 0.0, 1.5, 2.0),
+            ("cagr", 0.0, 0.30, 0.0, 1.5, 1.5),
+            ("sharpe", 0.0, 2.0, 0.0, 1.2, 1.2),
+            ("pf", 1.0, 1.0, 0.0, 1.5, 1.0),
+            ("expectancy", 0.0, 0.5, -1.0, 1.5, 1.5),
+            ("dd", 0.0, 0.25, 0.0, 2.0, -2.5),
+            ("avg_holding", 0.0, 240, 0.0, 1.0, -0.5),
+        ],
+    },
+    # Тот же набор, но жестче к просадке: отсечка 25% и двойной штраф
+    "low_drawdown": {
+        "version": 1,
+        "min_trades": 30,
+        "max_drawdown": 0.25,
+        "reject_score": -999,
+        "terms": [
+            ("calmar", 0.0, 2.0, 0.0, 1.5, 2.0),
+            ("cagr", 0.0, 0.30, 0.0, 1.5, 1.5),
+            ("sharpe", 0.0, 2.0, 0.0, 1.2, 1.2),
+            ("pf", 1.0, 1.0, 0.0, 1.5, 1.0),
+            ("expectancy", 0.0, 0.5, -1.0, 1.5, 1.5),
+            ("dd", 0.0, 0.25, 0.0, 2.0, -5.0),
+            ("avg_holding", 0.0, 240, 0.0, 1.0, -0.5),
+        ],
+    },
+}
+
+DEFAULT_PROFILE = "default"
+
+# Знаков после запятой, как round(score, 3) в ScoringStrategy
+SCORE_DECIMALS = 3
+
+
+def score_column(profile: str) -> str:
+    return f"score_{profile}_v{SCORING_PROFILES[profile]['version']}"
+
+
+def _clamp(x: np.ndarray, lo: float, hi: float) -> np.ndarray:
+    # Как max(lo, min(hi, x)) в Python: NaN не меньше hi, поэтому clamp(NaN) = hi
+    x = np.where(x < hi, x, hi)
+    return np.where(x > lo, x, lo)
+
+
+def _feature(df: pd.DataFrame, name: str) -> np.ndarray:
+    column, default = FEATURES[name]
+    if column not in df.columns:
+        return np.full(len(df), float(default))
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)
+
+
+def score_table(df: pd.DataFrame, profile: str = DEFAULT_PROFILE) -> pd.Series:
+    """
+    score профиля для каждой строки таблицы метрик.
+
+    Строки без total_trades (NaN) получают NaN: построчный расчет на них
+    падает на int(NaN).
+
+    Returns:
+        pd.Series: score с индексом df
+    """
+    spec = SCORING_PROFILES[profile]
+    features = {name: _feature(df, name) for name in FEATURES}
+    features["dd"] = np.abs(features["dd"])
+    # int() в ScoringStrategy отбрасывает дробную часть
+    total_trades = np.trunc(features["total_trades"])
+
+    score = None
+    for name, offset, scale, lo, hi, weight in spec["terms"]:
+        term = _clamp((features[name] - offset) / scale, lo, hi)
+        if score is None:
+            score = weight * term
+        elif weight < 0:
+            score = score - (-weight) * term
+        else:
+            score = score + weight * term
+    score = py_round(score, SCORE_DECIMALS)
+
+    rejected = (total_trades < spec["min_trades"]) | (features["dd"] > spec["max_drawdown"])
+    score = np.where(rejected, float(spec["reject_score"]), score)
+    score = np.where(np.isnan(total_trades), np.nan, score)
+    return pd.Series(score, index=df.index, name=score_column(profile))
+
+
+def rescore(df: pd.DataFrame, profiles=(DEFAULT_PROFILE,)) -> pd.DataFrame:
+    """Колонки score_<профиль>_v<версия> для нескольких профилей"""
+    return df.assign(**{score_column(name): score_table(df, name) for name in profiles})
+
+
+def verify(df: pd.DataFrame) -> int:
+    """
+    Сравнение профиля default с ScoringStrategy.score_strategy по каждой строке.
+
+    Returns:
+        int: число строк с расхождением
+    """
+    sys.path.append(STRATEGY_DIR)
+    from ScoringStrategy import ScoringStrategy
+
+    batch = score_table(df, DEFAULT_PROFILE).to_numpy()
+    mismatches = 0
+    for k, row in enumerate(df.to_dict("records")):
+        try:
+            expected = ScoringStrategy.score_strategy(row)
+        except (TypeError, ValueError):
+            expected = np.nan
+        if not (expected == batch[k] or (np.isnan(expected) and np.isnan(batch[k]))):
+            mismatches += 1
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пересчет score по таблице метрик профилями весов")
+    parser.add_argument("--profile", action="append", choices=sorted(SCORING_PROFILES), default=None,
+                        help="Профиль (можно несколько; по умолчанию все)")
+    parser.add_argument("--top", type=int, default=20, help="Сколько прогонов вывести по первому профилю")
+    parser.add_argument("--verify", action="store_true",
+                        help="Сверить профиль default с построчным ScoringStrategy.score_strategy")
+    parser.add_argument("--csv", default=None, help="Сохранить таблицу в CSV")
+    args = parser.parse_args(argv)
+
+    df = load_results()
+    if df.empty:
+        print("Нет результатов в exports/results.db")
+        return 1
+
+    profiles = args.profile or sorted(SCORING_PROFILES)
+    started = time.perf_counter()
+    df = rescore(df, profiles)
+    print(f"Прогонов: {len(df)}, профилей: {len(profiles)} за {time.perf_counter() - started:.3f} с")
+
+    if args.verify:
+        mismatches = verify(df)
+        print(f"Сверка с ScoringStrategy: расхождений {mismatches}")
+        if mismatches:
+            return 1
+
+    columns = [score_column(name) for name in profiles]
+    df = df.sort_values([columns[0], "run_id"], ascending=[False, True], kind="mergesort")
+    pd.set_option("display.width", None)
+    shown = ["run_id"] + (["score"] if "score" in df.columns else []) + columns
+    print(df[shown].head(args.top).to_string(index=False))
+    if args.csv:
+        df.to_csv(args.csv, index=False)
+        print(f"\nСохранено в {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
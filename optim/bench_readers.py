@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк разбора строк в Reader'ах (без Lean).
+
+Сравнивает прежний разбор (strptime / срезы с int() на каждую строку) с BarParsing
+на синтетических строках в форматах файлов BinanceHourlyBTC, YahooHourlyCrypto
+и BinanceFundingRateData: проверяет, что результаты совпадают, и печатает строк/сек.
+Также проверяет, что копии BarParsing.py в проектах одинаковые.
+"""
+
+import argparse
+from datetime import datetime, timedelta
+import filecmp
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from paths import PROJECT_ROOT, STRATEGY_DIR
+
+sys.path.append(STRATEGY_DIR)
+
+from BarParsing import parse_ohlcv_line, parse_value_line
+
+PARSER_COPIES = [
+    os.path.join(STRATEGY_DIR, "BarParsing.py"),
+    os.path.join(PROJECT_ROOT, "MyOfflineStrategy", "BarParsing.py"),
+]
+
+
+# ===== ПРЕЖНИЙ РАЗБОР (как был в Reader'ах) =====
+
+def legacy_ohlcv(line):
+    if not (line.strip() and line[0].isdigit()): return None
+    try:
+        items = line.split(',')
+        t = datetime.strptime(items[0][:19], "%Y-%m-%d %H:%M:%S")
+        close = float(items[4])
+        vol = 0
+        if len(items) > 5 and items[5].strip():
+            vol = float(items[5])
+        return t, float(items[1]), float(items[2]), float(items[3]), close, vol if vol > 0 else 100000.0
+    except ValueError:
+        return None
+
+
+def legacy_value(line):
+    if not line or line.strip() == "":
+        return None
+    try:
+        parts = line.strip().split(',')
+        if len(parts) != 2:
+            return None
+        date_str = parts[0].strip()
+        if len(date_str) != 15:
+            return None
+        t = datetime(int(date_str[0:4]), int(date_str[4:6]), int(date_str[6:8]),
+                     int(date_str[9:11]), int(date_str[11:13]), int(date_str[13:15]))
+        return t, float(parts[1].strip())
+    except (ValueError, IndexError):
+        return None
+
+
+# ===== СИНТЕТИЧЕСКИЕ ФАЙЛЫ =====
+
+def binance_lines(n):
+    start = datetime(2020, 1, 1)
+    lines = ["Date,Open,High,Low,Close,Volume"]
+    for i in range(n):
+        t = start + timedelta(hours=i)
+        lines.append(f"{t:%Y-%m-%d %H:%M:%S}+00:00,42000.1{i % 10},42100.5,41900.25,42050.7{i % 7},{i % 5}.12345")
+    return lines
+
+
+def yahoo_lines(n):
+    start = datetime(2020, 1, 1)
+    lines = ["Datetime,Open,High,Low,Close,Volume"]
+    for i in range(n):
+        t = start + timedelta(hours=i)
+        vol = "" if i % 3 == 0 else str(1000 + i)
+        lines.append(f"{t:%Y-%m-%d %H:%M:%S}+00:00,42000.123,42100.5,41900.25,42050.75,{vol}")
+    return lines
+
+
+def funding_lines(n):
+    start = datetime(2020, 1, 1)
+    return [f"{start + timedelta(hours=8 * i):%Y%m%d %H%M%S},0.000{i % 9}1" for i in range(n)]
+
+
+def measure(func, lines, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for line in lines:
+            func(line)
+        best = min(best, time.perf_counter() - started)
+    return len(lines) / best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора строк Reader'ов")
+    parser.add_argument("--lines", type=int, default=200000, help="Строк на формат")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов (берется лучший)")
+    args = parser.parse_args(argv)
+
+    if not filecmp.cmp(*PARSER_COPIES, shallow=False):
+        print("Копии BarParsing.py различаются: " + ", ".join(PARSER_COPIES))
+        return 1
+
+    cases = [
+        ("BinanceHourlyBTC", binance_lines(args.lines), legacy_ohlcv, parse_ohlcv_line),
+        ("YahooHourlyCrypto", yahoo_lines(args.lines), legacy_ohlcv, parse_ohlcv_line),
+        ("BinanceFundingRateData", funding_lines(args.lines), legacy_value, parse_value_line),
+    ]
+
+    failed = 0
+    print(f"{'reader':<24}{'прежний, строк/с':>20}{'BarParsing, строк/с':>22}{'ускорение':>12}")
+    for name, lines, legacy, fast in cases:
+        mismatches = sum(legacy(line) != fast(line) for line in lines)
+        if mismatches:
+            failed += 1
+            print(f"{name}: {mismatches} строк разобраны иначе, чем прежним Reader'ом")
+            continue
+        old_rate = measure(legacy, lines, args.repeat)
+        new_rate = measure(fast, lines, args.repeat)
+        print(f"{name:<24}{old_rate:>20,.0f}{new_rate:>22,.0f}{new_rate / old_rate:>11.1f}x")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарки компонентов стратегии без Lean.
+
+AlgorithmImports подменяется заглушкой (lean_stubs.py), поэтому модули
+DonchianWithFunding / MyOfflineStrategy импортируются как обычный Python.
+Измеряется:
+- Reader'ы BinanceHourlyBTC, YahooHourlyCrypto и BinanceFundingRateData
+  на синтетических многолетних файлах (чтение файла + Reader на каждую строку);
+- FundingZScore при нескольких длинах окна;
+- PositionManager.calculate_position_size и get_*_multiplier;
+- TradeContext.close + to_dict;
+- TradeLogger.export_to_csv на 100k сделок;
+- ScoringStrategy.score_strategy и batch_scoring.score_table по той же таблице;
+- generate_runs.
+
+Время каждого случая — лучшее из --repeat повторов. Результат пишется в JSON
+(exports/bench/latest.json) и сравнивается с базовым (exports/bench/baseline.json):
+случаи, ставшие медленнее больше чем на --tolerance, считаются регрессией
+(код возврата 1). Базовый файл записывается флагом --save-baseline.
+
+Примеры:
+    python bench_suite.py --save-baseline
+    python bench_suite.py --only reader --repeat 10
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+import lean_stubs
+
+lean_stubs.install()
+
+from batch_scoring import score_table
+from bench_readers import binance_lines, funding_lines, yahoo_lines
+from generate_runs import generate_runs
+from paths import BENCH_DIR, PROJECT_ROOT, STRATEGY_DIR
+
+sys.path.append(STRATEGY_DIR)
+
+from BinanceFundingRateData import BinanceFundingRateData  # noqa: E402
+from BinanceHourlyBTC import BinanceHourlyBTC  # noqa: E402
+from RollingIndicators import RollingZScore  # noqa: E402
+from ScoringStrategy import ScoringStrategy  # noqa: E402
+from TradeContext import TradeContext  # noqa: E402
+from TradeLogger import TradeLogger  # noqa: E402
+from main import DonchianBTCWithFunding, PositionManager  # noqa: E402
+
+RESULTS_PATH = os.path.join(BENCH_DIR, "latest.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+FUNDING_WINDOWS = (24, 168, 720, 2160)
+HOURS_PER_YEAR = 24 * 365
+
+
+def _load_module(path: str, name: str):
+    # YahooHourlyCrypto лежит в другом проекте Lean; BarParsing у проектов одинаковый
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+YahooHourlyCrypto = _load_module(
+    os.path.join(PROJECT_ROOT, "MyOfflineStrategy", "YahooHourlyCrypto.py"), "YahooHourlyCrypto"
+).YahooHourlyCrypto
+
+
+# ===== CASES =====
+# Случай — функция (args, workdir) -> (число операций, функция одного повтора)
+
+def _reader_case(data_type, lines, workdir, filename):
+    path = os.path.join(workdir, filename)
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    reader = data_type()
+    config = lean_stubs.SubscriptionDataConfig("BTC")
+    date = datetime(2020, 1, 1)
+
+    def run():
+        with open(path) as f:
+            for line in f:
+                reader.Reader(config, line.rstrip("\n"), date, False)
+    return len(lines), run
+
+
+def case_reader_binance(args, workdir):
+    return _reader_case(BinanceHourlyBTC, binance_lines(args.years * HOURS_PER_YEAR), workdir, "binance_1h.csv")
+
+
+def case_reader_yahoo(args, workdir):
+    return _reader_case(YahooHourlyCrypto, yahoo_lines(args.years * HOURS_PER_YEAR), workdir, "btc_1h.csv")
+
+
+def case_reader_funding(args, workdir):
+    return _reader_case(BinanceFundingRateData, funding_lines(args.years * 3 * 365), workdir, "funding.csv")
+
+
+def _funding_zscore_case(window):
+    def case(args, workdir):
+        rng = random.Random(window)
+        rates = [rng.gauss(0.0001, 0.0002) for _ in range(args.ops)]
+        algorithm = DonchianBTCWithFunding()
+        algorithm.min_funding_samples = 30
+
+        def run():
+            stats = RollingZScore("funding_z", window)
+            algorithm.funding_stats = stats
+            for rate in rates:
+                stats.Add(rate)
+                algorithm.last_funding_rate = rate
+                algorithm.FundingZScore()
+        return len(rates), run
+    return case
+
+
+def _position_manager():
+    return PositionManager(
+        price_round=2, atr_stop_negative=3.0, atr_stop_neutral=2.0, atr_stop_positive=2.0,
+        risk_boost_negative=1.5, risk_neutral=1.0, risk_cut_positive=0.5)
+
+
+def case_position_size(args, workdir):
+    manager = _position_manager()
+    rng = random.Random(1)
+    inputs = [(rng.uniform(200, 900), rng.uniform(50000, 150000), rng.uniform(30000, 100000), rng.uniform(-3, 3))
+              for _ in range(args.ops)]
+
+    def run():
+        for atr, portfolio_value, price, z in inputs:
+            manager.calculate_position_size(atr, portfolio_value, price, z, 0.01, 0.003, 0.02)
+    return len(inputs), run
+
+
+def case_multipliers(args, workdir):
+    manager = _position_manager()
+    rng = random.Random(2)
+    zs = [rng.uniform(-3, 3) for _ in range(args.ops)]
+
+    def run():
+        for z in zs:
+            manager.get_atr_stop_multiplier(z)
+            manager.get_risk_multiplier(z)
+    return len(zs), run
+
+
+def _trade_context(i, start=datetime(2024, 1, 1)):
+    entry_time = start + timedelta(hours=i)
+    return TradeContext(
+        entry_time=entry_time, entry_price=42000.0 + i % 500, quantity=0.5, funding_z=(i % 7) - 3.0,
+        atr_at_entry=350.0, stop_multiplier=2.0, risk_multiplier=1.0, initial_stop=41300.0,
+        features={"session": "Europe", "bucket": "-1.0:1.0", "funding": 0.0001, "entry_hour": entry_time.hour},
+    )
+
+
+def case_trade_context(args, workdir):
+    contexts = [_trade_context(i) for i in range(args.ops)]
+    exits = [(tc.entry_time + timedelta(hours=1 + i % 90), tc.entry_price * 1.01) for i, tc in enumerate(contexts)]
+
+    def run():
+        for tc, (exit_time, exit_price) in zip(contexts, exits):
+            tc.close(exit_time, exit_price, "StopMarket")
+            tc.to_dict()
+    return len(contexts), run
+
+
+def case_trade_logger_csv(args, workdir):
+    logger = TradeLogger(export_path=os.path.join(workdir, "trade_logger"))
+    for i in range(args.trades):
+        tc = _trade_context(i)
+        tc.close(tc.entry_time + timedelta(hours=5), tc.entry_price * 1.01, "Market")
+        logger.log_trade(tc)
+
+    def run():
+        logger.export_to_csv()
+    return args.trades, run
+
+
+def _score_rows(ops):
+    rng = random.Random(3)
+    return [{
+        "cagr": rng.uniform(-0.2, 0.8), "max_drawdown_pct": rng.uniform(0.05, 0.4),
+        "sharpe": rng.uniform(-1, 3), "calmar": rng.uniform(-1, 4), "profit_factor": rng.uniform(0.5, 2.5),
+        "total_trades": rng.randint(10, 400),
+    } for _ in range(ops)]
+
+
+def case_score_strategy(args, workdir):
+    rows = _score_rows(args.ops)
+
+    def run():
+        for row in rows:
+            ScoringStrategy.score_strategy(row)
+    return len(rows), run
+
+
+def case_score_table(args, workdir):
+    table = pd.DataFrame(_score_rows(args.ops))
+
+    def run():
+        score_table(table)
+    return len(table), run
+
+
+def case_generate_runs(args, workdir):
+    calls = max(1, args.ops // 100)
+
+    def run():
+        for _ in range(calls):
+            generate_runs()
+    return calls, run
+
+
+CASES = {
+    "reader_binance_hourly_btc": case_reader_binance,
+    "reader_yahoo_hourly_crypto": case_reader_yahoo,
+    "reader_binance_funding_rate": case_reader_funding,
+    **{f"funding_zscore_w{window}": _funding_zscore_case(window) for window in FUNDING_WINDOWS},
+    "position_manager_size": case_position_size,
+    "position_manager_multipliers": case_multipliers,
+    "trade_context_close_to_dict": case_trade_context,
+    "trade_logger_export_csv": case_trade_logger_csv,
+    "score_strategy": case_score_strategy,
+    "score_table": case_score_table,
+    "generate_runs": case_generate_runs,
+}
+
+
+# ===== RUN / COMPARE =====
+
+def measure(run, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run_suite(args) -> dict:
+    names = [name for name in CASES if not args.only or any(part in name for part in args.only)]
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    results = {}
+    try:
+        for name in names:
+            ops, run = CASES[name](args, workdir)
+            seconds = measure(run, args.repeat)
+            results[name] = {
+                "ops": ops,
+                "seconds": seconds,
+                "ops_per_sec": ops / seconds if seconds > 0 else float("inf"),
+                "us_per_op": seconds / ops * 1e6,
+            }
+            print(f"{name:<32}{ops:>10,}{results[name]['us_per_op']:>14.3f} us/op"
+                  f"{results[name]['ops_per_sec']:>16,.0f} op/s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"years": args.years, "ops": args.ops, "trades": args.trades, "repeat": args.repeat},
+        "cases": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Сравнение с базовым запуском по us_per_op.
+
+    Returns:
+        list: имена случаев, ставших медленнее больше чем на tolerance
+    """
+    regressions = []
+    print(f"\nСравнение с базовым запуском от {baseline.get('created', '?')}:")
+    for name, result in current["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            print(f"{name:<32}{'нет в базовом':>20}")
+            continue
+        change = result["us_per_op"] / base["us_per_op"] - 1.0
+        mark = ""
+        if change > tolerance:
+            mark = "  РЕГРЕССИЯ"
+            regressions.append(name)
+        print(f"{name:<32}{base['us_per_op']:>12.3f} -> {result['us_per_op']:>10.3f} us/op{change:>+9.1%}{mark}")
+    return regressions
+
+
+def _write_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Микробенчмарки компонентов стратегии без Lean")
+    parser.add_argument("--years", type=int, default=4, help="Лет в синтетических файлах Reader'ов")
+    parser.add_argument("--ops", type=int, default=100000, help="Операций в случаях без файлов")
+    parser.add_argument("--trades", type=int, default=100000, help="Сделок для TradeLogger.export_to_csv")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов (берется лучший)")
+    parser.add_argument("--only", action="append", default=None, help="Только случаи, содержащие подстроку")
+    parser.add_argument("--output", default=RESULTS_PATH, help="JSON с результатом")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="JSON базового запуска")
+    parser.add_argument("--save-baseline", action="store_true", help="Записать результат как базовый")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Допустимое замедление относительно базового (доля)")
+    args = parser.parse_args(argv)
+
+    result = run_suite(args)
+    _write_json(args.output, result)
+    print(f"\nРезультат: {args.output}")
+
+    if args.save_baseline:
+        _write_json(args.baseline, result)
+        print(f"Базовый запуск: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"Базового запуска нет ({args.baseline}), сравнение пропущено; см. --save-baseline")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(result, baseline, args.tolerance)
+    if regressions:
+        print(f"\nРегрессии ({len(regressions)}): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,213 @@
 """
-Загрузка результатов из CSV файла.
+Загрузка результатов: SQLite-хранилище метрик (results.db), для старых прогонов — CSV.
 """
 
+import glob
+import numpy as np
 import pandas as pd
 import os
 import sys
 
+from paths import (
+    HOST_EXPORTS_DIR, LEGACY_METRICS_FILENAME, RESULTS_DB, RESULTS_FILENAME, STRATEGY_DIR,
+    WALK_FORWARD_DIR, run_export_dir
+)
 
-def load_results() -> pd.DataFrame:
+sys.path.append(STRATEGY_DIR)
+from ResultsStore import ResultsStore
+from TradeSink import FILE_SUFFIX, read_trade_log
+from EquitySink import FILE_SUFFIX as EQUITY_FILE_SUFFIX, read_equity_log
+
+
+def read_store(path: str) -> pd.DataFrame:
     """
-    Загружает метрики из CSV файла.
+    Читает все строки метрик из results.db.
     
     Returns:
-        pd.DataFrame: DataFrame с метриками. Пустой DataFrame если файл не существует.
+        pd.DataFrame: DataFrame с метриками (без служебных колонок хранилища)
+    """
+    with ResultsStore(path) as store:
+        columns, rows = store.query(order_by="run_id")
+    return pd.DataFrame(rows, columns=columns)
+
+
+def load_results() -> pd.DataFrame:
     """
-    # Путь относительно корня проекта
-    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    path = os.path.join(project_root, "Data", "exports", "run_metrics.csv")
+    Загружает метрики всех прогонов из общего хранилища (или старого run_metrics.csv).
     
-    if not os.path.exists(path):
-        return pd.DataFrame()
+    Returns:
+        pd.DataFrame: DataFrame с метриками. Пустой DataFrame если файла нет.
+    """
+    legacy_path = os.path.join(HOST_EXPORTS_DIR, LEGACY_METRICS_FILENAME)
     
     try:
-        df = pd.read_csv(path)
-        return df
+        if os.path.exists(RESULTS_DB):
+            return read_store(RESULTS_DB)
+        if os.path.exists(legacy_path):
+            return pd.read_csv(legacy_path)
     except Exception as e:
-        print(f"Ошибка при загрузке CSV: {e}", file=sys.stderr)
+        print(f"Ошибка при загрузке результатов: {e}", file=sys.stderr)
+    return pd.DataFrame()
+
+
+def publish_run(run_dir: str, path: str = RESULTS_DB) -> int:
+    """
+    Переносит строки метрик прогона из его results.db в общее хранилище.
+    
+    Args:
+        run_dir: Папка с results.db прогона (папка экспорта или запись кэша)
+        path: Общее хранилище
+        
+    Returns:
+        int: Число перенесенных строк (0 если у прогона нет results.db)
+    """
+    source = os.path.join(run_dir, RESULTS_FILENAME)
+    if not os.path.exists(source):
+        return 0
+    
+    with ResultsStore(source) as store:
+        rows = store.rows()
+    
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with ResultsStore(path) as store:
+        for row, param_names in rows:
+            store.insert(row, param_names)
+    return len(rows)
+
+
+def load_run_results(run_ids: list, run_dirs: list = None) -> pd.DataFrame:
+    """
+    Собирает метрики прогонов из их отдельных папок экспорта в одну таблицу.
+    
+    Строки идут в порядке run_ids, а не в порядке завершения прогонов.
+    
+    Args:
+        run_ids: Список идентификаторов прогонов оптимизатора
+        run_dirs: Папки с results.db (или run_metrics.csv) для каждого run_id
+            (по умолчанию — папки экспорта прогонов)
+        
+    Returns:
+        pd.DataFrame: DataFrame с метриками и колонкой optim_run_id.
+            Прогоны без метрик пропускаются.
+    """
+    if run_dirs is None:
+        run_dirs = [run_export_dir(run_id) for run_id in run_ids]
+    
+    frames = []
+    for run_id, run_dir in zip(run_ids, run_dirs):
+        path = os.path.join(run_dir, RESULTS_FILENAME)
+        legacy_path = os.path.join(run_dir, LEGACY_METRICS_FILENAME)
+        
+        try:
+            if os.path.exists(path):
+                df = read_store(path)
+            elif os.path.exists(legacy_path):
+                df = pd.read_csv(legacy_path)
+            else:
+                print(f"[{run_id}] Нет метрик прогона, прогон пропущен", file=sys.stderr)
+                continue
+        except Exception as e:
+            print(f"[{run_id}] Ошибка при загрузке метрик: {e}", file=sys.stderr)
+            continue
+        
+        df["optim_run_id"] = run_id
+        frames.append(df)
+    
+    if not frames:
         return pd.DataFrame()
+    
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+
+def read_run_trades(run_dir: str):
+    """
+    Сделки прогона колонками: <strategy_version_run>.trades.zip или старый trade_log.csv.
+    
+    Returns:
+        dict | None: {колонка: np.ndarray} (+ strategy_version_run), None если сделок нет
+    """
+    paths = sorted(glob.glob(os.path.join(run_dir, "*" + FILE_SUFFIX)))
+    if paths:
+        columns = read_trade_log(paths[-1])
+        n = len(next(iter(columns.values()))) if columns else 0
+        version = os.path.basename(paths[-1])[:-len(FILE_SUFFIX)]
+        columns["strategy_version_run"] = np.full(n, version)
+        return columns
+    
+    legacy_path = os.path.join(run_dir, "trade_log.csv")
+    if os.path.exists(legacy_path):
+        df = pd.read_csv(legacy_path, parse_dates=["entry_time", "exit_time"])
+        return {name: df[name].to_numpy() for name in df.columns}
+    return None
+
+
+def read_run_equity(run_dir: str):
+    """
+    Часовая кривая equity прогона (<strategy_version_run>.equity.bin).
+    
+    Returns:
+        tuple | None: (время datetime64[s], equity float32), None если файла нет
+    """
+    paths = sorted(glob.glob(os.path.join(run_dir, "*" + EQUITY_FILE_SUFFIX)))
+    if not paths:
+        return None
+    return read_equity_log(paths[-1])
+
+
+def load_trade_logs(run_ids: list, run_dirs: list = None) -> pd.DataFrame:
+    """
+    Склеивает сделки многих прогонов в один DataFrame.
+    
+    Колонки прогонов склеиваются np.concatenate и превращаются в DataFrame
+    один раз, без построчного разбора.
+    
+    Args:
+        run_ids: Идентификаторы прогонов оптимизатора
+        run_dirs: Папки прогонов (по умолчанию — папки экспорта)
+        
+    Returns:
+        pd.DataFrame: Сделки с колонкой optim_run_id. Прогоны без сделок пропускаются.
+    """
+    if run_dirs is None:
+        run_dirs = [run_export_dir(run_id) for run_id in run_ids]
+    
+    runs = []
+    for run_id, run_dir in zip(run_ids, run_dirs):
+        try:
+            columns = read_run_trades(run_dir)
+        except Exception as e:
+            print(f"[{run_id}] Ошибка при загрузке сделок: {e}", file=sys.stderr)
+            continue
+        if columns:
+            runs.append((run_id, columns))
+    
+    if not runs:
+        return pd.DataFrame()
+    
+    # Колонки, которые есть у всех прогонов
+    names = [name for name in runs[0][1] if all(name in columns for _, columns in runs)]
+    data = {name: np.concatenate([columns[name] for _, columns in runs]) for name in names}
+    data["optim_run_id"] = np.repeat([run_id for run_id, _ in runs],
+                                     [len(columns[names[0]]) for _, columns in runs])
+    return pd.DataFrame(data)
+
+
+def load_walk_forward_results() -> pd.DataFrame:
+    """
+    Загружает склеенные OOS-метрики всех walk-forward прогонов (по строке на прогон).
+    
+    Returns:
+        pd.DataFrame: DataFrame с метриками. Пустой DataFrame если прогонов нет.
+    """
+    paths = sorted(glob.glob(os.path.join(WALK_FORWARD_DIR, "*", "run_metrics.csv")))
+    frames = []
+    for path in paths:
+        try:
+            frames.append(pd.read_csv(path))
+        except Exception as e:
+            print(f"Ошибка при загрузке CSV {path}: {e}", file=sys.stderr)
+    
+    if not frames:
+        return pd.DataFrame()
+    
+    return pd.concat(frames, ignore_index=True, sort=False)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Проверка качества CSV с рыночными данными и индекс по дням.
+
+Файл читается один раз целиком, все проверки векторные:
+- строки, которые Reader молча пропустит (не разбираются);
+- дубликаты времени, нарушения порядка, пропуски (шаг больше ожидаемого);
+- OHLC-несогласованность (high < max(open, close), low > min(open, close), цены <= 0);
+- бары, где Reader подставит объем FALLBACK_VOLUME (объема нет или он <= 0).
+
+Рядом с файлом пишется индекс <file>.idx.json: байтовые смещения и число строк
+на каждый день, crc32 каждого дня и sha256 всего файла. По индексу другие
+инструменты находят день без сканирования файла, а актуальность индекса
+проверяется по размеру и mtime.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from paths import STRATEGY_DATA_FILES
+
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 1
+
+# Форматы файлов стратегии: свечи BinanceHourlyBTC / YahooHourlyCrypto и funding
+FORMATS = {
+    "bars": {"time_len": 19, "time_format": "%Y-%m-%d %H:%M:%S", "step": "1h"},
+    "funding": {"time_len": 15, "time_format": "%Y%m%d %H%M%S", "step": "8h"},
+}
+
+MAX_LISTED = 20
+
+
+def split_lines(raw: bytes):
+    """
+    Делит файл на строки без цикла Python по байтам.
+
+    Returns:
+        tuple: (список строк, np.ndarray начал строк, np.ndarray концов строк с \\n)
+    """
+    buf = np.frombuffer(raw, dtype=np.uint8)
+    newlines = np.flatnonzero(buf == 10)
+    ends = newlines + 1
+    if len(raw) and (not len(newlines) or newlines[-1] != len(raw) - 1):
+        ends = np.append(ends, len(raw))
+    starts = np.concatenate(([0], ends[:-1])) if len(ends) else np.array([], dtype=np.int64)
+    lines = raw.decode(errors="replace").split("\n")
+    if raw.endswith(b"\n"):
+        lines.pop()
+    return lines, starts.astype(np.int64), ends.astype(np.int64)
+
+
+def detect_format(lines: list) -> str:
+    for line in lines:
+        if line[:1].isdigit():
+            return "bars" if line[4:5] == "-" else "funding"
+    return "bars"
+
+
+def scan(path: str, fmt: str = None, step: str = None) -> dict:
+    """
+    Проверяет файл.
+
+    Args:
+        path: CSV свечей или funding
+        fmt: "bars" / "funding" (по умолчанию — по первой строке данных)
+        step: ожидаемый шаг времени (по умолчанию 1h для свечей, 8h для funding)
+
+    Returns:
+        dict: отчет (счетчики и примеры) и "_frame"/"_raw" для построения индекса
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    lines, starts, ends = split_lines(raw)
+    fmt = fmt or detect_format(lines)
+    spec = FORMATS[fmt]
+    step = pd.Timedelta(step or spec["step"])
+
+    df = pd.DataFrame({"line": pd.Series(lines, dtype=object)})
+    df["line_no"] = np.arange(1, len(df) + 1)
+    df["start"] = starts[:len(df)]
+    df["end"] = ends[:len(df)]
+
+    stripped = df["line"].str.strip()
+    is_data = stripped.str.match(r"^\d").fillna(False)
+    parts = stripped[is_data].str.split(",", expand=True)
+    data = df[is_data].copy()
+    data["time"] = pd.to_datetime(
+        parts[0].str.strip().str[:spec["time_len"]], format=spec["time_format"], errors="coerce"
+    )
+
+    if fmt == "bars":
+        for i, col in enumerate(("open", "high", "low", "close", "volume"), start=1):
+            values = parts[i] if i in parts.columns else pd.Series(np.nan, index=parts.index)
+            data[col] = pd.to_numeric(values, errors="coerce")
+        parsed = data["time"].notna() & data[["open", "high", "low", "close"]].notna().all(axis=1)
+    else:
+        data["value"] = pd.to_numeric(parts[1] if 1 in parts.columns else np.nan, errors="coerce")
+        parsed = data["time"].notna() & data["value"].notna() & (parts.notna().sum(axis=1) == 2)
+
+    blank = (stripped == "").sum()
+    # Нецифровая первая строка — заголовок; такие же строки дальше Reader молча пропускает
+    skipped = ~is_data & (stripped != "")
+    header = int(skipped.iloc[0]) if len(df) else 0
+    skipped.iloc[:1] = False
+    bad = pd.concat([data[~parsed], df[skipped]]).sort_values("line_no")
+    good = data[parsed]
+
+    times = good["time"].values
+    diffs = np.diff(times).astype("timedelta64[s]")
+    non_monotonic = np.flatnonzero(diffs < np.timedelta64(0, "s"))
+    duplicated = good["time"].duplicated(keep="first").values
+
+    ordered = np.sort(np.unique(times))
+    gaps_at = np.flatnonzero(np.diff(ordered) > step.to_timedelta64())
+    gaps = [
+        {
+            "after": str(pd.Timestamp(ordered[i])),
+            "before": str(pd.Timestamp(ordered[i + 1])),
+            "missing": int((ordered[i + 1] - ordered[i]) / step.to_timedelta64()) - 1,
+        }
+        for i in gaps_at
+    ]
+
+    report = {
+        "path": path,
+        "format": fmt,
+        "lines": len(df),
+        "rows": int(len(good)),
+        "first_time": str(pd.Timestamp(ordered[0])) if len(ordered) else None,
+        "last_time": str(pd.Timestamp(ordered[-1])) if len(ordered) else None,
+        "header_lines": int(header),
+        "blank_lines": int(blank),
+        "unparsable": _lines(bad),
+        "duplicates": _lines(good[duplicated]),
+        "non_monotonic": _lines(good.iloc[non_monotonic + 1]),
+        "gaps": {"count": len(gaps), "missing_rows": int(sum(g["missing"] for g in gaps)),
+                 "examples": gaps[:MAX_LISTED]},
+    }
+
+    if fmt == "bars":
+        o, h, l, c = (good[col].values for col in ("open", "high", "low", "close"))
+        ohlc_bad = (h < np.maximum(o, c)) | (l > np.minimum(o, c)) | (h < l) | (np.minimum.reduce([o, h, l, c]) <= 0)
+        volume = good["volume"].values
+        report["ohlc_inconsistent"] = _lines(good[ohlc_bad])
+        report["volume_substituted"] = _lines(good[~(volume > 0)])
+
+    report["_frame"] = good
+    report["_raw"] = raw
+    return report
+
+
+def _lines(rows: pd.DataFrame) -> dict:
+    return {"count": int(len(rows)), "line_numbers": rows["line_no"].head(MAX_LISTED).tolist()}
+
+
+# ===== INDEX =====
+
+def index_path(path: str) -> str:
+    return path + INDEX_SUFFIX
+
+
+def build_index(path: str, report: dict) -> dict:
+    """Индекс по дням из результата scan (файл уже прочитан)"""
+    good = report["_frame"]
+    raw = report["_raw"]
+    stat = os.stat(path)
+
+    days = {}
+    if len(good):
+        keys = good["time"].dt.strftime("%Y%m%d").values
+        grouped = pd.DataFrame({"day": keys, "start": good["start"].values, "end": good["end"].values})
+        bounds = grouped.groupby("day", sort=True).agg(start=("start", "min"), end=("end", "max"),
+                                                      rows=("start", "size"))
+        for day, row in bounds.iterrows():
+            start, end = int(row["start"]), int(row["end"])
+            days[day] = [start, end - start, int(row["rows"]), zlib.crc32(raw[start:end])]
+
+    return {
+        "version": INDEX_VERSION,
+        "source": os.path.basename(path),
+        "format": report["format"],
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hashlib.sha256(raw).hexdigest(),
+        "rows": report["rows"],
+        "first_time": report["first_time"],
+        "last_time": report["last_time"],
+        # день: [смещение, длина в байтах, строк, crc32]
+        "days": days,
+    }
+
+
+def write_index(path: str, index: dict) -> str:
+    target = index_path(path)
+    tmp = target + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp, target)
+    return target
+
+
+def load_index(path: str):
+    """
+    Индекс файла, если он актуален (совпадают размер и mtime), иначе None.
+    Проверка не читает сам файл.
+    """
+    target = index_path(path)
+    if not (os.path.exists(path) and os.path.exists(target)):
+        return None
+    with open(target) as f:
+        index = json.load(f)
+    stat = os.stat(path)
+    if (index.get("version") != INDEX_VERSION or index.get("size") != stat.st_size
+            or index.get("mtime_ns") != stat.st_mtime_ns):
+        return None
+    return index
+
+
+def read_day(path: str, index: dict, day: str, verify: bool = True):
+    """
+    Строки одного дня (day = YYYYMMDD) по индексу: seek + read без сканирования файла.
+
+    Returns:
+        list: строки дня ([] если дня нет в индексе)
+
+    Raises:
+        ValueError: crc32 прочитанных байт не совпал с индексом
+    """
+    entry = index["days"].get(day)
+    if entry is None:
+        return []
+    offset, length, _, crc = entry
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read(length)
+    if verify and zlib.crc32(chunk) != crc:
+        raise ValueError(f"{path}: день {day} не совпадает с индексом")
+    return [line for line in chunk.decode().splitlines() if line[:1].isdigit()]
+
+
+# ===== CLI =====
+
+def print_report(report: dict) -> int:
+    """Печатает отчет; возвращает число найденных проблем"""
+    print(f"\n{report['path']} ({report['format']}): строк данных {report['rows']}, "
+          f"{report['first_time']} — {report['last_time']}")
+    checks = ["unparsable", "duplicates", "non_monotonic", "ohlc_inconsistent", "volume_substituted"]
+    problems = 0
+    for name in checks:
+        if name not in report:
+            continue
+        item = report[name]
+        problems += item["count"]
+        if item["count"]:
+            print(f"  {name}: {item['count']} (строки: {item['line_numbers']})")
+    gaps = report["gaps"]
+    problems += gaps["count"]
+    if gaps["count"]:
+        print(f"  gaps: {gaps['count']}, пропущено строк: {gaps['missing_rows']}")
+        for gap in gaps["examples"]:
+            print(f"    {gap['after']} -> {gap['before']} ({gap['missing']})")
+    if not problems:
+        print("  проблем не найдено")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка качества CSV и индекс по дням")
+    parser.add_argument("files", nargs="*", help="CSV (по умолчанию — файлы DonchianWithFunding)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default=None)
+    parser.add_argument("--step", default=None, help="Ожидаемый шаг времени (например 1h, 8h)")
+    parser.add_argument("--no-index", action="store_true", help="Не писать индекс")
+    parser.add_argument("--json", action="store_true", help="Отчет в JSON")
+    parser.add_argument("--strict", action="store_true", help="Код возврата 1 при любых проблемах")
+    args = parser.parse_args(argv)
+
+    total = 0
+    reports = []
+    for path in args.files or STRATEGY_DATA_FILES:
+        report = scan(path, args.format, args.step)
+        if not args.no_index:
+            write_index(path, build_index(path, report))
+        if args.json:
+            reports.append({k: v for k, v in report.items() if not k.startswith("_")})
+        else:
+            total += print_report(report)
+    if args.json:
+        print(json.dumps(reports, ensure_ascii=False, indent=2))
+        total = sum(r[k]["count"] for r in reports for k in r if isinstance(r[k], dict) and "count" in r[k])
+    return 1 if args.strict and total else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
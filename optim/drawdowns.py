@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Просадки по часовым кривым equity прогонов (см. docs/drawdown.md).
+
+Кривые пишет стратегия (EquitySink, <strategy_version_run>.equity.bin в
+записи кэша). Прогоны обрабатываются пачками по BATCH_RUNS: кривые пачки
+выравниваются в матрицу (прогоны x часы; хвост короткой кривой — ее
+последнее значение), и все считается операциями над матрицей:
+
+- underwater-кривая: equity / максимум с начала - 1;
+- эпизоды просадки — непрерывные участки ниже максимума: пик, дно, глубина,
+  длительность от пика до восстановления (или до конца прогона) и время
+  восстановления от дна до нового максимума;
+- N худших эпизодов каждого прогона по глубине.
+
+Сводка прогона (колонки dd_* по run_id) присоединяется к таблице метрик
+(attach_drawdowns) и используется фильтром длительности в filter_and_rank.
+
+Примеры:
+    python drawdowns.py --top 30
+    python drawdowns.py --episodes 5 --episodes-csv worst_drawdowns.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from collect_results import load_run_results, read_run_equity
+from run_cache import RunCache
+
+# Худших эпизодов на прогон в таблице эпизодов
+TOP_EPISODES = 5
+
+# Прогонов в одной матрице: 64 x 2 года часов x float64 — ~9 МБ на массив
+BATCH_RUNS = 64
+
+SECONDS_PER_DAY = 86400.0
+
+SUMMARY_COLUMNS = [
+    "dd_max_depth", "dd_episodes", "dd_longest_days", "dd_worst_recovery_days",
+    "dd_underwater_pct", "dd_ulcer_index",
+]
+EPISODE_COLUMNS = [
+    "run_id", "rank", "peak_time", "trough_time", "recovery_time", "depth", "duration_days", "recovery_days",
+]
+
+
+def underwater(equity: np.ndarray) -> np.ndarray:
+    """Underwater-кривые (<= 0) по строкам матрицы equity"""
+    return equity / np.maximum.accumulate(equity, axis=1) - 1.0
+
+
+def _pad(curves: list, dtype) -> np.ndarray:
+    width = max(len(curve) for curve in curves)
+    matrix = np.empty((len(curves), width), dtype=dtype)
+    for k, curve in enumerate(curves):
+        matrix[k, :len(curve)] = curve
+        matrix[k, len(curve):] = curve[-1]
+    return matrix
+
+
+def analyze_batch(times: list, equity: list, top: int = TOP_EPISODES) -> tuple:
+    """
+    Просадки пачки прогонов.
+
+    Args:
+        times: время точек каждого прогона (datetime64[s])
+        equity: equity каждого прогона
+
+    Returns:
+        tuple: (сводка dict колонка -> массив по прогонам,
+            эпизоды dict колонка -> массив; run — номер прогона в пачке)
+    """
+    lengths = np.array([len(curve) for curve in equity])
+    seconds = _pad([t.astype("datetime64[s]").astype(np.int64) for t in times], np.int64)
+    values = _pad([np.asarray(curve, dtype=float) for curve in equity], float)
+    m, width = values.shape
+    valid = np.arange(width) < lengths[:, None]
+
+    drawdown = underwater(values)
+    under = (drawdown < 0) & valid
+
+    # Эпизоды в развернутой матрице: в столбце 0 просадки нет (пик — сама точка),
+    # поэтому эпизод не переходит с одной строки на другую
+    flat_under = under.ravel()
+    positions = np.flatnonzero(flat_under)
+    starts = flat_under & ~np.concatenate(([False], flat_under[:-1]))
+    ends = flat_under & ~np.concatenate((flat_under[1:], [False]))
+    start = np.flatnonzero(starts)
+    end = np.flatnonzero(ends)
+
+    summary = {
+        "dd_underwater_pct": under.sum(axis=1) / lengths,
+        "dd_ulcer_index": np.sqrt(np.where(valid, drawdown ** 2, 0.0).sum(axis=1) / lengths),
+        "dd_episodes": np.zeros(m, dtype=np.int64),
+        "dd_max_depth": np.zeros(m),
+        "dd_longest_days": np.zeros(m),
+        "dd_worst_recovery_days": np.zeros(m),
+    }
+    if not len(start):
+        return summary, {name: np.array([]) for name in ("run", "rank", "peak", "trough", "recovery",
+                                                          "depth", "duration_days", "recovery_days")}
+
+    # Глубина и дно — по сжатому массиву точек под водой, где эпизоды идут подряд
+    compressed = drawdown.ravel()[positions]
+    episode = np.cumsum(starts[positions]) - 1
+    first = np.flatnonzero(starts[positions])
+    depth = np.minimum.reduceat(compressed, first)
+    at_depth = np.flatnonzero(compressed == depth[episode])
+    trough = positions[at_depth[np.unique(episode[at_depth], return_index=True)[1]]]
+
+    run = start // width
+    flat_seconds = seconds.ravel()
+    peak_seconds = flat_seconds[start - 1]
+    recovered = end % width + 1 < lengths[run]
+    # Невосстановленный эпизод длится до последней точки прогона
+    last = np.where(recovered, end + 1, run * width + lengths[run] - 1)
+    duration_days = (flat_seconds[last] - peak_seconds) / SECONDS_PER_DAY
+    recovery_days = np.where(recovered, (flat_seconds[last] - flat_seconds[trough]) / SECONDS_PER_DAY, np.nan)
+
+    # Худшие эпизоды: сортировка по прогону и глубине, номер внутри прогона
+    order = np.lexsort((depth, run))
+    run_sorted = run[order]
+    run_first = np.searchsorted(run_sorted, run_sorted)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - run_first + 1
+
+    worst = order[run_first == np.arange(len(order))]
+    summary["dd_episodes"] = np.bincount(run, minlength=m)
+    summary["dd_max_depth"][run[worst]] = -depth[worst]
+    summary["dd_worst_recovery_days"][run[worst]] = recovery_days[worst]
+    np.maximum.at(summary["dd_longest_days"], run, duration_days)
+
+    keep = rank <= top
+    episodes = {
+        "run": run[keep],
+        "rank": rank[keep],
+        "peak": peak_seconds[keep],
+        "trough": flat_seconds[trough][keep],
+        "recovery": np.where(recovered, flat_seconds[last], -1)[keep],
+        "depth": -depth[keep],
+        "duration_days": duration_days[keep],
+        "recovery_days": recovery_days[keep],
+    }
+    return summary, episodes
+
+
+def analyze(run_ids: list, times: list, equity: list, top: int = TOP_EPISODES,
+            batch_runs: int = BATCH_RUNS) -> tuple:
+    """
+    Просадки многих прогонов пачками по batch_runs.
+
+    Returns:
+        tuple: (pd.DataFrame сводки: run_id и SUMMARY_COLUMNS,
+            pd.DataFrame эпизодов: EPISODE_COLUMNS, по прогону — от худшего)
+    """
+    summaries, episodes = [], []
+    for lo in range(0, len(run_ids), batch_runs):
+        ids = np.asarray(run_ids[lo:lo + batch_runs], dtype=object)
+        summary, batch_episodes = analyze_batch(times[lo:lo + batch_runs], equity[lo:lo + batch_runs], top)
+        summaries.append(pd.DataFrame({"run_id": ids, **summary}))
+
+        recovery = batch_episodes["recovery"].astype(np.int64)
+        episodes.append(pd.DataFrame({
+            "run_id": ids[batch_episodes["run"].astype(np.int64)],
+            "rank": batch_episodes["rank"].astype(np.int64),
+            "peak_time": batch_episodes["peak"].astype("datetime64[s]"),
+            "trough_time": batch_episodes["trough"].astype("datetime64[s]"),
+            "recovery_time": np.where(recovery >= 0, recovery, np.iinfo(np.int64).min).astype("datetime64[s]"),
+            "depth": batch_episodes["depth"],
+            "duration_days": batch_episodes["duration_days"],
+            "recovery_days": batch_episodes["recovery_days"],
+        }))
+
+    if not summaries:
+        return pd.DataFrame(columns=["run_id"] + SUMMARY_COLUMNS), pd.DataFrame(columns=EPISODE_COLUMNS)
+    episodes = pd.concat(episodes, ignore_index=True)
+    episodes = episodes.sort_values(["run_id", "rank"], kind="mergesort", ignore_index=True)
+    return pd.concat(summaries, ignore_index=True), episodes
+
+
+def load_drawdowns(cache: RunCache = None, top: int = TOP_EPISODES) -> tuple:
+    """
+    Просадки всех завершенных прогонов кэша с кривой equity.
+
+    Returns:
+        tuple: (сводка по run_id, эпизоды) — см. analyze
+    """
+    cache = cache or RunCache()
+    entries = []
+    for meta in cache.completed():
+        entry_dir = cache.entry_dir(meta["key"])
+        curve = read_run_equity(entry_dir)
+        if curve is not None and len(curve[1]):
+            entries.append((meta["run_id"], entry_dir, curve))
+
+    # run_id строки метрик (период и версия прогона), а не id оптимизатора
+    metrics = load_run_results([optim_run_id for optim_run_id, _, _ in entries],
+                               [entry_dir for _, entry_dir, _ in entries])
+    run_ids = dict(zip(metrics["optim_run_id"], metrics["run_id"])) if not metrics.empty else {}
+    entries = [entry for entry in entries if entry[0] in run_ids]
+    return analyze([run_ids[optim_run_id] for optim_run_id, _, _ in entries],
+                   [curve[0] for _, _, curve in entries],
+                   [curve[1] for _, _, curve in entries], top)
+
+
+def attach_drawdowns(df: pd.DataFrame, summary: pd.DataFrame) -> pd.DataFrame:
+    """Колонки просадок к таблице метрик по run_id (прогоны без кривой equity — NaN)"""
+    if df.empty or summary.empty or "run_id" not in df.columns:
+        return df
+    extra = summary.drop_duplicates("run_id", keep="last").set_index("run_id")[SUMMARY_COLUMNS]
+    df = df.drop(columns=[c for c in SUMMARY_COLUMNS if c in df.columns])
+    return df.join(extra, on="run_id")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Просадки по часовым кривым equity прогонов")
+    parser.add_argument("--episodes", type=int, default=TOP_EPISODES, help="Худших эпизодов на прогон")
+    parser.add_argument("--top", type=int, default=30, help="Сколько прогонов вывести")
+    parser.add_argument("--csv", default=None, help="Сохранить сводку в CSV")
+    parser.add_argument("--episodes-csv", default=None, help="Сохранить эпизоды в CSV")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    summary, episodes = load_drawdowns(top=args.episodes)
+    elapsed = time.perf_counter() - started
+    if summary.empty:
+        print("Нет прогонов с кривой equity в кэше")
+        return 1
+
+    print(f"Прогонов: {len(summary)}, эпизодов в таблице: {len(episodes)} за {elapsed:.2f} с")
+    summary = summary.sort_values(["dd_ulcer_index", "run_id"], kind="mergesort")
+    pd.set_option("display.width", None)
+    print(summary.head(args.top).to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    if args.csv:
+        summary.to_csv(args.csv, index=False)
+        print(f"\nСводка сохранена в {args.csv}")
+    if args.episodes_csv:
+        episodes.to_csv(args.episodes_csv, index=False)
+        print(f"Эпизоды сохранены в {args.episodes_csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
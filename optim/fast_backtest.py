@@ -0,0 +1,605 @@
+"""
+Быстрый офлайн-бэктестер DonchianBTCWithFunding на NumPy.
+
+Воспроизводит правила из DonchianWithFunding/main.py и PositionManager
+(пробой Donchian, тренд EMA200, фильтр ATR > SMA(ATR), режимы funding z-score,
+breakeven, ATR-трейлинг, мягкий выход по EMA50 и выход по Donchian)
+и прогоняет сразу пачку наборов параметров: состояние всех конфигураций —
+это массивы, а цикл по барам один на всю пачку.
+
+Используется для пред-отбора сетки: в Lean отправляются только финалисты.
+Сделки должны совпадать с Lean (см. fast_parity.py), метрики портфеля
+(sharpe, drawdown) считаются по дневному equity и близки к Lean, но не равны.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from param_space import STRATEGY_DEFAULTS
+from paths import STRATEGY_DATA_FILES, STRATEGY_DIR
+
+# Метрики считаются тем же кодом, что и в режиме нескольких конфигураций стратегии;
+# PortfolioMetrics не зависит от Lean, поэтому берем его прямо из стратегии
+sys.path.append(STRATEGY_DIR)
+from PortfolioMetrics import compute_metrics  # noqa: E402
+
+
+DEFAULT_PARAMS = STRATEGY_DEFAULTS
+
+INT_PARAMS = ("dc_entry_len", "dc_exit_len", "atr_period", "funding_window")
+
+START_DATE = datetime(2024, 1, 1)
+END_DATE = datetime(2026, 1, 1)
+INITIAL_CASH = 100000.0
+FEE_PERCENT = 0.001
+WARMUP_BARS = 300
+PRICE_ROUND = 2
+QTY_ROUND = 4
+
+BASE_RISK_PER_TRADE = 0.01
+MAX_RISK_PER_TRADE = 0.02
+MIN_RISK_PER_TRADE = 0.003
+MAX_NOTIONAL_FRAC = 0.95
+
+FUNDING_WINDOW = 168
+MIN_FUNDING_SAMPLES = 30
+ATR_SMA_PERIOD = 50
+
+# self.ATR(...) уже регистрирует индикатор, а RegisterIndicator добавляет второй
+# consolidator — в Lean ATR обновляется дважды за бар (второй раз TR = High - Low)
+ATR_UPDATES_PER_BAR = 2
+
+EXIT_STOP = "StopMarket"
+EXIT_MARKET = "Market"
+EXIT_SOFT = "SoftExit_EMA"
+EXIT_REASONS = np.array([EXIT_STOP, EXIT_MARKET, EXIT_SOFT])
+
+
+def py_round(x: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    round(x, decimals) Python по массиву — так округляет стратегия (стопы, количество).
+
+    np.round умножает на 10^decimals и округляет результат умножения: у значений
+    около середины между соседними результатами (…5 в следующем знаке) он может
+    разойтись с точным десятичным округлением Python на единицу последнего знака.
+    Такие значения досчитываются построчно.
+    """
+    result = np.round(x, decimals)
+    scaled = x * 10.0 ** decimals
+    with np.errstate(invalid="ignore"):
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for k in np.flatnonzero(near_tie):
+        result[k] = round(float(x[k]), decimals)
+    return result
+
+
+class MarketData:
+    """Часовые бары и funding rate в виде массивов."""
+
+    def __init__(self, times, open_, high, low, close, funding_times, funding_rates):
+        self.times = times
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.funding_times = funding_times
+        self.funding_rates = funding_rates
+
+
+def load_market_data(bars_path: str = None, funding_path: str = None) -> MarketData:
+    """
+    Загружает CSV стратегии так же, как их читают BinanceHourlyBTC и BinanceFundingRateData.
+
+    Args:
+        bars_path: CSV свечей (по умолчанию Data/custom/Binance/BTCUSDT_Binance_1h.csv)
+        funding_path: CSV funding rate в формате YYYYMMDD HHMMSS,rate
+
+    Returns:
+        MarketData: бары и funding, отсортированные по времени
+    """
+    bars_path = bars_path or STRATEGY_DATA_FILES[0]
+    funding_path = funding_path or STRATEGY_DATA_FILES[1]
+
+    bars = pd.read_csv(
+        bars_path, header=None, usecols=[0, 1, 2, 3, 4],
+        names=["time", "open", "high", "low", "close"], dtype=str
+    )
+    # Reader пропускает строки, не начинающиеся с цифры (заголовок), и битые строки
+    bars = bars[bars["time"].str.match(r"^\d")]
+    bars["time"] = pd.to_datetime(bars["time"].str[:19], format="%Y-%m-%d %H:%M:%S", errors="coerce")
+    for col in ("open", "high", "low", "close"):
+        bars[col] = pd.to_numeric(bars[col], errors="coerce")
+    bars = bars.dropna().sort_values("time", kind="mergesort")
+
+    funding = pd.read_csv(funding_path, header=None, names=["time", "rate"], dtype=str)
+    funding["time"] = pd.to_datetime(funding["time"].str.strip(), format="%Y%m%d %H%M%S", errors="coerce")
+    funding["rate"] = pd.to_numeric(funding["rate"], errors="coerce")
+    funding = funding.dropna().sort_values("time", kind="mergesort")
+
+    return MarketData(
+        times=bars["time"].values.astype("datetime64[s]"),
+        open_=bars["open"].values.astype(np.float64),
+        high=bars["high"].values.astype(np.float64),
+        low=bars["low"].values.astype(np.float64),
+        close=bars["close"].values.astype(np.float64),
+        funding_times=funding["time"].values.astype("datetime64[s]"),
+        funding_rates=funding["rate"].values.astype(np.float64),
+    )
+
+
+# ===== INDICATORS (семантика Lean) =====
+
+def ema(values, period):
+    """EMA Lean: первая точка — само значение, далее k = 2 / (period + 1)."""
+    return pd.Series(values).ewm(alpha=2.0 / (period + 1), adjust=False).mean().values
+
+
+def rolling_mean(values, period):
+    """SMA по доступным точкам (до готовности — среднее по имеющимся)."""
+    return pd.Series(values).rolling(period, min_periods=1).mean().values
+
+
+def rolling_max(values, period):
+    return pd.Series(values).rolling(period, min_periods=1).max().values
+
+
+def rolling_min(values, period):
+    return pd.Series(values).rolling(period, min_periods=1).min().values
+
+
+def atr_series(high, low, close, period):
+    """
+    ATR(period, Simple) с учетом двойного обновления за бар.
+
+    Returns:
+        tuple: (значения ATR по барам, номер первого готового бара)
+    """
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    hl = high - low
+    tr = np.fmax(hl, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    tr[0] = hl[0]
+
+    if ATR_UPDATES_PER_BAR == 1:
+        return rolling_mean(tr, period), period - 1
+
+    seq = np.empty(len(tr) * 2)
+    seq[0::2] = tr
+    seq[1::2] = hl
+    atr = rolling_mean(seq, period)[1::2]
+    return atr, int(np.ceil(period / 2.0)) - 1
+
+
+def funding_zscores(funding_rates, first_sample, window=FUNDING_WINDOW, min_samples=MIN_FUNDING_SAMPLES):
+    """
+    Z-score последнего funding по окну из FundingZScore для каждого числа полученных точек.
+
+    Args:
+        funding_rates: все значения funding
+        first_sample: индекс первой точки, которую увидел алгоритм (начало прогрева)
+
+    Returns:
+        np.ndarray: z[k] — z-score после получения точки k (NaN до first_sample)
+    """
+    z = np.full(len(funding_rates), np.nan)
+    for k in range(first_sample, len(funding_rates)):
+        lo = max(first_sample, k + 1 - window)
+        win = funding_rates[lo:k + 1]
+        if len(win) < min_samples:
+            z[k] = 0.0
+            continue
+        mean = win.mean()
+        std = np.sqrt(((win - mean) ** 2).mean())
+        if std < 1e-6:
+            z[k] = 0.0
+            continue
+        z[k] = min(5.0, max(-5.0, (funding_rates[k] - mean) / std))
+    return z
+
+
+def normalize_params(params: dict) -> dict:
+    """Дополняет параметры значениями по умолчанию и приводит типы как GetParameter."""
+    full = dict(DEFAULT_PARAMS)
+    for key in DEFAULT_PARAMS:
+        if key in params and params[key] not in (None, ""):
+            full[key] = params[key]
+    for key in full:
+        full[key] = int(float(full[key])) if key in INT_PARAMS else float(full[key])
+    return full
+
+
+# ===== ENGINE =====
+
+class _Indicators:
+    """Индикаторы общего окна данных, посчитанные один раз на уникальную длину."""
+
+    def __init__(self, market, warmup_idx, start_idx, end_idx):
+        self.market = market
+        self.ws = warmup_idx
+        self.start = start_idx
+        self.end = end_idx
+
+        sl = slice(warmup_idx, end_idx)
+        self.high = market.high[sl]
+        self.low = market.low[sl]
+        self.close = market.close[sl]
+
+        self.ema200 = ema(self.close, 200)
+        self.ema50 = ema(self.close, 50)
+        self.ema_ready = 199
+
+        # Funding: алгоритм видит точки начиная с прогрева, в том же slice, что и бар
+        funding_first = int(np.searchsorted(market.funding_times, market.times[warmup_idx], side="left"))
+        received = np.searchsorted(market.funding_times, market.times[sl], side="right")
+        has_funding = received > funding_first
+        self.funding_ready = int(np.argmax(has_funding)) if has_funding.any() else len(received)
+        self._funding_first = funding_first
+        self._has_funding = has_funding
+        self._last_funding = received[has_funding] - 1
+        self.funding = np.full(len(received), np.nan)
+        self.funding[has_funding] = market.funding_rates[self._last_funding]
+        self._funding_z = {}
+
+        self._upper_prev = {}
+        self._lower = {}
+        self._atr = {}
+        self._atr_sma = {}
+
+    def funding_z(self, window):
+        """Z-score последнего полученного funding на каждом баре для окна window."""
+        if window not in self._funding_z:
+            values = np.zeros(len(self._has_funding))
+            if self._has_funding.any():
+                z_by_sample = funding_zscores(self.market.funding_rates, self._funding_first, window)
+                values[self._has_funding] = z_by_sample[self._last_funding]
+            self._funding_z[window] = values
+        return self._funding_z[window]
+
+    def upper_prev(self, n):
+        """UpperBand.Previous: максимум High по n барам, заканчивающимся на предыдущем."""
+        if n not in self._upper_prev:
+            upper = rolling_max(self.high, n)
+            self._upper_prev[n] = np.concatenate(([np.nan], upper[:-1]))
+        return self._upper_prev[n]
+
+    def lower(self, n):
+        """LowerBand.Current: минимум Low по n барам, включая текущий."""
+        if n not in self._lower:
+            self._lower[n] = rolling_min(self.low, n)
+        return self._lower[n]
+
+    def atr(self, period):
+        if period not in self._atr:
+            self._atr[period] = atr_series(self.high, self.low, self.close, period)
+        return self._atr[period]
+
+    def atr_sma(self, period, first_processed):
+        """SMA(50) от ATR: обновляется только на обработанных барах (после first_processed)."""
+        key = (period, first_processed)
+        if key not in self._atr_sma:
+            atr, _ = self.atr(period)
+            values = np.full(len(atr), np.nan)
+            if first_processed < len(atr):
+                values[first_processed:] = rolling_mean(atr[first_processed:], ATR_SMA_PERIOD)
+            self._atr_sma[key] = values
+        return self._atr_sma[key]
+
+    def first_processed(self, p):
+        """Первый бар, на котором _should_process_data вернет True."""
+        _, atr_ready = self.atr(p["atr_period"])
+        return max(
+            self.start - self.ws,
+            self.funding_ready,
+            self.ema_ready,
+            p["dc_entry_len"] - 1,
+            p["dc_exit_len"] - 1,
+            atr_ready,
+        )
+
+
+def _window_indices(times, start, end, warmup_bars):
+    start_idx = int(np.searchsorted(times, np.datetime64(start, "s"), side="left"))
+    # SetEndDate(2026, 1, 1) в Lean включает весь последний день
+    end_idx = int(np.searchsorted(times, np.datetime64(end + timedelta(days=1), "s"), side="left"))
+    warmup_idx = max(0, start_idx - warmup_bars)
+    return warmup_idx, start_idx, end_idx
+
+
+def _stack(columns, index):
+    """Матрица (бары x конфигурации) из словаря колонок по ключу."""
+    keys = sorted(set(index))
+    pos = {k: i for i, k in enumerate(keys)}
+    mat = np.column_stack([columns(k) for k in keys])
+    return mat, np.array([pos[k] for k in index])
+
+
+def run_batch(market: MarketData, params_list: list, start=START_DATE, end=END_DATE,
+              initial_cash=INITIAL_CASH, with_equity=False):
+    """
+    Прогоняет пачку наборов параметров за один проход по барам.
+
+    Args:
+        market: данные из load_market_data
+        params_list: список словарей параметров (недостающие — по умолчанию)
+        start, end: период бэктеста (как SetStartDate / SetEndDate)
+        initial_cash: стартовый капитал
+        with_equity: дополнительно вернуть дневной equity
+
+    Returns:
+        tuple: (DataFrame метрик — строка на конфигурацию в порядке params_list,
+                DataFrame сделок с колонкой config[,
+                DataFrame дневного equity: индекс — дата, колонки — номер конфигурации])
+    """
+    params = [normalize_params(p) for p in params_list]
+    n = len(params)
+    warmup_idx, start_idx, end_idx = _window_indices(market.times, start, end, WARMUP_BARS)
+    ind = _Indicators(market, warmup_idx, start_idx, end_idx)
+
+    col = lambda key: np.array([p[key] for p in params])
+    stop_neg, stop_neu, stop_pos = col("atr_stop_negative"), col("atr_stop_neutral"), col("atr_stop_positive")
+    risk_neg, risk_neu, risk_pos = col("risk_boost_negative"), col("risk_neutral"), col("risk_cut_positive")
+    be_r, be_frac = col("breakeven_r"), col("breakeven_atr_frac")
+    trail_r, soft_r = col("trail_start_r"), col("soft_exit_r")
+
+    first_proc = np.array([ind.first_processed(p) for p in params])
+
+    upper_mat, upper_idx = _stack(ind.upper_prev, [p["dc_entry_len"] for p in params])
+    lower_mat, lower_idx = _stack(ind.lower, [p["dc_exit_len"] for p in params])
+    atr_mat, atr_idx = _stack(lambda k: ind.atr(k)[0], [p["atr_period"] for p in params])
+    sma_mat, sma_idx = _stack(
+        lambda k: ind.atr_sma(*k), [(p["atr_period"], int(fp)) for p, fp in zip(params, first_proc)]
+    )
+    z_mat, z_idx = _stack(ind.funding_z, [p["funding_window"] for p in params])
+
+    times = market.times[warmup_idx:end_idx]
+    close, high, low = ind.close, ind.high, ind.low
+    n_bars = len(close)
+
+    # Дневные отсечки equity (последний бар дня) — как дневной equity в статистике Lean
+    days = times.astype("datetime64[D]")
+    day_end = np.zeros(n_bars, dtype=bool)
+    if n_bars:
+        day_end[:-1] = days[1:] != days[:-1]
+        day_end[-1] = True
+    first_trading_bar = start_idx - warmup_idx
+
+    # ===== STATE =====
+    cash = np.full(n, float(initial_cash))
+    qty = np.zeros(n)
+    in_pos = np.zeros(n, dtype=bool)
+    entry_price = np.zeros(n)
+    entry_bar = np.zeros(n, dtype=np.int64)
+    atr_entry = np.zeros(n)
+    stop_mult = np.zeros(n)
+    max_price = np.zeros(n)
+    current_stop = np.zeros(n)
+    stop_price = np.zeros(n)
+    entry_z = np.zeros(n)
+    entry_funding = np.zeros(n)
+
+    trades = []
+    daily_equity = [np.full(n, float(initial_cash))]
+    equity_dates = [np.datetime64(start, "D") - np.timedelta64(1, "D")]
+
+    def close_positions(mask, t, price, reason):
+        idx = np.nonzero(mask)[0]
+        if not len(idx):
+            return
+        q = qty[idx]
+        # PercentageFeeModel считает комиссию от Security.Price (close бара), а не от цены исполнения
+        cash[idx] += q * price[idx] - close[t] * q * FEE_PERCENT
+        pnl = (price[idx] - entry_price[idx]) * q
+        risk = atr_entry[idx] * stop_mult[idx] * q
+        trades.append({
+            "config": idx,
+            "entry_bar": entry_bar[idx],
+            "exit_bar": np.full(len(idx), t),
+            "entry_price": entry_price[idx].copy(),
+            "exit_price": price[idx].copy(),
+            "quantity": q.copy(),
+            "pnl": pnl,
+            "R": np.where(risk > 0, pnl / np.where(risk > 0, risk, 1.0), 0.0),
+            "funding_z": entry_z[idx].copy(),
+            "funding": entry_funding[idx].copy(),
+            "atr_at_entry": atr_entry[idx].copy(),
+            "atr_stop_multiplier": stop_mult[idx].copy(),
+            "exit_reason": np.full(len(idx), reason),
+        })
+        qty[idx] = 0.0
+        in_pos[idx] = False
+
+    for t in range(first_trading_bar, n_bars):
+        c, h, l = close[t], high[t], low[t]
+
+        # 1. Сканирование стопов брокером — до OnData, по новому бару
+        hit = in_pos & (l < stop_price)
+        if hit.any():
+            close_positions(hit, t, np.minimum(stop_price, c), 0)
+
+        active = t >= first_proc
+        if active.any():
+            atr_t = atr_mat[t][atr_idx]
+            sma_t = sma_mat[t][sma_idx]
+            # _check_volatility_filter: atr_sma готов после 50 обновлений
+            vol_ok = active & (t >= first_proc + ATR_SMA_PERIOD - 1) & (atr_t > sma_t)
+            manage = vol_ok & in_pos
+            z = z_mat[t][z_idx]
+
+            # 2. Вход
+            entry = vol_ok & ~in_pos & (h > upper_mat[t][upper_idx]) & (c > ind.ema200[t])
+            entry &= (z <= 1.0) | (atr_t > 1.2 * sma_t)
+            if entry.any():
+                s_mult = np.where(z > 1.0, stop_pos, np.where(z < -1.0, stop_neg, stop_neu))
+                r_mult = np.where(z > 1.0, risk_pos, np.where(z < -1.0, risk_neg, risk_neu))
+
+                # PositionManager.calculate_position_size (позиции нет — портфель = кэш)
+                pv = cash
+                risk = np.clip(pv * BASE_RISK_PER_TRADE * r_mult,
+                               MIN_RISK_PER_TRADE * pv, MAX_RISK_PER_TRADE * pv)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    q_risk = risk / (atr_t * s_mult)
+                q = py_round(np.minimum(q_risk, pv * MAX_NOTIONAL_FRAC / c), QTY_ROUND)
+                entry &= (atr_t > 0) & (q > 0)
+
+                idx = np.nonzero(entry)[0]
+                if len(idx):
+                    qty[idx] = q[idx]
+                    cash[idx] -= q[idx] * c + c * q[idx] * FEE_PERCENT
+                    in_pos[idx] = True
+                    entry_price[idx] = c
+                    entry_bar[idx] = t
+                    atr_entry[idx] = atr_t[idx]
+                    stop_mult[idx] = s_mult[idx]
+                    max_price[idx] = c
+                    current_stop[idx] = c - s_mult[idx] * atr_t[idx]
+                    stop_price[idx] = py_round(current_stop[idx], PRICE_ROUND)
+                    entry_z[idx] = z[idx]
+                    entry_funding[idx] = ind.funding[t]
+
+            # 3. Сопровождение позиции
+            if manage.any():
+                max_price[manage] = np.maximum(max_price[manage], c)
+                r = (c - entry_price) / np.where(manage, atr_entry * stop_mult, 1.0)
+
+                # Donchian hard exit (LowerBand включает текущий бар, как в Lean)
+                dc_exit = manage & (c < lower_mat[t][lower_idx])
+                if dc_exit.any():
+                    close_positions(dc_exit, t, np.full(n, c), 1)
+                manage &= ~dc_exit
+
+                breakeven = manage & (r > be_r) & (max_price > entry_price + be_frac * atr_entry)
+                current_stop[breakeven] = entry_price[breakeven]
+                stop_price[breakeven] = py_round(entry_price[breakeven], PRICE_ROUND)
+
+                trail = max_price - stop_mult * atr_t
+                trailing = manage & (r > trail_r) & (trail > current_stop)
+                current_stop[trailing] = trail[trailing]
+                stop_price[trailing] = py_round(trail[trailing], PRICE_ROUND)
+
+                soft = manage & (r > soft_r) & (c < ind.ema50[t])
+                if soft.any():
+                    close_positions(soft, t, np.full(n, c), 2)
+
+        if day_end[t]:
+            daily_equity.append(cash + qty * c)
+            equity_dates.append(days[t])
+
+    trades_df = _trades_frame(trades, times)
+    equity = np.vstack(daily_equity)
+    metrics = compute_metrics(params_list, trades_df, equity, initial_cash, start, end)
+    if with_equity:
+        return metrics, trades_df, pd.DataFrame(equity, index=pd.to_datetime(np.array(equity_dates)))
+    return metrics, trades_df
+
+
+def _trades_frame(trades, times):
+    if not trades:
+        return pd.DataFrame(columns=[
+            "config", "entry_time", "exit_time", "entry_price", "exit_price", "quantity",
+            "pnl", "R", "holding_hours", "funding", "funding_z", "atr_at_entry",
+            "atr_stop_multiplier", "exit_reason"
+        ])
+
+    df = pd.DataFrame({k: np.concatenate([t[k] for t in trades]) for k in trades[0]})
+    df["entry_time"] = pd.to_datetime(times[df.pop("entry_bar").values])
+    df["exit_time"] = pd.to_datetime(times[df.pop("exit_bar").values])
+    df["holding_hours"] = (df["exit_time"] - df["entry_time"]).dt.total_seconds() / 3600.0
+    df["exit_reason"] = EXIT_REASONS[df["exit_reason"].values]
+    return df.sort_values(["config", "exit_time"], kind="mergesort").reset_index(drop=True)
+
+
+# ===== MULTI-PROCESS =====
+
+_worker_market = None
+
+
+def _init_worker(bars_path, funding_path):
+    global _worker_market
+    _worker_market = load_market_data(bars_path, funding_path)
+
+
+def _run_chunk(args):
+    offset, chunk, start, end = args
+    metrics, trades = run_batch(_worker_market, chunk, start, end)
+    trades["config"] += offset
+    return offset, metrics, trades
+
+
+def evaluate_batch(params_list: list, processes: int = 1, chunk_size: int = 256,
+                   start=START_DATE, end=END_DATE, bars_path=None, funding_path=None,
+                   market: MarketData = None):
+    """
+    Оценивает список наборов параметров; при processes > 1 — кусками по процессам.
+
+    Args:
+        params_list: список словарей параметров
+        processes: количество процессов
+        chunk_size: размер пачки конфигураций на один проход
+        market: уже загруженные данные (только для processes=1)
+
+    Returns:
+        tuple: (DataFrame метрик в порядке params_list, DataFrame сделок)
+    """
+    if processes <= 1:
+        market = market or load_market_data(bars_path, funding_path)
+        return run_batch(market, params_list, start, end)
+
+    chunks = [
+        (offset, params_list[offset:offset + chunk_size], start, end)
+        for offset in range(0, len(params_list), chunk_size)
+    ]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(bars_path, funding_path)) as pool:
+        results = sorted(pool.map(_run_chunk, chunks), key=lambda r: r[0])
+
+    metrics = pd.concat([r[1] for r in results], ignore_index=True)
+    trades = pd.concat([r[2] for r in results], ignore_index=True)
+    return metrics, trades
+
+
+def prescreen(runs: list, top: int, processes: int = 1) -> list:
+    """
+    Отбирает лучшие прогоны по score быстрого бэктестера.
+
+    Args:
+        runs: список (run_id, params) из generate_runs
+        top: сколько финалистов оставить
+        processes: количество процессов
+
+    Returns:
+        list: подмножество runs (в исходном порядке) для запуска в Lean
+    """
+    metrics, _ = evaluate_batch([params for _, params in runs], processes=processes)
+    metrics["run_id"] = [run_id for run_id, _ in runs]
+    best = set(
+        metrics.sort_values(["score", "run_id"], ascending=[False, True], kind="mergesort")
+        .head(top)["run_id"]
+    )
+    return [(run_id, params) for run_id, params in runs if run_id in best]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from generate_runs import generate_runs
+
+    parser = argparse.ArgumentParser(description="Быстрый пред-отбор сетки параметров")
+    parser.add_argument("--processes", "-p", type=int, default=1)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    runs = generate_runs()
+    started = time.perf_counter()
+    metrics, trades = evaluate_batch([p for _, p in runs], processes=args.processes)
+    metrics.insert(0, "run_id", [run_id for run_id, _ in runs])
+    elapsed = time.perf_counter() - started
+
+    print(f"Оценено {len(runs)} конфигураций за {elapsed:.2f} с, сделок: {len(trades)}")
+    top = metrics.sort_values(["score", "run_id"], ascending=[False, True], kind="mergesort").head(args.top)
+    print(top.to_string(index=False))
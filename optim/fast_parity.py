@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Проверка паритета быстрого бэктестера с Lean по сохраненным логам сделок.
+
+Берет прогоны из кэша оптимизатора (cache/<key>/<strategy_version_run>.trades.zip
+или старый trade_log.csv + meta.json с параметрами; записи режима configs
+пропускаются — их сделки посчитаны не Lean, а той же логикой VirtualStrategy),
+пересчитывает их в fast_backtest и сравнивает сделки по времени входа/выхода,
+ценам, R и причине выхода. Прогоны на окнах successive halving / Hyperband
+(start_date / end_date в параметрах) пересчитываются на своем окне.
+Код возврата 1 — есть расхождения.
+"""
+
+import argparse
+from datetime import datetime
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from collect_results import read_run_trades
+from fast_backtest import END_DATE, START_DATE, evaluate_batch, load_market_data
+from paths import RUN_CACHE_DIR
+from run_cache import MODE_LEAN
+
+# Старый trade_log.csv округлял цены и R до 2 знаков
+PRICE_TOL = 0.011
+R_TOL = 0.011
+
+
+def load_cached_trade_logs(cache_dir: str = None) -> list:
+    """
+    Находит в кэше прогоны Lean с сохраненным логом сделок.
+
+    Returns:
+        list: Кортежи (run_id, params, trade_log DataFrame)
+    """
+    cache_dir = cache_dir or RUN_CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return []
+
+    runs = []
+    for name in sorted(os.listdir(cache_dir)):
+        meta_path = os.path.join(cache_dir, name, "meta.json")
+        if not os.path.exists(meta_path):
+            continue
+        with open(meta_path) as f:
+            meta = json.load(f)
+        # В старых записях режима нет — это прогоны Lean
+        if meta.get("mode", MODE_LEAN) != MODE_LEAN:
+            continue
+        trades = read_run_trades(os.path.join(cache_dir, name))
+        if trades is None:
+            continue
+        runs.append((meta["run_id"], meta["params"], pd.DataFrame(trades)))
+    return runs
+
+
+def run_window(params: dict) -> tuple:
+    """Период прогона: start_date / end_date из параметров, иначе полный период"""
+    start = params.get("start_date")
+    end = params.get("end_date")
+    return (datetime.strptime(start, "%Y-%m-%d") if start else START_DATE,
+            datetime.strptime(end, "%Y-%m-%d") if end else END_DATE)
+
+
+def fast_trades_by_window(runs: list, market) -> list:
+    """
+    Сделки быстрого бэктестера для каждого прогона на его периоде:
+    прогоны группируются по окну, каждое окно — один evaluate_batch.
+
+    Returns:
+        list: DataFrame сделок в порядке runs
+    """
+    by_window = {}
+    for i, (_, params, _) in enumerate(runs):
+        by_window.setdefault(run_window(params), []).append(i)
+
+    result = [None] * len(runs)
+    for (start, end), indices in by_window.items():
+        _, trades = evaluate_batch([runs[i][1] for i in indices], market=market, start=start, end=end)
+        for config, i in enumerate(indices):
+            result[i] = trades[trades["config"] == config]
+    return result
+
+
+def compare_trades(lean_trades: pd.DataFrame, fast_trades: pd.DataFrame) -> dict:
+    """
+    Сравнивает сделки Lean и быстрого бэктестера попарно в порядке закрытия.
+
+    Returns:
+        dict: lean_trades, fast_trades, matched и первая расходящаяся сделка (или None)
+    """
+    lean = lean_trades.reset_index(drop=True)
+    fast = fast_trades.reset_index(drop=True)
+    lean_entry = pd.to_datetime(lean["entry_time"])
+    lean_exit = pd.to_datetime(lean["exit_time"])
+
+    n = min(len(lean), len(fast))
+    same = np.ones(n, dtype=bool)
+    if n:
+        same &= lean_entry.values[:n] == fast["entry_time"].values[:n]
+        same &= lean_exit.values[:n] == fast["exit_time"].values[:n]
+        same &= np.abs(lean["entry_price"].values[:n] - fast["entry_price"].values[:n]) <= PRICE_TOL
+        same &= np.abs(lean["exit_price"].values[:n] - fast["exit_price"].values[:n]) <= PRICE_TOL
+        same &= np.abs(lean["R"].values[:n] - fast["R"].values[:n]) <= R_TOL
+        same &= lean["exit_reason"].astype(str).values[:n] == fast["exit_reason"].values[:n]
+
+    mismatches = np.nonzero(~same)[0]
+    first = int(mismatches[0]) if len(mismatches) else (n if len(lean) != len(fast) else None)
+    return {
+        "lean_trades": len(lean),
+        "fast_trades": len(fast),
+        "matched": int(same.sum()),
+        "first_mismatch": first,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Паритет fast_backtest с логами Lean")
+    parser.add_argument("--cache-dir", default=None, help="Папка кэша прогонов")
+    parser.add_argument("--bars", default=None, help="CSV свечей")
+    parser.add_argument("--funding", default=None, help="CSV funding rate")
+    args = parser.parse_args(argv)
+
+    runs = load_cached_trade_logs(args.cache_dir)
+    if not runs:
+        print("Нет сохраненных логов сделок для проверки")
+        return 0
+
+    market = load_market_data(args.bars, args.funding)
+    fast_trades = fast_trades_by_window(runs, market)
+
+    failed = 0
+    for (run_id, _, lean_trades), trades in zip(runs, fast_trades):
+        result = compare_trades(lean_trades, trades)
+        ok = result["first_mismatch"] is None
+        failed += not ok
+        status = "OK  " if ok else "FAIL"
+        print(f"{status} [{run_id}] Lean: {result['lean_trades']}, fast: {result['fast_trades']}, "
+              f"совпало: {result['matched']}"
+              + ("" if ok else f", первое расхождение: сделка #{result['first_mismatch']}"))
+
+    print(f"\nПаритет: {len(runs) - failed}/{len(runs)} прогонов")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,13 @@ import hashlib
 import json
 
 
+def make_run_id(params: dict) -> str:
+    """Детерминированный run_id на основе параметров."""
+    params_str = json.dumps(params, sort_keys=True)
+    params_hash = hashlib.md5(params_str.encode()).hexdigest()[:8]
+    return f"run_{params_hash}"
+
+
 def generate_runs():
     """
     Генерирует список прогонов с детерминированными run_id.
@@ -31,11 +38,6 @@ def generate_runs():
     
     for idx, params in enumerate(param_list, start=1):
         # Создаем детерминированный run_id на основе параметров
-        # Используем hash для компактности, но с индексом для уникальности
-        params_str = json.dumps(params, sort_keys=True)
-        params_hash = hashlib.md5(params_str.encode()).hexdigest()[:8]
-        run_id = f"run_{params_hash}"
-        
-        runs.append((run_id, params))
+        runs.append((make_run_id(params), params))
     
     return runs
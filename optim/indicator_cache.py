@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Общий кэш индикаторов для прогонов оптимизатора.
+
+EMA200, EMA50, ATR(p) и полосы Donchian(n) одинаковы у всех конфигураций
+с тем же периодом бэктеста и теми же данными. Здесь они считаются один раз
+(формулами fast_backtest, совпадающими с Lean, включая прогрев SetWarmUp(300))
+и пишутся в .npy — стратегия с параметром indicator_cache открывает их через
+np.load(mmap_mode="r"), и параллельные прогоны читают одну копию из page cache.
+
+Папка кэша: Data/indicator_cache/<digest данных>_<start_date>/
+    times.npy            — время баров (секунды epoch, int64), от начала прогрева до конца данных
+    ema200.npy, ema50.npy
+    atr_<p>.npy
+    dc_upper_prev_<n>.npy — UpperBand.Previous Donchian(n)
+    dc_lower_<n>.npy      — LowerBand.Current Donchian(n)
+    meta.json            — длины и индексы готовности (IsReady)
+
+SMA(ATR, 50) в кэш не входит: она обновляется только на обработанных барах,
+начало которых зависит от параметров конфигурации.
+"""
+
+import argparse
+from datetime import datetime
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from fast_backtest import START_DATE, WARMUP_BARS, _Indicators, _window_indices, load_market_data
+from param_space import SEARCH_SPACE, STRATEGY_DEFAULTS
+from paths import CONTAINER_INDICATOR_CACHE_DIR, INDICATOR_CACHE_DIR
+from run_cache import strategy_data_digest
+
+CACHE_VERSION = 1
+
+
+def required_lengths(params_list: list) -> tuple:
+    """
+    Длины индикаторов, нужные конфигурациям.
+
+    Returns:
+        tuple: (множество длин Donchian, множество периодов ATR)
+    """
+    dc_lengths, atr_periods = set(), set()
+    for params in params_list:
+        for name in ("dc_entry_len", "dc_exit_len"):
+            dc_lengths.add(int(float(params.get(name) or STRATEGY_DEFAULTS[name])))
+        atr_periods.add(int(float(params.get("atr_period") or STRATEGY_DEFAULTS["atr_period"])))
+    return dc_lengths, atr_periods
+
+
+def cache_dir(data_digest: str, start: datetime, root: str = INDICATOR_CACHE_DIR) -> str:
+    return os.path.join(root, f"{data_digest[:16]}_{start:%Y%m%d}")
+
+
+def container_path(host_dir: str) -> str:
+    """Путь к папке кэша внутри контейнера Lean — передается в параметр indicator_cache"""
+    return "/".join([CONTAINER_INDICATOR_CACHE_DIR, os.path.basename(host_dir)])
+
+
+def _read_meta(path: str):
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return meta if meta.get("version") == CACHE_VERSION else None
+
+
+def _save_array(path: str, name: str, values: np.ndarray):
+    # Через временный файл: читающий прогон не увидит недописанный массив
+    target = os.path.join(path, name + ".npy")
+    tmp = target + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, values, allow_pickle=False)
+    os.replace(tmp, target)
+
+
+def ensure(dc_lengths, atr_periods, start: datetime = START_DATE, market=None,
+           data_digest: str = None, root: str = INDICATOR_CACHE_DIR) -> str:
+    """
+    Досчитывает в кэш недостающие длины (уже посчитанные не пересчитываются).
+
+    Args:
+        dc_lengths: длины Donchian
+        atr_periods: периоды ATR
+        start: дата начала бэктеста (start_date прогонов)
+        market: MarketData (по умолчанию — load_market_data())
+        data_digest: digest файлов данных (по умолчанию — strategy_data_digest())
+
+    Returns:
+        str: папка кэша на хосте
+    """
+    data_digest = data_digest or strategy_data_digest()
+    path = cache_dir(data_digest, start, root)
+    meta = _read_meta(path) or {
+        "version": CACHE_VERSION,
+        "data_digest": data_digest,
+        "start_date": start.strftime("%Y-%m-%d"),
+        "warmup_bars": WARMUP_BARS,
+        "dc_lengths": [],
+        "atr_ready": {},
+    }
+    dc_missing = sorted(set(int(n) for n in dc_lengths) - set(meta["dc_lengths"]))
+    atr_missing = sorted(set(int(p) for p in atr_periods) - set(int(p) for p in meta["atr_ready"]))
+    if os.path.exists(os.path.join(path, "meta.json")) and not dc_missing and not atr_missing:
+        return path
+
+    market = market or load_market_data()
+    warmup_idx, start_idx, _ = _window_indices(market.times, start, start, WARMUP_BARS)
+    # До конца данных: любой end_date прогона попадает в кэш
+    ind = _Indicators(market, warmup_idx, start_idx, len(market.times))
+    os.makedirs(path, exist_ok=True)
+
+    if "ema_ready" not in meta:
+        times = market.times[warmup_idx:].astype("datetime64[s]").astype(np.int64)
+        _save_array(path, "times", times)
+        _save_array(path, "ema200", ind.ema200)
+        _save_array(path, "ema50", ind.ema50)
+        meta["ema_ready"] = {"200": int(ind.ema_ready), "50": 49}
+
+    for n in dc_missing:
+        _save_array(path, f"dc_upper_prev_{n}", ind.upper_prev(n))
+        _save_array(path, f"dc_lower_{n}", ind.lower(n))
+    for p in atr_missing:
+        values, ready = ind.atr(p)
+        _save_array(path, f"atr_{p}", values)
+        meta["atr_ready"][str(p)] = int(ready)
+
+    meta["dc_lengths"] = sorted(set(meta["dc_lengths"]) | set(dc_missing))
+    # meta.json пишется последним: по нему стратегия решает, какие длины есть
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+    return path
+
+
+def _space_range(name: str) -> range:
+    _, low, high, step = SEARCH_SPACE[name]
+    return range(int(low), int(high) + 1, int(step))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Предрасчет общих индикаторов для прогонов оптимизатора")
+    parser.add_argument("--start", default=START_DATE.strftime("%Y-%m-%d"), help="start_date прогонов (YYYY-MM-DD)")
+    parser.add_argument("--dc", type=int, nargs="*", default=None,
+                        help="Длины Donchian (по умолчанию — весь диапазон SEARCH_SPACE)")
+    parser.add_argument("--atr", type=int, nargs="*", default=None,
+                        help="Периоды ATR (по умолчанию — весь диапазон SEARCH_SPACE)")
+    args = parser.parse_args(argv)
+
+    dc_lengths = args.dc or sorted(set(_space_range("dc_entry_len")) | set(_space_range("dc_exit_len")))
+    atr_periods = args.atr or list(_space_range("atr_period"))
+    path = ensure(dc_lengths, atr_periods, datetime.strptime(args.start, "%Y-%m-%d"))
+    size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    print(f"Кэш индикаторов: {path} ({size / 1e6:.1f} МБ)")
+    print(f"Параметр для Lean: indicator_cache={container_path(path)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
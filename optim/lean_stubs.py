@@ -0,0 +1,188 @@
+"""
+Заглушка модуля AlgorithmImports для запуска кода стратегий без Lean.
+
+install() регистрирует в sys.modules модуль AlgorithmImports с классами,
+которые модули стратегий используют при импорте и в Reader'ах: PythonData,
+PythonIndicator, QCAlgorithm, FeeModel, SubscriptionDataSource и т.п.
+Поведения движка (подписки, ордера, портфель) здесь нет — только то, что
+нужно, чтобы модули импортировались, а Reader'ы и расчетные классы работали.
+"""
+
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+
+
+class _Enum:
+    """Значения перечислений Lean — строки с тем же именем"""
+
+    def __init__(self, *names):
+        for name in names:
+            setattr(self, name, name)
+
+
+class PythonData:
+    """
+    Объект данных: атрибуты Symbol / Time / Value / EndTime и поля data["Close"].
+
+    Как у динамических данных Lean, поля доступны и атрибутами (data.Close)
+    без учета регистра; EndTime по умолчанию равен Time.
+    """
+
+    def __init__(self):
+        self.Symbol = None
+        self.Time = None
+        self.Value = 0.0
+        self._end_time = None
+        self._fields = {}
+
+    @property
+    def EndTime(self):
+        return self._end_time if self._end_time is not None else self.Time
+
+    @EndTime.setter
+    def EndTime(self, value):
+        self._end_time = value
+
+    def __setitem__(self, key, value):
+        self._fields[key] = value
+
+    def _field(self, key):
+        fields = self.__dict__.get("_fields") or {}
+        if key in fields:
+            return fields[key]
+        lowered = key.lower()
+        for name, value in fields.items():
+            if name.lower() == lowered:
+                return value
+        raise KeyError(key)
+
+    def __getitem__(self, key):
+        return self._field(key)
+
+    def __getattr__(self, name):
+        try:
+            return self._field(name)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def GetProperty(self, key):
+        try:
+            return self._field(key)
+        except KeyError:
+            return None
+
+
+class PythonIndicator:
+    def __init__(self):
+        self.Name = ""
+        self.Value = 0.0
+
+
+class QCAlgorithm:
+    pass
+
+
+class FeeModel:
+    """Модель комиссии по умолчанию (как FeeModel Lean для пользовательских данных) — без комиссии"""
+
+    def GetOrderFee(self, parameters):
+        return OrderFee(CashAmount(0.0, "USD"))
+
+
+class Slice:
+    pass
+
+
+class SubscriptionDataSource:
+    def __init__(self, source, transport_medium=None, file_format=None):
+        self.Source = source
+        self.TransportMedium = transport_medium
+        self.Format = file_format
+
+
+class SubscriptionDataConfig:
+    def __init__(self, symbol):
+        self.Symbol = symbol
+
+
+class Globals:
+    DataFolder = "Data"
+
+
+class SymbolProperties:
+    def __init__(self, description="", quote_currency="USD", contract_multiplier=1,
+                 minimum_price_variation=0.01, lot_size=1, market_ticker=""):
+        self.Description = description
+        self.QuoteCurrency = quote_currency
+        self.ContractMultiplier = contract_multiplier
+        self.MinimumPriceVariation = minimum_price_variation
+        self.LotSize = lot_size
+        self.MarketTicker = market_ticker
+
+
+class UpdateOrderFields:
+    def __init__(self):
+        self.StopPrice = None
+
+
+class OrderFee:
+    def __init__(self, value):
+        self.Value = value
+
+
+class CashAmount:
+    def __init__(self, amount, currency):
+        self.Amount = amount
+        self.Currency = currency
+
+
+Resolution = _Enum("Minute", "Hour", "Daily")
+SubscriptionTransportMedium = _Enum("LocalFile", "LOCAL_FILE", "RemoteFile")
+FileFormat = _Enum("Csv", "CSV", "ZipEntryName")
+OrderStatus = _Enum("New", "Submitted", "PartiallyFilled", "Filled", "Canceled", "Invalid")
+MovingAverageType = _Enum("Simple", "Exponential", "Wilders")
+
+
+EXPORTS = {
+    "np": np,
+    "pd": pd,
+    "PythonData": PythonData,
+    "PythonIndicator": PythonIndicator,
+    "QCAlgorithm": QCAlgorithm,
+    "FeeModel": FeeModel,
+    "SymbolProperties": SymbolProperties,
+    "Slice": Slice,
+    "SubscriptionDataSource": SubscriptionDataSource,
+    "SubscriptionDataConfig": SubscriptionDataConfig,
+    "Globals": Globals,
+    "UpdateOrderFields": UpdateOrderFields,
+    "OrderFee": OrderFee,
+    "CashAmount": CashAmount,
+    "Resolution": Resolution,
+    "SubscriptionTransportMedium": SubscriptionTransportMedium,
+    "FileFormat": FileFormat,
+    "OrderStatus": OrderStatus,
+    "MovingAverageType": MovingAverageType,
+}
+
+
+def install(exports: dict = None) -> types.ModuleType:
+    """
+    Регистрирует заглушку как модуль AlgorithmImports (если он еще не загружен).
+
+    Args:
+        exports: дополнительные или заменяющие имена модуля
+
+    Returns:
+        types.ModuleType: модуль AlgorithmImports
+    """
+    module = sys.modules.get("AlgorithmImports")
+    if module is None:
+        module = types.ModuleType("AlgorithmImports")
+        sys.modules["AlgorithmImports"] = module
+    module.__dict__.update(EXPORTS)
+    module.__dict__.update(exports or {})
+    return module
@@ -0,0 +1,1429 @@
+#!/usr/bin/env python3
+"""
+Локальный событийный движок: алгоритмы QCAlgorithm без Lean CLI и контейнера.
+
+Повторяет на чистом Python ту часть API Lean, которой пользуются наши стратегии
+(DonchianBTCWithFunding, RealisticBitcoinStrategy, DonchianBTCTrend), поэтому
+main.py проектов запускаются как есть, в текущем процессе:
+
+- AddData (PythonData: GetSource на каждую дату, Reader на каждую строку,
+  источники .zip и path.zip#entry) и AddCrypto (часовые/дневные zip Lean
+  crypto/<market>/<resolution>/<ticker>_trade.zip);
+- индикаторы EMA / SMA / ATR / DonchianChannel / Maximum / Minimum с семантикой
+  Lean (первая точка EMA — само значение, ATR Simple/Wilders/Exponential),
+  RegisterIndicator, в том числе PythonIndicator;
+- SetWarmUp, GetParameter(s), Debug / Log, SetRuntimeStatistic, ObjectStore;
+- MarketOrder, StopMarketOrder + OrderTicket.Update(UpdateOrderFields) / Cancel,
+  Liquidate, SetHoldings, OnOrderEvent, Portfolio / Securities / Transactions.
+
+Шаг времени — как в бэктесте Lean: новые данные -> сканирование стоп-ордеров
+(срабатывание, если low бара ниже стопа, исполнение по min(стоп, close)) ->
+обновление индикаторов -> OnData. Рыночные ордера исполняются сразу по
+Security.Price, комиссия — FeeModel инструмента. Сделки DonchianBTCWithFunding
+совпадают с optim/fast_backtest.py (а значит и с Lean, см. fast_parity.py).
+
+Чего нет: проверки покупательной способности и маржи, часов биржи, часовых
+поясов (все времена — как в файлах данных), консолидаторов. Статистика
+(self.statistics.total_performance) считается по дневному equity и сделкам
+PortfolioMetrics, как у быстрого бэктестера: близка к Lean, но не равна.
+
+Примеры:
+    python local_engine.py DonchianWithFunding --parameter dc_entry_len 30
+    python local_engine.py DonchianStrategy --data-folder /path/to/Data
+"""
+
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import heapq
+import importlib.util
+import io
+from itertools import groupby
+import json
+import math
+import os
+import sys
+import time as time_module
+import types
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+import lean_stubs
+from lean_stubs import (
+    CashAmount, FeeModel, FileFormat, Globals, OrderFee, SubscriptionDataConfig, SubscriptionDataSource,
+    SubscriptionTransportMedium, SymbolProperties, UpdateOrderFields, _Enum,
+)
+from paths import CONTAINER_DATA_DIR, HOST_DATA_DIR, PROJECT_ROOT, STRATEGY_DIR
+
+# Метрики — тем же кодом, что у fast_backtest и режима configs стратегии
+sys.path.append(STRATEGY_DIR)
+from PortfolioMetrics import compute_metrics  # noqa: E402
+
+
+RESOLUTION_PERIODS = {
+    "Minute": timedelta(minutes=1),
+    "Hour": timedelta(hours=1),
+    "Daily": timedelta(days=1),
+}
+
+# Lean оставляет свободными 0.25% портфеля при SetHoldings
+FREE_PORTFOLIO_VALUE_PERCENT = 0.0025
+
+# Binance: шаг лота BTC и комиссия тейкера по умолчанию в Lean
+CRYPTO_LOT_SIZE = 0.00001
+BINANCE_FEE_PERCENT = 0.001
+
+OrderType = _Enum("Market", "StopMarket")
+OrderDirection = _Enum("Buy", "Sell", "Hold")
+OrderStatus = _Enum(
+    "New", "Submitted", "PartiallyFilled", "Filled", "Canceled", "Invalid", "CancelPending", "UpdateSubmitted"
+)
+SeriesType = _Enum("Line", "Scatter", "Candle", "Bar", "Flag")
+
+
+class Market:
+    Binance = "binance"
+    Coinbase = "coinbase"
+    Kraken = "kraken"
+    USA = "usa"
+
+
+class Symbol:
+    """Тикер инструмента; равен строке с тем же тикером"""
+
+    __slots__ = ("Value", "ID")
+
+    def __init__(self, value: str, market: str = ""):
+        self.Value = value.upper()
+        self.ID = f"{self.Value} {market}".strip()
+
+    def __eq__(self, other):
+        if isinstance(other, Symbol):
+            return self.Value == other.Value
+        if isinstance(other, str):
+            return self.Value == other.upper()
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.Value)
+
+    def __str__(self):
+        return self.Value
+
+    __repr__ = __str__
+
+
+# ===== DATA =====
+
+class IndicatorDataPoint:
+    __slots__ = ("Time", "Value")
+
+    def __init__(self, time, value):
+        self.Time = time
+        self.Value = value
+
+    @property
+    def EndTime(self):
+        return self.Time
+
+    @property
+    def Price(self):
+        return self.Value
+
+    def __repr__(self):
+        return f"{self.Time}: {self.Value}"
+
+
+class TradeBar:
+    __slots__ = ("Symbol", "Time", "EndTime", "Open", "High", "Low", "Close", "Volume", "Period")
+
+    def __init__(self, time, symbol, open_, high, low, close, volume, period):
+        self.Symbol = symbol
+        self.Time = time
+        self.EndTime = time + period
+        self.Open = open_
+        self.High = high
+        self.Low = low
+        self.Close = close
+        self.Volume = volume
+        self.Period = period
+
+    @property
+    def Value(self):
+        return self.Close
+
+    @property
+    def Price(self):
+        return self.Close
+
+
+class LeanCryptoData:
+    """
+    Часовые/дневные бары Lean: crypto/<market>/<hour|daily>/<ticker>_trade.zip,
+    строки "yyyyMMdd HH:mm,open,high,low,close,volume"
+    """
+
+    def GetSource(self, config, date, isLiveMode):
+        return SubscriptionDataSource(
+            os.path.join(Globals.DataFolder, "crypto", config.Market, config.Resolution.lower(),
+                         f"{config.Symbol.Value.lower()}_trade.zip"),
+            SubscriptionTransportMedium.LocalFile, FileFormat.Csv)
+
+    def Reader(self, config, line, date, isLiveMode):
+        items = line.split(",")
+        if len(items) < 6 or not items[0][:1].isdigit():
+            return None
+        try:
+            time = datetime.strptime(items[0], "%Y%m%d %H:%M")
+            open_, high, low, close, volume = (float(x) for x in items[1:6])
+        except ValueError:
+            return None
+        return TradeBar(time, config.Symbol, open_, high, low, close, volume, RESOLUTION_PERIODS[config.Resolution])
+
+
+class Slice:
+    """Данные одного момента времени: последняя точка по каждому символу"""
+
+    def __init__(self, time):
+        self.Time = time
+        self._data = {}
+
+    def ContainsKey(self, symbol) -> bool:
+        return symbol in self._data
+
+    __contains__ = ContainsKey
+
+    def __getitem__(self, symbol):
+        return self._data[symbol]
+
+    def get(self, symbol, default=None):
+        return self._data.get(symbol, default)
+
+    @property
+    def Keys(self):
+        return list(self._data)
+
+    @property
+    def Bars(self):
+        return {s: d for s, d in self._data.items() if isinstance(d, TradeBar)}
+
+
+def _source_lines(source: str):
+    """Строки файла источника; .zip — первая запись архива или path.zip#entry"""
+    path, _, entry = source.partition("#")
+    if path.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            name = entry or archive.namelist()[0]
+            with archive.open(name) as raw:
+                for line in io.TextIOWrapper(raw, encoding="utf-8"):
+                    yield line.rstrip("\r\n")
+        return
+    with open(path) as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+class Subscription:
+    """
+    Подписка на данные: читает источники GetSource по датам, как Lean.
+
+    GetSource вызывается на каждую дату периода; повтор того же источника
+    (один CSV на весь период) не перечитывается. Точки отдаются по EndTime.
+    """
+
+    def __init__(self, algorithm, data_type, symbol, resolution, market=""):
+        self.algorithm = algorithm
+        self.data_type = data_type
+        self.symbol = symbol
+        self.resolution = resolution
+        self.config = SubscriptionDataConfig(symbol)
+        self.config.Resolution = resolution
+        self.config.Market = market
+        self.config.Type = data_type
+        # (индикатор, функция точки данных -> вход индикатора) в порядке регистрации
+        self.consolidators = []
+
+    @property
+    def period(self) -> timedelta:
+        return RESOLUTION_PERIODS[self.resolution]
+
+    def read(self, start: datetime, end: datetime):
+        """Точки с EndTime в [start, end) по возрастанию"""
+        factory = self.data_type()
+        previous_source = None
+        last_time = None
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end:
+            source = factory.GetSource(self.config, day, False)
+            day += timedelta(days=1)
+            if source is None or source.Source == previous_source:
+                continue
+            previous_source = source.Source
+            if not os.path.exists(source.Source.partition("#")[0]):
+                self.algorithm._missing_source(source.Source)
+                continue
+            for line in _source_lines(source.Source):
+                point = factory.Reader(self.config, line, day - timedelta(days=1), False)
+                if point is None:
+                    continue
+                end_time = point.EndTime
+                if end_time < start or end_time >= end:
+                    continue
+                # Как Lean: точки из прошлого относительно уже отданных пропускаются
+                if last_time is not None and end_time < last_time:
+                    continue
+                last_time = end_time
+                yield point
+
+
+# ===== INDICATORS =====
+
+class IndicatorBase:
+    """
+    Индикатор Lean: Current / Previous, Samples, IsReady, Update(input) или Update(time, value).
+
+    Индикаторы с BAR_INPUT получают от подписки саму точку (High / Low / Close),
+    остальные — IndicatorDataPoint(EndTime, Value).
+    """
+
+    BAR_INPUT = False
+
+    def __init__(self, name: str, period: int):
+        self.Name = name
+        self.WarmUpPeriod = period
+        self.Samples = 0
+        self.Current = IndicatorDataPoint(None, 0.0)
+        self.Previous = IndicatorDataPoint(None, 0.0)
+
+    @property
+    def IsReady(self) -> bool:
+        return self.Samples >= self.WarmUpPeriod
+
+    def Update(self, *args) -> bool:
+        input = IndicatorDataPoint(*args) if len(args) == 2 else args[0]
+        self.Samples += 1
+        self.Previous = self.Current
+        self.Current = IndicatorDataPoint(input.EndTime, self.ComputeNextValue(input))
+        return self.IsReady
+
+    def ComputeNextValue(self, input) -> float:
+        raise NotImplementedError
+
+    def Reset(self):
+        self.Samples = 0
+        self.Current = IndicatorDataPoint(None, 0.0)
+        self.Previous = IndicatorDataPoint(None, 0.0)
+
+    def __repr__(self):
+        return f"{self.Name}: {self.Current.Value}"
+
+
+class ExponentialMovingAverage(IndicatorBase):
+
+    def __init__(self, period: int, name: str = None):
+        super().__init__(name or f"EMA({period})", period)
+        self.k = 2.0 / (period + 1)
+
+    def ComputeNextValue(self, input) -> float:
+        # Первая точка — само значение
+        if self.Samples == 1:
+            return input.Value
+        return input.Value * self.k + self.Current.Value * (1 - self.k)
+
+
+class SimpleMovingAverage(IndicatorBase):
+    """Среднее по окну; до готовности — по имеющимся точкам"""
+
+    def __init__(self, period: int, name: str = None):
+        super().__init__(name or f"SMA({period})", period)
+        self.window = deque(maxlen=period)
+
+    def ComputeNextValue(self, input) -> float:
+        self.window.append(input.Value)
+        return sum(self.window) / len(self.window)
+
+    def Reset(self):
+        super().Reset()
+        self.window.clear()
+
+
+class WilderMovingAverage(IndicatorBase):
+    """Первые period точек — SMA, далее (prev * (n - 1) + x) / n"""
+
+    def __init__(self, period: int, name: str = None):
+        super().__init__(name or f"WWMA({period})", period)
+        self._sum = 0.0
+
+    def ComputeNextValue(self, input) -> float:
+        if self.Samples <= self.WarmUpPeriod:
+            self._sum += input.Value
+            return self._sum / self.Samples
+        return (self.Current.Value * (self.WarmUpPeriod - 1) + input.Value) / self.WarmUpPeriod
+
+    def Reset(self):
+        super().Reset()
+        self._sum = 0.0
+
+
+class Maximum(IndicatorBase):
+
+    def __init__(self, period: int, name: str = None):
+        super().__init__(name or f"MAX({period})", period)
+        self.window = deque(maxlen=period)
+
+    def ComputeNextValue(self, input) -> float:
+        self.window.append(input.Value)
+        return max(self.window)
+
+    def Reset(self):
+        super().Reset()
+        self.window.clear()
+
+
+class Minimum(Maximum):
+
+    def __init__(self, period: int, name: str = None):
+        super().__init__(period, name or f"MIN({period})")
+
+    def ComputeNextValue(self, input) -> float:
+        self.window.append(input.Value)
+        return min(self.window)
+
+
+class DonchianChannel(IndicatorBase):
+    """UpperBand — максимум High, LowerBand — минимум Low; Current — середина канала"""
+
+    BAR_INPUT = True
+
+    def __init__(self, *args):
+        # DonchianChannel(period), (upper, lower), (name, period), (name, upper, lower)
+        name = args[0] if args and isinstance(args[0], str) else None
+        periods = [a for a in args if not isinstance(a, str)]
+        upper, lower = (periods[0], periods[0]) if len(periods) == 1 else periods[:2]
+        super().__init__(name or f"DCH({upper},{lower})", max(upper, lower))
+        self.UpperBand = Maximum(upper, self.Name + "_UpperBand")
+        self.LowerBand = Minimum(lower, self.Name + "_LowerBand")
+
+    @property
+    def IsReady(self) -> bool:
+        return self.UpperBand.IsReady and self.LowerBand.IsReady
+
+    def ComputeNextValue(self, input) -> float:
+        self.UpperBand.Update(input.EndTime, input.High)
+        self.LowerBand.Update(input.EndTime, input.Low)
+        return (self.UpperBand.Current.Value + self.LowerBand.Current.Value) / 2.0
+
+    def Reset(self):
+        super().Reset()
+        self.UpperBand.Reset()
+        self.LowerBand.Reset()
+
+
+class AverageTrueRange(IndicatorBase):
+    """
+    ATR Lean: TR первой точки — High - Low, дальше max(H - L, |H - C_prev|, |L - C_prev|),
+    сглаживание MovingAverageType; готов вместе со сглаживанием.
+    """
+
+    BAR_INPUT = True
+
+    SMOOTHERS = {
+        "Simple": SimpleMovingAverage,
+        "Wilders": WilderMovingAverage,
+        "Exponential": ExponentialMovingAverage,
+    }
+
+    def __init__(self, period: int, moving_average_type: str = "Wilders", name: str = None):
+        super().__init__(name or f"ATR({period})", period)
+        self.TrueRange = IndicatorDataPoint(None, 0.0)
+        self._smoother = self.SMOOTHERS[moving_average_type](period)
+        self._previous_close = None
+
+    @property
+    def IsReady(self) -> bool:
+        return self._smoother.IsReady
+
+    def ComputeNextValue(self, input) -> float:
+        high, low = input.High, input.Low
+        if self._previous_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self._previous_close), abs(low - self._previous_close))
+        self._previous_close = input.Close
+        self.TrueRange = IndicatorDataPoint(input.EndTime, true_range)
+        self._smoother.Update(self.TrueRange)
+        return self._smoother.Current.Value
+
+    def Reset(self):
+        super().Reset()
+        self._smoother.Reset()
+        self._previous_close = None
+
+
+# ===== CHARTS (без вывода) =====
+
+class Chart:
+
+    def __init__(self, name: str):
+        self.Name = name
+        self.Series = {}
+
+    def AddSeries(self, series):
+        self.Series[series.Name] = series
+
+
+class Series:
+
+    def __init__(self, name: str, series_type=None, index: int = 0, unit: str = "$"):
+        self.Name = name
+        self.SeriesType = series_type
+        self.Index = index
+        self.Unit = unit
+
+
+# ===== SECURITIES / PORTFOLIO =====
+
+class PercentageFeeModel(FeeModel):
+    """Комиссия — доля от Security.Price x количество (как BinanceFeeModel для рыночных ордеров)"""
+
+    def __init__(self, percent: float):
+        self.percent = percent
+
+    def GetOrderFee(self, parameters):
+        value = parameters.Security.Price * abs(parameters.Order.Quantity) * self.percent
+        return OrderFee(CashAmount(value, parameters.Security.QuoteCurrency.Symbol))
+
+
+class OrderFeeParameters:
+
+    def __init__(self, security, order):
+        self.Security = security
+        self.Order = order
+
+
+class SecurityHolding:
+
+    def __init__(self, security):
+        self.Security = security
+        self.Symbol = security.Symbol
+        self.Quantity = 0.0
+        self.AveragePrice = 0.0
+        self.LastTradeProfit = 0.0
+        self.TotalFees = 0.0
+        self.NetProfit = 0.0
+
+    @property
+    def Invested(self) -> bool:
+        return self.Quantity != 0
+
+    @property
+    def IsLong(self) -> bool:
+        return self.Quantity > 0
+
+    @property
+    def IsShort(self) -> bool:
+        return self.Quantity < 0
+
+    @property
+    def HoldingsValue(self) -> float:
+        return self.Quantity * self.Security.Price
+
+    @property
+    def AbsoluteQuantity(self) -> float:
+        return abs(self.Quantity)
+
+    @property
+    def UnrealizedProfit(self) -> float:
+        return (self.Security.Price - self.AveragePrice) * self.Quantity
+
+
+class Security:
+
+    def __init__(self, symbol, symbol_properties, fee_model, quote_currency="USD"):
+        self.Symbol = symbol
+        self.SymbolProperties = symbol_properties
+        self.FeeModel = fee_model
+        self.QuoteCurrency = types.SimpleNamespace(Symbol=quote_currency)
+        self.Leverage = 1.0
+        self.Holdings = SecurityHolding(self)
+        self.Price = 0.0
+        self.Open = self.High = self.Low = self.Close = 0.0
+        self.Volume = 0.0
+        self._last_data = None
+
+    @property
+    def HasData(self) -> bool:
+        return self._last_data is not None
+
+    def GetLastData(self):
+        return self._last_data
+
+    def SetLeverage(self, leverage: float):
+        self.Leverage = float(leverage)
+
+    def SetFeeModel(self, fee_model):
+        self.FeeModel = fee_model
+
+    def _set_data(self, point):
+        self._last_data = point
+        price = point.Value
+        self.Price = price
+        self.Close = getattr(point, "Close", price)
+        self.Open = getattr(point, "Open", price)
+        self.High = getattr(point, "High", price)
+        self.Low = getattr(point, "Low", price)
+        self.Volume = getattr(point, "Volume", 0.0)
+
+
+class SecurityManager(dict):
+
+    def ContainsKey(self, symbol) -> bool:
+        return symbol in self
+
+
+class SecurityPortfolioManager:
+    """Кэш, позиции и сделки flat-to-flat (для статистики)"""
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.securities = algorithm.Securities
+        self.Cash = 0.0
+        self.TotalFees = 0.0
+        # Закрытые сделки: (pnl, entry_price, quantity, R, holding_hours)
+        self.closed_trades = []
+        self._open_trades = {}
+
+    def __getitem__(self, symbol) -> SecurityHolding:
+        return self.securities[symbol].Holdings
+
+    def ContainsKey(self, symbol) -> bool:
+        return symbol in self.securities
+
+    def Values(self):
+        return [security.Holdings for security in self.securities.values()]
+
+    @property
+    def Invested(self) -> bool:
+        return any(security.Holdings.Invested for security in self.securities.values())
+
+    @property
+    def TotalHoldingsValue(self) -> float:
+        return sum(security.Holdings.HoldingsValue for security in self.securities.values())
+
+    @property
+    def TotalPortfolioValue(self) -> float:
+        return self.Cash + self.TotalHoldingsValue
+
+    @property
+    def TotalUnrealizedProfit(self) -> float:
+        return sum(security.Holdings.UnrealizedProfit for security in self.securities.values())
+
+    def SetCash(self, cash: float):
+        self.Cash = float(cash)
+
+    def process_fill(self, security, quantity: float, price: float, fee: float):
+        holding = security.Holdings
+        before = holding.Quantity
+        after = before + quantity
+        self.Cash -= quantity * price + fee
+        self.TotalFees += fee
+        holding.TotalFees += fee
+
+        if before == 0 or (before > 0) == (quantity > 0):
+            holding.AveragePrice = (holding.AveragePrice * before + price * quantity) / after
+        else:
+            closed = math.copysign(min(abs(quantity), abs(before)), before)
+            profit = (price - holding.AveragePrice) * closed
+            holding.LastTradeProfit = profit
+            holding.NetProfit += profit
+            trade = self._open_trades.get(security.Symbol)
+            if trade is not None:
+                trade["pnl"] += profit
+            if abs(quantity) > abs(before):
+                holding.AveragePrice = price
+        holding.Quantity = after if abs(after) > 1e-12 else 0.0
+        if holding.Quantity == 0:
+            holding.AveragePrice = 0.0
+        self._track_trade(security.Symbol, before, holding, fee)
+
+    def _track_trade(self, symbol, before: float, holding: SecurityHolding, fee: float):
+        time = self.algorithm.Time
+        trade = self._open_trades.get(symbol)
+        if trade is None and holding.Quantity != 0:
+            self._open_trades[symbol] = {
+                "entry_time": time, "entry_price": holding.AveragePrice,
+                "quantity": abs(holding.Quantity), "pnl": 0.0,
+            }
+            return
+        if trade is None:
+            return
+        trade["quantity"] = max(trade["quantity"], abs(holding.Quantity))
+        # Переворот позиции закрывает сделку и открывает новую
+        if holding.Quantity == 0 or (before > 0) != (holding.Quantity > 0):
+            hours = (time - trade["entry_time"]).total_seconds() / 3600.0
+            self.closed_trades.append((trade["pnl"], trade["entry_price"], trade["quantity"], 0.0, hours))
+            del self._open_trades[symbol]
+            if holding.Quantity != 0:
+                self._track_trade(symbol, 0.0, holding, fee)
+
+
+# ===== ORDERS =====
+
+class Order:
+
+    def __init__(self, order_id, symbol, quantity, order_type, time, stop_price=None, tag=""):
+        self.Id = order_id
+        self.Symbol = symbol
+        self.Quantity = quantity
+        self.Type = order_type
+        self.Time = time
+        self.StopPrice = stop_price
+        self.Tag = tag
+        self.Status = OrderStatus.New
+        self.Price = 0.0
+
+    @property
+    def Direction(self):
+        return OrderDirection.Buy if self.Quantity > 0 else OrderDirection.Sell
+
+
+class OrderEvent:
+
+    def __init__(self, order, status, time, fill_price=0.0, fill_quantity=0.0, fee=0.0):
+        self.OrderId = order.Id
+        self.Symbol = order.Symbol
+        self.Status = status
+        self.Direction = order.Direction
+        self.FillPrice = fill_price
+        self.FillQuantity = fill_quantity
+        self.OrderFee = OrderFee(CashAmount(fee, "USD"))
+        self.UtcTime = time
+        self.Quantity = order.Quantity
+
+    def __repr__(self):
+        return f"OrderEvent({self.OrderId} {self.Symbol} {self.Status} {self.FillQuantity}@{self.FillPrice})"
+
+
+class OrderResponse:
+
+    def __init__(self, success: bool, message: str = ""):
+        self.IsSuccess = success
+        self.IsError = not success
+        self.ErrorMessage = message
+
+
+class OrderTicket:
+
+    def __init__(self, transactions, order):
+        self._transactions = transactions
+        self._order = order
+
+    @property
+    def OrderId(self):
+        return self._order.Id
+
+    @property
+    def Symbol(self):
+        return self._order.Symbol
+
+    @property
+    def Quantity(self):
+        return self._order.Quantity
+
+    @property
+    def OrderType(self):
+        return self._order.Type
+
+    @property
+    def Status(self):
+        return self._order.Status
+
+    @property
+    def QuantityFilled(self):
+        return self._order.Quantity if self._order.Status == OrderStatus.Filled else 0.0
+
+    @property
+    def AverageFillPrice(self):
+        return self._order.Price
+
+    def Get(self, field):
+        return getattr(self._order, str(field))
+
+    def Update(self, fields) -> OrderResponse:
+        return self._transactions.update_order(self._order, fields)
+
+    def UpdateStopPrice(self, stop_price) -> OrderResponse:
+        fields = UpdateOrderFields()
+        fields.StopPrice = stop_price
+        return self.Update(fields)
+
+    def Cancel(self, tag: str = "") -> OrderResponse:
+        return self._transactions.cancel_order(self._order)
+
+
+class SecurityTransactionManager:
+    """Ордера: рыночные исполняются сразу, стоп-ордера ждут сканирования на новых данных"""
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.orders = {}
+        self._open_stops = []
+        self._next_id = 1
+
+    def GetOrderById(self, order_id):
+        return self.orders.get(order_id)
+
+    def GetOpenOrders(self, symbol=None) -> list:
+        return [o for o in self._open_stops if symbol is None or o.Symbol == symbol]
+
+    def CancelOpenOrders(self, symbol=None) -> list:
+        return [self.cancel_order(order) for order in self.GetOpenOrders(symbol)]
+
+    @property
+    def OrdersCount(self) -> int:
+        return len(self.orders)
+
+    def submit(self, symbol, quantity, order_type, stop_price=None, tag="") -> OrderTicket:
+        algorithm = self.algorithm
+        security = algorithm.Securities[symbol]
+        quantity = self._round_lot(quantity, security.SymbolProperties.LotSize)
+        order = Order(self._next_id, security.Symbol, quantity, order_type, algorithm.Time, stop_price, tag)
+        self._next_id += 1
+        self.orders[order.Id] = order
+        ticket = OrderTicket(self, order)
+
+        if algorithm.IsWarmingUp:
+            return self._invalid(order, ticket, "This operation is not allowed during warm up")
+        if quantity == 0:
+            return self._invalid(order, ticket, "Order quantity is less than the lot size")
+        if not security.HasData:
+            return self._invalid(order, ticket, f"No data for {security.Symbol} yet")
+
+        order.Status = OrderStatus.Submitted
+        algorithm._order_event(OrderEvent(order, OrderStatus.Submitted, algorithm.Time))
+        if order_type == OrderType.Market:
+            self._fill(order, security.Price)
+        else:
+            self._open_stops.append(order)
+        return ticket
+
+    @staticmethod
+    def _round_lot(quantity: float, lot_size: float) -> float:
+        # Как Lean: вниз по модулю до целого числа лотов
+        lots = math.floor(abs(quantity) / lot_size + 1e-9)
+        return math.copysign(round(lots * lot_size, 10), quantity) if lots else 0.0
+
+    def _invalid(self, order, ticket, message: str) -> OrderTicket:
+        order.Status = OrderStatus.Invalid
+        self.algorithm.Debug(f"Order {order.Id} invalid: {message}")
+        self.algorithm._order_event(OrderEvent(order, OrderStatus.Invalid, self.algorithm.Time))
+        return ticket
+
+    def _fill(self, order, price: float):
+        algorithm = self.algorithm
+        security = algorithm.Securities[order.Symbol]
+        fee = security.FeeModel.GetOrderFee(OrderFeeParameters(security, order)).Value.Amount
+        order.Status = OrderStatus.Filled
+        order.Price = price
+        algorithm.Portfolio.process_fill(security, order.Quantity, price, fee)
+        algorithm._order_event(OrderEvent(order, OrderStatus.Filled, algorithm.Time, price, order.Quantity, fee))
+
+    def scan_stops(self):
+        """Стоп-ордера, выставленные до текущего шага, по данным этого шага"""
+        if not self._open_stops:
+            return
+        now = self.algorithm.Time
+        for order in list(self._open_stops):
+            if order.Status != OrderStatus.Submitted or order.Time >= now:
+                continue
+            security = self.algorithm.Securities[order.Symbol]
+            if order.Quantity < 0 and security.Low < order.StopPrice:
+                price = min(order.StopPrice, security.Close)
+            elif order.Quantity > 0 and security.High > order.StopPrice:
+                price = max(order.StopPrice, security.Close)
+            else:
+                continue
+            self._open_stops.remove(order)
+            self._fill(order, price)
+
+    def update_order(self, order, fields) -> OrderResponse:
+        if order.Status != OrderStatus.Submitted:
+            return OrderResponse(False, f"Order {order.Id} is {order.Status}")
+        if getattr(fields, "StopPrice", None) is not None:
+            order.StopPrice = fields.StopPrice
+        if getattr(fields, "Quantity", None) is not None:
+            order.Quantity = fields.Quantity
+        self.algorithm._order_event(OrderEvent(order, OrderStatus.UpdateSubmitted, self.algorithm.Time))
+        return OrderResponse(True)
+
+    def cancel_order(self, order) -> OrderResponse:
+        if order.Status != OrderStatus.Submitted:
+            return OrderResponse(False, f"Order {order.Id} is {order.Status}")
+        order.Status = OrderStatus.Canceled
+        if order in self._open_stops:
+            self._open_stops.remove(order)
+        self.algorithm._order_event(OrderEvent(order, OrderStatus.Canceled, self.algorithm.Time))
+        return OrderResponse(True)
+
+
+# ===== OBJECT STORE =====
+
+class LocalObjectStore:
+    """ObjectStore в папке на диске (как storage/ проекта у Lean CLI)"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def GetFilePath(self, key: str) -> str:
+        path = os.path.join(self.root, *key.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def ContainsKey(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self.root, *key.split("/")))
+
+    def SaveBytes(self, key: str, data) -> bool:
+        with open(self.GetFilePath(key), "wb") as f:
+            f.write(bytes(data))
+        return True
+
+    def Save(self, key: str, text: str) -> bool:
+        return self.SaveBytes(key, text.encode("utf-8"))
+
+    def ReadBytes(self, key: str) -> bytes:
+        with open(os.path.join(self.root, *key.split("/")), "rb") as f:
+            return f.read()
+
+    def Read(self, key: str) -> str:
+        return self.ReadBytes(key).decode("utf-8")
+
+    def Delete(self, key: str) -> bool:
+        path = os.path.join(self.root, *key.split("/"))
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+        return True
+
+
+# ===== ALGORITHM =====
+
+class QCAlgorithm:
+    """
+    Базовый класс алгоритма. Стратегии наследуют его из AlgorithmImports
+    (после install()) и не знают, что работают не в Lean.
+    """
+
+    def __init__(self, parameters: dict = None, object_store_root: str = None, quiet: bool = True):
+        self._parameters = {k: str(v) for k, v in (parameters or {}).items()}
+        self._quiet = quiet
+        self.Securities = SecurityManager()
+        self.Portfolio = SecurityPortfolioManager(self)
+        self.Transactions = SecurityTransactionManager(self)
+        self.ObjectStore = LocalObjectStore(object_store_root or os.path.join(os.getcwd(), "storage"))
+        self.StartDate = datetime(1998, 1, 1)
+        self.EndDate = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.Time = self.StartDate
+        self.IsWarmingUp = False
+        self.RuntimeStatistics = {}
+        self.logs = []
+        self.statistics = None
+        self._warmup = None
+        self._subscriptions = []
+        self._missing_sources = set()
+
+    @property
+    def Statistics(self):
+        return self.statistics
+
+    @property
+    def UtcTime(self):
+        return self.Time
+
+    # --- setup ---
+
+    def SetStartDate(self, year, month=None, day=None):
+        self.StartDate = year if isinstance(year, datetime) else datetime(year, month, day)
+
+    def SetEndDate(self, year, month=None, day=None):
+        self.EndDate = year if isinstance(year, datetime) else datetime(year, month, day)
+
+    def SetCash(self, cash):
+        self.Portfolio.SetCash(cash)
+
+    def SetWarmUp(self, period, resolution=None):
+        """Число баров (в разрешении подписок) или timedelta"""
+        self._warmup = (period, resolution)
+
+    def SetWarmup(self, period, resolution=None):
+        self.SetWarmUp(period, resolution)
+
+    def SetBenchmark(self, *args):
+        pass
+
+    def SetBrokerageModel(self, *args):
+        pass
+
+    def SetTimeZone(self, *args):
+        pass
+
+    def GetParameter(self, name: str, default=None):
+        value = self._parameters.get(name)
+        return value if value is not None else default
+
+    def GetParameters(self) -> dict:
+        return dict(self._parameters)
+
+    # --- data ---
+
+    def _add_security(self, data_type, ticker, resolution, symbol_properties, fee_model, market="",
+                      quote_currency="USD"):
+        symbol = Symbol(ticker, market)
+        security = Security(symbol, symbol_properties, fee_model, quote_currency)
+        self.Securities[symbol] = security
+        self._subscriptions.append(Subscription(self, data_type, symbol, resolution or "Hour", market))
+        return security
+
+    def AddData(self, data_type, ticker: str, resolution=None, *args, **kwargs):
+        # Настройки Lean для пользовательских данных: лот 1, без комиссии
+        properties = SymbolProperties(ticker, "USD", 1, 0.01, 1, ticker)
+        return self._add_security(data_type, ticker, resolution, properties, FeeModel())
+
+    def AddCrypto(self, ticker: str, resolution=None, market=Market.Binance, *args, **kwargs):
+        quote = "USDT" if ticker.upper().endswith("USDT") else "USD"
+        properties = SymbolProperties(ticker, quote, 1, 0.01, CRYPTO_LOT_SIZE, ticker)
+        return self._add_security(LeanCryptoData, ticker, resolution, properties,
+                                  PercentageFeeModel(BINANCE_FEE_PERCENT), market, quote)
+
+    def _subscription(self, symbol) -> Subscription:
+        for subscription in self._subscriptions:
+            if subscription.symbol == symbol:
+                return subscription
+        raise KeyError(f"{symbol} is not subscribed")
+
+    def _missing_source(self, source: str):
+        if source not in self._missing_sources:
+            self._missing_sources.add(source)
+            self.Debug(f"Data source not found: {source}")
+
+    # --- indicators ---
+
+    def RegisterIndicator(self, symbol, indicator, resolution=None, selector=None):
+        if selector is not None:
+            feed = lambda point: IndicatorDataPoint(point.EndTime, selector(point))
+        elif getattr(indicator, "BAR_INPUT", False):
+            feed = None
+        else:
+            feed = lambda point: IndicatorDataPoint(point.EndTime, point.Value)
+        self._subscription(symbol).consolidators.append((indicator, feed))
+
+    def EMA(self, symbol, period: int, resolution=None, selector=None):
+        indicator = ExponentialMovingAverage(period, f"EMA{period}_{symbol}")
+        self.RegisterIndicator(symbol, indicator, resolution, selector)
+        return indicator
+
+    def SMA(self, symbol, period: int, resolution=None, selector=None):
+        indicator = SimpleMovingAverage(period, f"SMA{period}_{symbol}")
+        self.RegisterIndicator(symbol, indicator, resolution, selector)
+        return indicator
+
+    def ATR(self, symbol, period: int, type="Wilders", resolution=None, selector=None):
+        indicator = AverageTrueRange(period, type, f"ATR{period}_{symbol}")
+        self.RegisterIndicator(symbol, indicator, resolution)
+        return indicator
+
+    def DCH(self, symbol, upper_period: int, lower_period: int = None, resolution=None):
+        indicator = DonchianChannel(f"DCH_{symbol}", upper_period, lower_period or upper_period)
+        self.RegisterIndicator(symbol, indicator, resolution)
+        return indicator
+
+    def MAX(self, symbol, period: int, resolution=None, selector=None):
+        indicator = Maximum(period, f"MAX{period}_{symbol}")
+        self.RegisterIndicator(symbol, indicator, resolution, selector)
+        return indicator
+
+    def MIN(self, symbol, period: int, resolution=None, selector=None):
+        indicator = Minimum(period, f"MIN{period}_{symbol}")
+        self.RegisterIndicator(symbol, indicator, resolution, selector)
+        return indicator
+
+    # --- orders ---
+
+    def MarketOrder(self, symbol, quantity, asynchronous=False, tag=""):
+        return self.Transactions.submit(symbol, quantity, OrderType.Market, tag=tag)
+
+    def StopMarketOrder(self, symbol, quantity, stop_price, tag=""):
+        return self.Transactions.submit(symbol, quantity, OrderType.StopMarket, stop_price=stop_price, tag=tag)
+
+    def Liquidate(self, symbol=None, tag="Liquidated") -> list:
+        symbols = [symbol] if symbol is not None else list(self.Securities)
+        order_ids = []
+        for s in symbols:
+            self.Transactions.CancelOpenOrders(s)
+            quantity = self.Portfolio[s].Quantity
+            if quantity != 0:
+                order_ids.append(self.MarketOrder(s, -quantity, tag=tag).OrderId)
+        return order_ids
+
+    def SetHoldings(self, symbol, fraction: float, liquidate_existing_holdings=False, tag=""):
+        """
+        Приближение SetHoldings Lean: цель — доля от стоимости портфеля за вычетом
+        свободных 0.25%, с поправкой на комиссию; количество — вниз до лота.
+        """
+        security = self.Securities[symbol]
+        price = security.Price
+        if price <= 0:
+            return None
+        target_value = self.Portfolio.TotalPortfolioValue * (1 - FREE_PORTFOLIO_VALUE_PERCENT) * fraction
+        quantity = (target_value - security.Holdings.HoldingsValue) / price
+        if quantity == 0:
+            return None
+        probe = Order(0, security.Symbol, quantity, OrderType.Market, self.Time)
+        fee = security.FeeModel.GetOrderFee(OrderFeeParameters(security, probe)).Value.Amount
+        quantity -= math.copysign(fee / price, quantity)
+        return self.MarketOrder(symbol, quantity, tag=tag)
+
+    def OnOrderEvent(self, orderEvent):
+        pass
+
+    def _order_event(self, order_event):
+        self.OnOrderEvent(order_event)
+
+    # --- output ---
+
+    def Debug(self, message):
+        self.logs.append(f"{self.Time} {message}")
+        if not self._quiet:
+            print(f"{self.Time} {message}")
+
+    Log = Debug
+    Error = Debug
+
+    def SetRuntimeStatistic(self, name: str, value):
+        self.RuntimeStatistics[name] = str(value)
+
+    def AddChart(self, chart):
+        pass
+
+    def Plot(self, *args):
+        pass
+
+    # --- callbacks ---
+
+    def Initialize(self):
+        pass
+
+    def OnData(self, data):
+        pass
+
+    def OnEndOfAlgorithm(self):
+        pass
+
+
+# ===== ENGINE =====
+
+def _warmup_start(algorithm) -> datetime:
+    if algorithm._warmup is None:
+        return algorithm.StartDate
+    period, resolution = algorithm._warmup
+    if isinstance(period, timedelta):
+        return algorithm.StartDate - period
+    # Бары — в самом мелком разрешении подписок (или явно заданном)
+    if resolution is not None:
+        step = RESOLUTION_PERIODS[resolution]
+    else:
+        step = min((s.period for s in algorithm._subscriptions), default=RESOLUTION_PERIODS["Daily"])
+    return algorithm.StartDate - step * int(period)
+
+
+def _feed_indicators(subscription, point):
+    for indicator, feed in subscription.consolidators:
+        indicator.Update(point if feed is None else feed(point))
+
+
+def _statistics(algorithm, daily_equity: list, initial_cash: float):
+    """self.statistics.total_performance.* в именах pythonnet (snake_case)"""
+    trades = pd.DataFrame(algorithm.Portfolio.closed_trades,
+                          columns=["pnl", "entry_price", "quantity", "R", "holding_hours"])
+    trades.insert(0, "config", 0)
+    equity = np.array(daily_equity, dtype=float).reshape(-1, 1)
+    row = compute_metrics([{}], trades, equity, initial_cash, algorithm.StartDate, algorithm.EndDate).iloc[0]
+
+    portfolio = types.SimpleNamespace(
+        sharpe_ratio=row["sharpe"],
+        sortino_ratio=row["sortino"],
+        win_rate=row["win_rate"],
+        loss_rate=(1.0 - row["win_rate"]) if row["total_trades"] else 0.0,
+        average_win_rate=row["average_win_rate"],
+        average_loss_rate=row["average_loss_rate"],
+        drawdown=row["max_drawdown_pct"],
+        expectancy=row["expectancy"],
+        compounding_annual_return=row["cagr"],
+        start_equity=row["start_equity"],
+        end_equity=row["end_equity"],
+        total_net_profit=row["end_equity"] / initial_cash - 1.0,
+    )
+    trade = types.SimpleNamespace(
+        total_number_of_trades=int(row["total_trades"]),
+        average_trade_duration=pd.Timedelta(row["average_trade_duration"]).to_pytimedelta(),
+        profit_factor=row["profit_factor"],
+        total_fees=algorithm.Portfolio.TotalFees,
+    )
+    return types.SimpleNamespace(total_performance=types.SimpleNamespace(
+        portfolio_statistics=portfolio, trade_statistics=trade))
+
+
+class LocalBacktestResult:
+    """Итог прогона: статистика, runtime-статистики, лог, сделки и дневной equity"""
+
+    def __init__(self, algorithm, daily_equity, equity_dates, elapsed):
+        self.algorithm = algorithm
+        self.statistics = algorithm.statistics
+        self.runtime_statistics = dict(algorithm.RuntimeStatistics)
+        self.logs = list(algorithm.logs)
+        self.trades = pd.DataFrame(algorithm.Portfolio.closed_trades,
+                                   columns=["pnl", "entry_price", "quantity", "R", "holding_hours"])
+        self.daily_equity = pd.Series(daily_equity, index=pd.to_datetime(equity_dates), name="equity")
+        self.elapsed = elapsed
+
+    def summary(self) -> dict:
+        """Плоский словарь для таблиц и передачи между процессами"""
+        portfolio = self.statistics.total_performance.portfolio_statistics
+        trade = self.statistics.total_performance.trade_statistics
+        row = {f"portfolio_{k}": v for k, v in vars(portfolio).items()}
+        row.update({f"trade_{k}": (v.total_seconds() / 3600.0 if isinstance(v, timedelta) else v)
+                    for k, v in vars(trade).items()})
+        row.update(self.runtime_statistics)
+        row["elapsed_sec"] = self.elapsed
+        return row
+
+
+def run(algorithm, data_folder: str = HOST_DATA_DIR) -> LocalBacktestResult:
+    """
+    Прогон уже созданного экземпляра алгоритма: Initialize, цикл по данным, OnEndOfAlgorithm.
+
+    Args:
+        algorithm: экземпляр подкласса QCAlgorithm этого модуля
+        data_folder: папка данных (Globals.DataFolder)
+    """
+    started = time_module.perf_counter()
+    Globals.DataFolder = data_folder
+    algorithm.Initialize()
+    initial_cash = algorithm.Portfolio.TotalPortfolioValue
+
+    start = algorithm.StartDate
+    # SetEndDate включает весь последний день
+    end = algorithm.EndDate.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    warmup_start = _warmup_start(algorithm)
+    algorithm.IsWarmingUp = warmup_start < start
+
+    subscriptions = {s.symbol: s for s in algorithm._subscriptions}
+    streams = [s.read(warmup_start, end) for s in algorithm._subscriptions]
+    merged = heapq.merge(*streams, key=lambda point: point.EndTime)
+
+    daily_equity = [initial_cash]
+    equity_dates = [start - timedelta(days=1)]
+    last_time = None
+    securities = algorithm.Securities
+    transactions = algorithm.Transactions
+
+    for time, points in groupby(merged, key=lambda point: point.EndTime):
+        # Первый шаг нового дня: equity прошлого дня — по ценам его последнего шага
+        if last_time is not None and last_time >= start and time.date() != last_time.date():
+            daily_equity.append(algorithm.Portfolio.TotalPortfolioValue)
+            equity_dates.append(last_time.date())
+        last_time = time
+
+        algorithm.Time = time
+        algorithm.IsWarmingUp = time < start
+        data = Slice(time)
+        points = list(points)
+        for point in points:
+            securities[point.Symbol]._set_data(point)
+            data._data[point.Symbol] = point
+
+        transactions.scan_stops()
+        for point in points:
+            _feed_indicators(subscriptions[point.Symbol], point)
+
+        algorithm.OnData(data)
+
+    if last_time is not None and last_time >= start:
+        daily_equity.append(algorithm.Portfolio.TotalPortfolioValue)
+        equity_dates.append(last_time.date())
+
+    algorithm.IsWarmingUp = False
+    algorithm.statistics = _statistics(algorithm, daily_equity, initial_cash)
+    algorithm.OnEndOfAlgorithm()
+    return LocalBacktestResult(algorithm, daily_equity, equity_dates, time_module.perf_counter() - started)
+
+
+# ===== LOADING =====
+
+ENGINE_EXPORTS = {
+    "QCAlgorithm": QCAlgorithm,
+    "Slice": Slice,
+    "Symbol": Symbol,
+    "Market": Market,
+    "TradeBar": TradeBar,
+    "IndicatorDataPoint": IndicatorDataPoint,
+    "ExponentialMovingAverage": ExponentialMovingAverage,
+    "SimpleMovingAverage": SimpleMovingAverage,
+    "WilderMovingAverage": WilderMovingAverage,
+    "AverageTrueRange": AverageTrueRange,
+    "DonchianChannel": DonchianChannel,
+    "Maximum": Maximum,
+    "Minimum": Minimum,
+    "OrderType": OrderType,
+    "OrderDirection": OrderDirection,
+    "OrderStatus": OrderStatus,
+    "OrderEvent": OrderEvent,
+    "OrderTicket": OrderTicket,
+    "Chart": Chart,
+    "Series": Series,
+    "SeriesType": SeriesType,
+}
+
+
+def install():
+    """Регистрирует AlgorithmImports с классами движка (до импорта стратегий)"""
+    return lean_stubs.install(exports=ENGINE_EXPORTS)
+
+
+def _project_dir(project: str) -> str:
+    if os.path.isdir(project):
+        return os.path.abspath(project)
+    return os.path.join(PROJECT_ROOT, project)
+
+
+def load_algorithm(project: str, class_name: str = None):
+    """
+    Загружает main.py проекта Lean и возвращает класс алгоритма.
+
+    Модули проекта импортируются из его папки; одноименные модули другого проекта
+    (HotPathTimer, BarParsing) выгружаются из sys.modules, чтобы не смешивать копии.
+
+    Args:
+        project: имя папки проекта в корне репозитория или путь к ней
+        class_name: имя класса (по умолчанию — единственный подкласс QCAlgorithm в main.py)
+    """
+    install()
+    project_dir = _project_dir(project)
+    if project_dir in sys.path:
+        sys.path.remove(project_dir)
+    sys.path.insert(0, project_dir)
+    for filename in os.listdir(project_dir):
+        name, ext = os.path.splitext(filename)
+        module = sys.modules.get(name)
+        if ext == ".py" and module is not None:
+            module_file = getattr(module, "__file__", None) or ""
+            if os.path.dirname(os.path.abspath(module_file)) != project_dir:
+                del sys.modules[name]
+
+    module_name = "_local_engine_" + os.path.basename(project_dir)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(project_dir, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+
+    candidates = [
+        obj for obj in vars(module).values()
+        if isinstance(obj, type) and issubclass(obj, QCAlgorithm) and obj is not QCAlgorithm
+        and obj.__module__ == module_name
+    ]
+    if class_name is not None:
+        candidates = [obj for obj in candidates if obj.__name__ == class_name]
+    if len(candidates) != 1:
+        raise ValueError(f"{project_dir}/main.py: expected one QCAlgorithm subclass, found "
+                         f"{[obj.__name__ for obj in candidates]}")
+    return candidates[0]
+
+
+def project_parameters(project: str) -> dict:
+    """Параметры из config.json проекта (как их видит Lean CLI без --parameter)"""
+    path = os.path.join(_project_dir(project), "config.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return dict(json.load(f).get("parameters") or {})
+
+
+def host_parameters(parameters: dict, data_folder: str) -> dict:
+    """Пути контейнера (/Lean/Data/...) в значениях параметров -> пути в data_folder"""
+    result = {}
+    for name, value in parameters.items():
+        value = str(value)
+        if value == CONTAINER_DATA_DIR or value.startswith(CONTAINER_DATA_DIR + "/"):
+            value = os.path.join(data_folder, *value[len(CONTAINER_DATA_DIR):].split("/"))
+        result[name] = value
+    return result
+
+
+def run_algorithm(project: str, parameters: dict = None, data_folder: str = HOST_DATA_DIR,
+                  class_name: str = None, quiet: bool = True, object_store_root: str = None) -> LocalBacktestResult:
+    """
+    Загружает и прогоняет алгоритм проекта в текущем процессе.
+
+    Args:
+        project: папка проекта Lean (DonchianWithFunding, DonchianStrategy, MyOfflineStrategy)
+        parameters: параметры поверх config.json (как --parameter Lean CLI)
+        data_folder: папка данных Lean
+        quiet: не печатать Debug / Log
+        object_store_root: папка ObjectStore (по умолчанию <проект>/storage, как у Lean CLI)
+    """
+    algorithm_type = load_algorithm(project, class_name)
+    merged = project_parameters(project)
+    merged.update(parameters or {})
+    algorithm = algorithm_type(
+        parameters=host_parameters(merged, data_folder),
+        object_store_root=object_store_root or os.path.join(_project_dir(project), "storage"),
+        quiet=quiet,
+    )
+    return run(algorithm, data_folder)
+
+
+def _run_summary(args):
+    project, parameters, data_folder = args
+    return run_algorithm(project, parameters, data_folder).summary()
+
+
+def run_sweep(project: str, parameters_list: list, data_folder: str = HOST_DATA_DIR,
+              processes: int = 1) -> pd.DataFrame:
+    """
+    Прогоны списка наборов параметров; при processes > 1 — по процессам.
+
+    Returns:
+        pd.DataFrame: summary() прогонов в порядке parameters_list
+    """
+    tasks = [(project, parameters, data_folder) for parameters in parameters_list]
+    if processes <= 1:
+        rows = [_run_summary(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            rows = list(pool.map(_run_summary, tasks))
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Прогон алгоритма Lean локальным движком без контейнера")
+    parser.add_argument("project", help="Папка проекта Lean (например, DonchianWithFunding)")
+    parser.add_argument("--parameter", nargs=2, action="append", default=[], metavar=("NAME", "VALUE"),
+                        help="Параметр алгоритма (как у lean backtest)")
+    parser.add_argument("--data-folder", default=HOST_DATA_DIR, help="Папка данных Lean")
+    parser.add_argument("--class-name", default=None, help="Класс алгоритма, если их несколько")
+    parser.add_argument("--quiet", action="store_true", help="Не печатать Debug / Log алгоритма")
+    args = parser.parse_args(argv)
+
+    result = run_algorithm(args.project, dict(args.parameter), args.data_folder, args.class_name, quiet=args.quiet)
+    print(f"\nПрогон за {result.elapsed:.2f} с, сделок: {len(result.trades)}")
+    for name, value in result.summary().items():
+        print(f"{name:<40}{value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
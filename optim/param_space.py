@@ -38,3 +38,38 @@ def generate_param_space():
                 "soft_exit_r": soft_exit_r,
                 "stop_profile": profile,
             }
+
+
+# Значения по умолчанию — как в DonchianBTCWithFunding.Initialize
+STRATEGY_DEFAULTS = {
+    "dc_entry_len": 20,
+    "dc_exit_len": 10,
+    "atr_period": 14,
+    "atr_stop_negative": 3.0,
+    "atr_stop_neutral": 2.0,
+    "atr_stop_positive": 2.0,
+    "risk_boost_negative": 1.5,
+    "risk_neutral": 1.0,
+    "risk_cut_positive": 0.5,
+    "breakeven_r": 1.0,
+    "breakeven_atr_frac": 0.75,
+    "trail_start_r": 1.8,
+    "soft_exit_r": 3.0,
+    "funding_window": 168,
+}
+
+# ===== ADAPTIVE SEARCH SPACE =====
+# name: (тип, min, max, шаг). Шаг квантует значения, чтобы повторные
+# предложения попадали в кэш прогонов и параметры оставались читаемыми.
+SEARCH_SPACE = {
+    "dc_entry_len":        ("int",   10,  80,  1),
+    "dc_exit_len":         ("int",   5,   40,  1),
+    "atr_period":          ("int",   7,   30,  1),
+    "atr_stop_negative":   ("float", 2.0, 5.0, 0.1),
+    "atr_stop_neutral":    ("float", 1.5, 4.0, 0.1),
+    "atr_stop_positive":   ("float", 1.0, 3.5, 0.1),
+    "risk_boost_negative": ("float", 1.0, 2.0, 0.05),
+    "risk_neutral":        ("float", 0.5, 1.5, 0.05),
+    "risk_cut_positive":   ("float", 0.2, 1.0, 0.05),
+    "funding_window":      ("int",   72,  720, 24),
+}
@@ -0,0 +1,72 @@
+"""
+Пути к результатам прогонов на хосте и внутри контейнера Lean.
+"""
+
+import os
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STRATEGY_DIR = os.path.join(PROJECT_ROOT, "DonchianWithFunding")
+HOST_DATA_DIR = os.path.join(PROJECT_ROOT, "Data")
+
+# Входные данные DonchianWithFunding (см. GetSource в классах данных)
+STRATEGY_DATA_FILES = [
+    os.path.join(HOST_DATA_DIR, "custom", "Binance", "BTCUSDT_Binance_1h.csv"),
+    os.path.join(HOST_DATA_DIR, "custom", "lean_funding_rates", "binance_funding_rate_BTC.csv"),
+]
+
+# Data/ проекта монтируется в контейнер как /Lean/Data
+CONTAINER_DATA_DIR = "/Lean/Data"
+HOST_EXPORTS_DIR = os.path.join(HOST_DATA_DIR, "exports")
+CONTAINER_EXPORTS_DIR = "/Lean/Data/exports"
+
+# Метрики прогона пишутся в SQLite (ResultsStore.FILENAME); run_metrics.csv — старый формат
+RESULTS_FILENAME = "results.db"
+LEGACY_METRICS_FILENAME = "run_metrics.csv"
+RUN_METRICS_FILES = (
+    RESULTS_FILENAME, RESULTS_FILENAME + "-wal", RESULTS_FILENAME + "-shm", LEGACY_METRICS_FILENAME
+)
+
+# Общее хранилище метрик всех прогонов оптимизатора
+RESULTS_DB = os.path.join(HOST_EXPORTS_DIR, RESULTS_FILENAME)
+
+# Папка с результатами отдельных прогонов оптимизатора
+RUNS_SUBDIR = "runs"
+
+# Папка для backtest-результатов Lean (--output) отдельных прогонов
+BACKTESTS_DIR = os.path.join(STRATEGY_DIR, "backtests", "optim")
+
+# Кэш завершенных прогонов (см. run_cache.py)
+RUN_CACHE_DIR = os.path.join(HOST_EXPORTS_DIR, "cache")
+
+# Общий кэш индикаторов (см. indicator_cache.py); Data/ видна в контейнере как /Lean/Data
+INDICATOR_CACHE_DIR = os.path.join(HOST_DATA_DIR, "indicator_cache")
+CONTAINER_INDICATOR_CACHE_DIR = "/Lean/Data/indicator_cache"
+
+# Колонки сделок прогонов для аналитики (см. trade_analytics.py)
+ANALYTICS_DIR = os.path.join(HOST_EXPORTS_DIR, "analytics")
+
+# Результаты walk-forward (см. walk_forward.py)
+WALK_FORWARD_DIR = os.path.join(HOST_EXPORTS_DIR, "walk_forward")
+
+# Бутстрэп сделок прогонов (см. robustness.py)
+ROBUSTNESS_DIR = os.path.join(HOST_EXPORTS_DIR, "robustness")
+
+# Результаты микробенчмарков и базовый запуск (см. bench_suite.py)
+BENCH_DIR = os.path.join(HOST_EXPORTS_DIR, "bench")
+
+
+def run_export_dir(run_id: str) -> str:
+    """Папка экспорта прогона на хосте (<strategy_version_run>.trades.zip, results.db)."""
+    return os.path.join(HOST_EXPORTS_DIR, RUNS_SUBDIR, run_id)
+
+
+def run_container_export_dir(run_id: str) -> str:
+    """Та же папка экспорта, но путь внутри контейнера — передается в export_path."""
+    return "/".join([CONTAINER_EXPORTS_DIR, RUNS_SUBDIR, run_id])
+
+
+def run_output_dir(run_id: str) -> str:
+    """Папка backtest-результатов Lean для прогона."""
+    return os.path.join(BACKTESTS_DIR, run_id)
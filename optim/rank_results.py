@@ -2,15 +2,59 @@
 Фильтрация и ранжирование результатов оптимизации.
 """
 
+import os
+
+import numpy as np
 import pandas as pd
 
+from collect_results import ResultsStore
+from paths import RESULTS_DB
+from successive_halving import FULL_END, FULL_START
+
+# Hard-фильтры
+MIN_TRADES = 80
+MIN_PROFIT_FACTOR = 1.2
+
+# Фильтры робастности (колонки robustness.attach_robustness): применяются,
+# только если колонки есть; прогоны без оценки (NaN) проходят
+MAX_RISK_OF_RUIN = 0.05
+MAX_BOOTSTRAP_DRAWDOWN_P95 = 0.5
+
+# Фильтр просадок по часовой кривой equity (drawdowns.attach_drawdowns):
+# самый долгий эпизод от пика до восстановления (или до конца прогона), дней
+MAX_DRAWDOWN_DAYS = 365
+
+# Период прогона — префикс run_id строки метрик (YYYYMMDD_YYYYMMDD_<версия>).
+# Окна successive halving / Hyperband и walk-forward с полным периодом не сравниваются
+PERIOD_LENGTH = 17
+FULL_PERIOD = f"{FULL_START:%Y%m%d}_{FULL_END:%Y%m%d}"
+
+
+def run_period(run_id: pd.Series) -> np.ndarray:
+    """Период прогона по run_id строки метрик (YYYYMMDD_YYYYMMDD)"""
+    # Усечение до длины периода через dtype — без поэлементных строковых операций
+    return np.asarray(run_id.astype(str), dtype=f"U{PERIOD_LENGTH}")
+
+
+def select_period(df: pd.DataFrame, period: str = FULL_PERIOD) -> pd.DataFrame:
+    """Строки одного периода (period=None — все строки)"""
+    if period is None or df.empty or "run_id" not in df.columns:
+        return df
+    return df[run_period(df["run_id"]) == period]
+
 
-def filter_and_rank(df: pd.DataFrame) -> pd.DataFrame:
+def filter_and_rank(df: pd.DataFrame, sort_by: str = "score") -> pd.DataFrame:
     """
-    Применяет hard-фильтры и использует score из run_metrics.csv для сортировки.
+    Применяет hard-фильтры и использует score из метрик прогона для сортировки.
+    Если присоединены колонки бутстрэпа (mcb_risk_of_ruin, mcb_max_dd_p95),
+    отсекаются прогоны с высоким риском разорения и просадкой 95% путей;
+    если присоединены просадки по кривой equity (dd_longest_days) — прогоны
+    с просадкой дольше MAX_DRAWDOWN_DAYS.
     
     Args:
         df: DataFrame с результатами backtest (должен содержать колонку score)
+        sort_by: Колонка сортировки: score или, например, stability_score
+            (stability.attach_stability)
         
     Returns:
         pd.DataFrame: Отфильтрованный и отсортированный DataFrame с колонкой score
@@ -20,19 +64,69 @@ def filter_and_rank(df: pd.DataFrame) -> pd.DataFrame:
     
     # Проверка наличия колонки score
     if "score" not in df.columns:
-        raise ValueError("DataFrame должен содержать колонку 'score' из run_metrics.csv")
+        raise ValueError("DataFrame должен содержать колонку 'score' из метрик прогона")
     
     # Hard-фильтры
     filtered = df[
-        (df["total_trades"] >= 80) &
-        (df["profit_factor"] >= 1.2) &
+        (df["total_trades"] >= MIN_TRADES) &
+        (df["profit_factor"] >= MIN_PROFIT_FACTOR) &
         (df["avg_R"] > 0)
     ].copy()
     
+    # Фильтры робастности по блочному бутстрэпу
+    if "mcb_risk_of_ruin" in filtered.columns:
+        filtered = filtered[~(filtered["mcb_risk_of_ruin"] > MAX_RISK_OF_RUIN)]
+    if "mcb_max_dd_p95" in filtered.columns:
+        filtered = filtered[~(filtered["mcb_max_dd_p95"] > MAX_BOOTSTRAP_DRAWDOWN_P95)]
+    if "dd_longest_days" in filtered.columns:
+        filtered = filtered[~(filtered["dd_longest_days"] > MAX_DRAWDOWN_DAYS)]
+    
     if filtered.empty:
         return filtered
     
-    # Сортировка по score DESC (score уже вычислен при прогоне стратегии)
-    filtered = filtered.sort_values("score", ascending=False)
+    # Сортировка по score DESC (score уже вычислен при прогоне стратегии).
+    # При равном score порядок задает run_id, а не порядок завершения прогонов
+    if sort_by not in filtered.columns:
+        raise ValueError(f"DataFrame должен содержать колонку '{sort_by}'")
+    sort_cols = [sort_by] + [c for c in ("run_id", "optim_run_id") if c in filtered.columns]
+    filtered = filtered.sort_values(
+        sort_cols,
+        ascending=[False] + [True] * (len(sort_cols) - 1),
+        kind="mergesort"
+    )
     
     return filtered
+
+
+def rank_from_store(path: str = None, limit: int = None, period: str = FULL_PERIOD) -> pd.DataFrame:
+    """
+    То же, что filter_and_rank, но запросом к results.db: фильтры и сортировка
+    выполняются в SQLite по индексу score, без загрузки всех прогонов в память.
+    
+    Args:
+        path: Хранилище метрик (по умолчанию общее RESULTS_DB)
+        limit: Сколько лучших строк вернуть (по умолчанию — все прошедшие фильтры)
+        period: Период прогонов YYYYMMDD_YYYYMMDD (по умолчанию полный; None — все)
+        
+    Returns:
+        pd.DataFrame: Отфильтрованные строки по score DESC, run_id
+    """
+    path = path or RESULTS_DB
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    
+    with ResultsStore(path) as store:
+        if not {"total_trades", "profit_factor", "avg_R"} <= set(store.columns()):
+            return pd.DataFrame()
+        where = "total_trades >= ? AND profit_factor >= ? AND avg_R > 0"
+        args = (MIN_TRADES, MIN_PROFIT_FACTOR)
+        if period is not None:
+            where += f" AND substr(run_id, 1, {PERIOD_LENGTH}) = ?"
+            args += (period,)
+        columns, rows = store.query(
+            where=where,
+            args=args,
+            order_by="score DESC, run_id",
+            limit=limit,
+        )
+    return pd.DataFrame(rows, columns=columns)
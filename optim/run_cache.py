@@ -0,0 +1,176 @@
+"""
+Кэш завершенных прогонов, адресуемый по содержимому.
+
+Ключ прогона = параметры + дайджест кода стратегии (DonchianWithFunding/*.py)
++ дайджест входных данных + режим исполнения. Изменение кода или данных меняет ключ,
+поэтому старые записи просто перестают находиться.
+
+Режим исполнения: lean — отдельный backtest Lean (метрики и сделки — Lean),
+configs — конфигурация пачки одного backtest'а (run_lean_multi, метрики
+VirtualStrategy / PortfolioMetrics). Результаты режимов не подменяют друг друга.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+from paths import (
+    LEGACY_METRICS_FILENAME, RESULTS_FILENAME, RUN_CACHE_DIR, STRATEGY_DATA_FILES, STRATEGY_DIR,
+    run_export_dir
+)
+
+MODE_LEAN = "lean"
+MODE_CONFIGS = "configs"
+
+
+def _file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def files_digest(paths: list) -> str:
+    """
+    Общий дайджест набора файлов (имя + содержимое).
+    Отсутствующий файл тоже учитывается, чтобы его появление инвалидировало кэш.
+    """
+    h = hashlib.sha256()
+    for path in sorted(paths):
+        h.update(os.path.basename(path).encode())
+        if os.path.exists(path):
+            h.update(_file_digest(path).encode())
+        else:
+            h.update(b"<missing>")
+    return h.hexdigest()
+
+
+def strategy_code_digest() -> str:
+    """Дайджест исходников стратегии DonchianWithFunding/*.py."""
+    return files_digest(glob.glob(os.path.join(STRATEGY_DIR, "*.py")))
+
+
+def strategy_data_digest() -> str:
+    """Дайджест входных CSV стратегии."""
+    return files_digest(STRATEGY_DATA_FILES)
+
+
+class RunCache:
+    """
+    Хранилище результатов прогонов: cache/<key>/ с копией файлов экспорта
+    (results.db или run_metrics.csv в старых записях, лог сделок) и meta.json.
+    """
+
+    def __init__(self, cache_dir=None, code_digest=None, data_digest=None):
+        self.cache_dir = cache_dir or RUN_CACHE_DIR
+        self.code_digest = code_digest or strategy_code_digest()
+        self.data_digest = data_digest or strategy_data_digest()
+
+    def key(self, params: dict, mode: str = MODE_LEAN) -> str:
+        """Ключ прогона для текущего кода, данных и режима исполнения."""
+        payload = {"params": params, "code": self.code_digest, "data": self.data_digest}
+        # Ключи режима lean — как до появления режимов, чтобы старые записи находились
+        if mode != MODE_LEAN:
+            payload["mode"] = mode
+        payload = json.dumps(payload, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def has(self, key: str) -> bool:
+        # meta.json пишется последним, поэтому его наличие = запись завершена
+        return os.path.exists(os.path.join(self.entry_dir(key), "meta.json"))
+
+    def entry_mtime(self, key: str) -> int:
+        """
+        Версия записи для производных кэшей (аналитика сделок, робастность): mtime meta.json, нс.
+        Запись заменяется целиком (rename), поэтому meta.json меняется при каждом пересчете.
+        """
+        return os.stat(os.path.join(self.entry_dir(key), "meta.json")).st_mtime_ns
+
+    def store(self, key: str, run_id: str, params: dict, mode: str = MODE_LEAN) -> bool:
+        """
+        Сохраняет результаты завершенного прогона из его папки экспорта.
+        
+        Returns:
+            bool: False если прогон не оставил метрик (не завершился)
+        """
+        source_dir = run_export_dir(run_id)
+        if not any(os.path.exists(os.path.join(source_dir, name))
+                   for name in (RESULTS_FILENAME, LEGACY_METRICS_FILENAME)):
+            return False
+
+        # Пишем во временную папку и переименовываем: прерванная запись не видна как готовая
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{key}-{uuid.uuid4().hex[:8]}")
+        shutil.copytree(source_dir, tmp_dir)
+
+        meta = {
+            "key": key,
+            "run_id": run_id,
+            "params": params,
+            "mode": mode,
+            "code_digest": self.code_digest,
+            "data_digest": self.data_digest,
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=2, sort_keys=True)
+
+        target_dir = self.entry_dir(key)
+        if os.path.exists(target_dir):
+            shutil.rmtree(target_dir)
+        os.rename(tmp_dir, target_dir)
+        return True
+
+    def completed(self) -> list:
+        """
+        Завершенные записи для текущего кода и данных.
+        
+        Returns:
+            list: meta.json записей (key, run_id, params, mode, ...)
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        entries = []
+        for name in sorted(os.listdir(self.cache_dir)):
+            meta_path = os.path.join(self.cache_dir, name, "meta.json")
+            if name.startswith(".tmp-") or not os.path.exists(meta_path):
+                continue
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("code_digest") == self.code_digest and meta.get("data_digest") == self.data_digest:
+                entries.append(meta)
+        return entries
+
+    def prune_stale(self) -> int:
+        """
+        Удаляет записи, посчитанные на другом коде или данных, и брошенные временные папки.
+        
+        Returns:
+            int: Количество удаленных записей
+        """
+        if not os.path.isdir(self.cache_dir):
+            return 0
+
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(path, "meta.json")
+            stale = name.startswith(".tmp-") or not os.path.exists(meta_path)
+            if not stale:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                stale = (
+                    meta.get("code_digest") != self.code_digest or
+                    meta.get("data_digest") != self.data_digest
+                )
+            if stale:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
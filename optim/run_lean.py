@@ -2,33 +2,58 @@
 Запуск Lean CLI backtest с параметрами.
 """
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import os
 import subprocess
 import sys
 
+from paths import RUN_METRICS_FILES, run_container_export_dir, run_export_dir, run_output_dir
 
-def run_lean(run_id: str, params: dict) -> None:
+# Параметры периода общие для всех конфигураций одного запуска в режиме configs
+BATCH_PARAMETERS = ("start_date", "end_date")
+CONFIGS_FILENAME = "configs.json"
+
+
+def run_lean(run_id: str, params: dict, output_dir: str = None, log_path: str = None) -> int:
     """
     Запускает lean backtest с заданными параметрами.
     
     Args:
         run_id: Идентификатор прогона для логирования
         params: Словарь параметров для передачи в lean backtest
+        output_dir: Папка для результатов backtest (--output), None — по умолчанию Lean
+        log_path: Файл для вывода Lean, None — вывод в stdout
+        
+    Returns:
+        int: Код возврата lean (-1 если процесс не удалось запустить)
     """
     print(f"[{run_id}] Запуск backtest с параметрами: {params}")
     
     # Базовая команда
     cmd = ["lean", "backtest", "DonchianWithFunding"]
     
+    if output_dir:
+        cmd.extend(["--output", output_dir])
+    
     # Добавляем параметры в формате --parameter key value
     for key, value in params.items():
         cmd.extend(["--parameter", key, str(value)])
     
+    log_file = None
     try:
+        if log_path:
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            log_file = open(log_path, "w")
+        
         # Запускаем backtest и ждем завершения
         result = subprocess.run(
             cmd,
             check=False,  # Не выбрасываем исключение при ошибке
             capture_output=False,  # Показываем вывод в реальном времени
+            stdout=log_file,
+            stderr=subprocess.STDOUT if log_file else None,
             text=True
         )
         
@@ -36,6 +61,194 @@ def run_lean(run_id: str, params: dict) -> None:
             print(f"[{run_id}] Backtest завершен успешно")
         else:
             print(f"[{run_id}] Backtest завершился с кодом {result.returncode}")
+        return result.returncode
             
     except Exception as e:
         print(f"[{run_id}] Ошибка при запуске backtest: {e}", file=sys.stderr)
+        return -1
+    finally:
+        if log_file:
+            log_file.close()
+
+
+def run_lean_isolated(run_id: str, params: dict, quiet: bool = False, extra_params: dict = None) -> int:
+    """
+    Запускает прогон с отдельными папками экспорта и результатов,
+    чтобы параллельные прогоны не перезаписывали логи сделок и метрики друг друга.
+    
+    Args:
+        run_id: Идентификатор прогона
+        params: Параметры стратегии
+        quiet: Писать вывод Lean в lean.log папки результатов вместо stdout
+        extra_params: Служебные параметры запуска (не входят в params прогона)
+        
+    Returns:
+        int: Код возврата lean
+    """
+    _prepare_export_dir(run_id)
+    
+    output_dir = run_output_dir(run_id)
+    lean_params = dict(params)
+    lean_params.update(extra_params or {})
+    lean_params["export_path"] = run_container_export_dir(run_id)
+    
+    log_path = os.path.join(output_dir, "lean.log") if quiet else None
+    return run_lean(run_id, lean_params, output_dir=output_dir, log_path=log_path)
+
+
+def _prepare_export_dir(run_id: str) -> str:
+    export_dir = run_export_dir(run_id)
+    os.makedirs(export_dir, exist_ok=True)
+    
+    # Перезапуск прогона не должен оставлять старый результат
+    for name in RUN_METRICS_FILES:
+        metrics_path = os.path.join(export_dir, name)
+        if os.path.exists(metrics_path):
+            os.remove(metrics_path)
+    return export_dir
+
+
+def run_lean_multi(runs: list, quiet: bool = False, extra_params: dict = None) -> int:
+    """
+    Запускает несколько прогонов одним backtest'ом (параметр configs стратегии):
+    бары, funding и индикаторы читаются и считаются один раз на все конфигурации.
+    
+    Каждая конфигурация пишет results.db и лог сделок в папку экспорта своего
+    run_id — как отдельный прогон, поэтому кэш и сбор результатов не меняются.
+    
+    Args:
+        runs: Список (run_id, params) с одинаковыми start_date / end_date
+        quiet: Писать вывод Lean в lean.log папки результатов вместо stdout
+        extra_params: Служебные параметры запуска, общие для всех runs
+        
+    Returns:
+        int: Код возврата lean (общий для всех runs)
+    """
+    run_ids = [run_id for run_id, _ in runs]
+    batch_id = "multi-" + hashlib.md5("\n".join(run_ids).encode()).hexdigest()[:10]
+    
+    configs = []
+    for run_id, params in runs:
+        _prepare_export_dir(run_id)
+        configs.append({
+            "params": {key: str(value) for key, value in params.items() if key not in BATCH_PARAMETERS},
+            "export_path": run_container_export_dir(run_id),
+        })
+    batch_dir = run_export_dir(batch_id)
+    os.makedirs(batch_dir, exist_ok=True)
+    with open(os.path.join(batch_dir, CONFIGS_FILENAME), "w") as f:
+        json.dump(configs, f, indent=2)
+    
+    first_params = runs[0][1]
+    lean_params = {key: first_params[key] for key in BATCH_PARAMETERS if key in first_params}
+    lean_params.update(extra_params or {})
+    lean_params["configs"] = "/".join([run_container_export_dir(batch_id), CONFIGS_FILENAME])
+    lean_params["export_path"] = run_container_export_dir(batch_id)
+    
+    output_dir = run_output_dir(batch_id)
+    log_path = os.path.join(output_dir, "lean.log") if quiet else None
+    print(f"[{batch_id}] {len(runs)} конфигураций: {', '.join(run_ids)}")
+    return run_lean(batch_id, lean_params, output_dir=output_dir, log_path=log_path)
+
+
+def multi_config_batches(runs: list, size: int, extra_params: dict = None) -> list:
+    """
+    Делит runs на пачки до size штук для run_lean_multi.
+    
+    В пачку попадают только прогоны с одинаковым периодом и служебными параметрами.
+    
+    Returns:
+        list: списки (run_id, params)
+    """
+    extra_params = extra_params or {}
+    groups = {}
+    for run_id, params in runs:
+        group_key = (
+            tuple(str(params.get(key) or "") for key in BATCH_PARAMETERS),
+            json.dumps(extra_params.get(run_id) or {}, sort_keys=True),
+        )
+        groups.setdefault(group_key, []).append((run_id, params))
+    
+    batches = []
+    for group in groups.values():
+        batches.extend(group[i:i + size] for i in range(0, len(group), size))
+    return batches
+
+
+def run_lean_pool(runs: list, jobs: int = 1, on_complete=None, extra_params: dict = None,
+                  multi_config: int = 0) -> dict:
+    """
+    Запускает прогоны пулом из jobs параллельных backtest'ов.
+    
+    Args:
+        runs: Список кортежей (run_id, params_dict)
+        jobs: Количество одновременно работающих backtest'ов
+        on_complete: Необязательный callback(run_id, params, return_code),
+            вызывается в основном потоке сразу после завершения каждого прогона
+        extra_params: Необязательно run_id -> служебные параметры запуска
+            (например, indicator_cache); в on_complete не передаются
+        multi_config: > 1 — считать до multi_config прогонов одним backtest'ом
+            (run_lean_multi); on_complete вызывается для каждого прогона пачки
+        
+    Returns:
+        dict: run_id -> код возврата lean
+    """
+    if multi_config > 1:
+        return _run_lean_pool_multi(runs, jobs, on_complete, extra_params, multi_config)
+    
+    total = len(runs)
+    return_codes = {}
+    extra_params = extra_params or {}
+    
+    if jobs <= 1:
+        for idx, (run_id, params) in enumerate(runs, start=1):
+            print(f"\nПрогон {idx}/{total}")
+            return_codes[run_id] = run_lean_isolated(run_id, params, extra_params=extra_params.get(run_id))
+            if on_complete:
+                on_complete(run_id, params, return_codes[run_id])
+        return return_codes
+    
+    # lean backtest — внешний процесс, поэтому потоков достаточно
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(run_lean_isolated, run_id, params, True, extra_params.get(run_id)): (run_id, params)
+            for run_id, params in runs
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            run_id, params = futures[future]
+            return_codes[run_id] = future.result()
+            print(f"Завершено {done}/{total}: {run_id}")
+            if on_complete:
+                on_complete(run_id, params, return_codes[run_id])
+    
+    return return_codes
+
+
+def _run_lean_pool_multi(runs: list, jobs: int, on_complete, extra_params: dict, size: int) -> dict:
+    extra_params = extra_params or {}
+    batches = multi_config_batches(runs, size, extra_params)
+    total = len(batches)
+    return_codes = {}
+    
+    def finish(batch, return_code):
+        for run_id, params in batch:
+            return_codes[run_id] = return_code
+            if on_complete:
+                on_complete(run_id, params, return_code)
+    
+    if jobs <= 1:
+        for idx, batch in enumerate(batches, start=1):
+            print(f"\nПачка {idx}/{total}")
+            finish(batch, run_lean_multi(batch, extra_params=extra_params.get(batch[0][0])))
+        return return_codes
+    
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(run_lean_multi, batch, True, extra_params.get(batch[0][0])): batch
+            for batch in batches
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            finish(futures[future], future.result())
+            print(f"Завершено пачек {done}/{total}")
+    
+    return return_codes
@@ -3,49 +3,369 @@
 Главный entrypoint для запуска оптимизатора.
 """
 
+import argparse
+from datetime import datetime
 import sys
 import os
 
 # Добавляем текущую директорию в путь для импортов
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from generate_runs import generate_runs
-from run_lean import run_lean
-from collect_results import load_results
-from rank_results import filter_and_rank
+from generate_runs import generate_runs, make_run_id
+from run_lean import run_lean_pool
+from batch_scoring import SCORING_PROFILES, score_table
+from collect_results import load_results, load_run_results, publish_run
+from drawdowns import attach_drawdowns, load_drawdowns
+from rank_results import FULL_PERIOD, filter_and_rank, rank_from_store, select_period
+from robustness import N_SIMS, attach_robustness, load_robustness
+from stability import K_NEIGHBORS, attach_stability
+from run_cache import MODE_CONFIGS, MODE_LEAN, RunCache
+from tpe_search import TPESampler, run_search
+from successive_halving import fidelity_windows, hyperband, successive_halving, window_params
 import pandas as pd
 
 
-def main():
-    """Главная функция оптимизатора."""
-    print("=" * 80)
-    print("Lean Optimizer Runner")
-    print("=" * 80)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Lean Optimizer Runner")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="Количество одновременно запускаемых backtest'ов (по умолчанию 1)"
+    )
+    parser.add_argument(
+        "--search", choices=["grid", "tpe", "halving", "hyperband"], default="grid",
+        help="grid — полный перебор param_space, tpe — адаптивный поиск по SEARCH_SPACE, "
+             "halving — successive halving сетки по окнам дат, hyperband — Hyperband по SEARCH_SPACE"
+    )
+    parser.add_argument(
+        "--rungs", type=int, default=3,
+        help="halving/hyperband: количество ступеней (окон дат) до полного периода"
+    )
+    parser.add_argument(
+        "--eta", type=int, default=3,
+        help="halving/hyperband: во сколько раз сокращаются кандидаты и растет окно"
+    )
+    parser.add_argument(
+        "--budget", type=int, default=50,
+        help="Бюджет TPE: сколько новых backtest'ов запустить"
+    )
+    parser.add_argument(
+        "--tpe-startup", type=int, default=10,
+        help="Сколько первых конфигураций TPE выбирает случайно"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None,
+        help="Seed TPE для воспроизводимости"
+    )
+    parser.add_argument(
+        "--prescreen", type=int, default=0, metavar="N",
+        help="Сначала оценить сетку быстрым бэктестером и отправить в Lean только N лучших"
+    )
+    parser.add_argument(
+        "--prescreen-processes", type=int, default=1,
+        help="Количество процессов быстрого бэктестера"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Перезапустить все прогоны, игнорируя кэш завершенных"
+    )
+    parser.add_argument(
+        "--prune-cache", action="store_true",
+        help="Удалить из кэша записи, посчитанные на другом коде или данных"
+    )
+    parser.add_argument(
+        "--indicator-cache", action="store_true",
+        help="Считать EMA/ATR/Donchian один раз (indicator_cache.py) и читать их в прогонах из кэша"
+    )
+    parser.add_argument(
+        "--multi-config", type=int, default=0, metavar="N",
+        help="Считать до N конфигураций одним backtest'ом (общие бары и индикаторы, параметр configs)"
+    )
+    parser.add_argument(
+        "--from-store", action="store_true",
+        help="Не запускать прогоны: ранжировать уже накопленные в exports/results.db"
+    )
+    parser.add_argument(
+        "--period", default=FULL_PERIOD,
+        help="С --from-store: период прогонов YYYYMMDD_YYYYMMDD (по умолчанию полный; all — все периоды)"
+    )
+    parser.add_argument(
+        "--robustness", action="store_true",
+        help="Бутстрэп сделок прогонов (robustness.py): колонки mc_*/mcb_* и фильтры по риску разорения"
+    )
+    parser.add_argument(
+        "--robustness-sims", type=int, default=N_SIMS,
+        help="Путей бутстрэпа на прогон и метод"
+    )
+    parser.add_argument(
+        "--drawdowns", action="store_true",
+        help="Просадки по часовым кривым equity (drawdowns.py): колонки dd_* и фильтр длительности"
+    )
+    parser.add_argument(
+        "--scoring-profile", choices=sorted(SCORING_PROFILES), default=None,
+        help="Пересчитать score профилем весов (batch_scoring.py) вместо записанного прогоном"
+    )
+    parser.add_argument(
+        "--stability", action="store_true",
+        help="Ранжировать по stability_score — score окрестности в пространстве параметров (stability.py)"
+    )
+    parser.add_argument(
+        "--stability-neighbors", type=int, default=K_NEIGHBORS,
+        help="Ближайших прогонов в окрестности (stability.py)"
+    )
+    return parser.parse_args(argv)
+
+
+def indicator_cache_params(runs: list) -> dict:
+    """
+    Досчитывает общий кэш индикаторов для runs (по папке на start_date).
+    
+    Returns:
+        dict: run_id -> {"indicator_cache": путь в контейнере}
+    """
+    # Импорт здесь: numpy-расчет индикаторов нужен только в этом режиме
+    from fast_backtest import START_DATE
+    import indicator_cache
+    
+    by_start = {}
+    for run_id, params in runs:
+        start = params.get("start_date") or START_DATE.strftime("%Y-%m-%d")
+        by_start.setdefault(start, []).append((run_id, params))
+    
+    extra = {}
+    for start, start_runs in by_start.items():
+        dc_lengths, atr_periods = indicator_cache.required_lengths([params for _, params in start_runs])
+        path = indicator_cache.ensure(dc_lengths, atr_periods, datetime.strptime(start, "%Y-%m-%d"))
+        for run_id, _ in start_runs:
+            extra[run_id] = {"indicator_cache": indicator_cache.container_path(path)}
+    return extra
+
+
+def execution_mode(multi_config: int) -> str:
+    """Режим исполнения прогонов для ключа кэша: пачки run_lean_multi считаются отдельно от Lean"""
+    return MODE_CONFIGS if multi_config > 1 else MODE_LEAN
+
+
+def run_and_collect(runs: list, cache: RunCache, jobs: int, no_cache: bool = False,
+                    use_indicator_cache: bool = False, multi_config: int = 0) -> pd.DataFrame:
+    """
+    Прогоняет в Lean те runs, которых нет в кэше, и собирает метрики всех runs.
     
+    Args:
+        runs: Список (run_id, params)
+        cache: Кэш завершенных прогонов
+        jobs: Количество параллельных backtest'ов
+        no_cache: Перезапустить прогоны, даже если они есть в кэше
+        use_indicator_cache: Передать прогонам общий кэш индикаторов
+        multi_config: > 1 — считать до multi_config прогонов одним backtest'ом
+        
+    Returns:
+        pd.DataFrame: Метрики в порядке runs (с колонкой optim_run_id)
+    """
+    mode = execution_mode(multi_config)
+    keys = {run_id: cache.key(params, mode) for run_id, params in runs}
+    if no_cache:
+        pending = list(runs)
+    else:
+        pending = [(run_id, params) for run_id, params in runs if not cache.has(keys[run_id])]
+    print(f"Запуск {len(pending)} backtest'ов "
+          f"(из кэша: {len(runs) - len(pending)}, параллельно: {jobs})...")
+    
+    def store_in_cache(run_id, params, return_code):
+        # Сохраняем сразу, чтобы прерванный sweep продолжился с этого места
+        if return_code == 0 and cache.store(keys[run_id], run_id, params, mode):
+            publish_run(cache.entry_dir(keys[run_id]))
+            return
+        print(f"[{run_id}] Результат не сохранен в кэш")
+    
+    extra_params = indicator_cache_params(pending) if use_indicator_cache and pending else None
+    return_codes = run_lean_pool(pending, jobs=jobs, on_complete=store_in_cache, extra_params=extra_params,
+                                 multi_config=multi_config)
+    failed = [run_id for run_id, code in return_codes.items() if code != 0]
+    if failed:
+        print(f"Внимание: {len(failed)} прогонов завершились с ошибкой: {', '.join(sorted(failed))}")
+    
+    run_ids = [run_id for run_id, _ in runs]
+    return load_run_results(run_ids, [cache.entry_dir(keys[run_id]) for run_id in run_ids])
+
+
+def grid_search(args, cache: RunCache) -> pd.DataFrame:
+    """Полный перебор сетки из param_space (с необязательным пред-отбором)."""
     # 1. Генерируем прогоны
     print("\n[1/5] Генерация прогонов...")
     runs = generate_runs()
     total_runs = len(runs)
     print(f"Сгенерировано {total_runs} прогонов")
     
-    # 2. Запускаем backtest для каждого прогона
-    print(f"\n[2/5] Запуск {total_runs} backtest'ов...")
-    for idx, (run_id, params) in enumerate(runs, start=1):
-        print(f"\nПрогон {idx}/{total_runs}")
-        run_lean(run_id, params)
+    if args.prescreen > 0:
+        # Импорт здесь: быстрый бэктестер нужен только в этом режиме
+        from fast_backtest import prescreen
+        runs = prescreen(runs, top=args.prescreen, processes=args.prescreen_processes)
+        total_runs = len(runs)
+        print(f"Пред-отбор быстрым бэктестером: в Lean пойдут {total_runs} прогонов")
     
-    # 3. Загружаем результаты
+    # 2-3. Запускаем backtest'ы и загружаем результаты каждого прогона (из кэша)
+    print("\n[2/5] Запуск backtest'ов...")
+    df = run_and_collect(runs, cache, args.jobs, args.no_cache, args.indicator_cache,
+                         args.multi_config)
     print("\n[3/5] Загрузка результатов...")
-    df = load_results()
-    if df.empty:
-        print("Внимание: CSV файл пуст или не существует")
-        return
+    return df
+
+
+def tpe_search(args, cache: RunCache) -> pd.DataFrame:
+    """Адаптивный поиск: следующие конфигурации выбираются по уже собранным score."""
+    print("\n[1/5] Инициализация TPE по результатам из кэша...")
+    sampler = TPESampler(n_startup=args.tpe_startup, seed=args.seed)
+    
+    # Прогоны текущего кода и данных (в т.ч. из сетки) сразу становятся наблюдениями;
+    # прогоны на коротких окнах (successive halving) несравнимы по score и пропускаются
+    completed = [meta for meta in cache.completed() if "start_date" not in meta["params"]]
+    history = load_run_results(
+        [meta["run_id"] for meta in completed],
+        [cache.entry_dir(meta["key"]) for meta in completed]
+    )
+    if not history.empty:
+        params_by_run = {meta["run_id"]: meta["params"] for meta in completed}
+        for run_id, score in zip(history["optim_run_id"], history["score"]):
+            sampler.observe(params_by_run[run_id], score)
+    print(f"Наблюдений из кэша: {len(sampler.history)}")
+    
+    searched = []
+    
+    def evaluate(batch):
+        runs = [(make_run_id(params), params) for params in batch]
+        searched.extend(runs)
+        df = run_and_collect(runs, cache, args.jobs, args.no_cache, args.indicator_cache,
+                             args.multi_config)
+        scores = dict(zip(df["optim_run_id"], df["score"])) if not df.empty else {}
+        return [scores.get(run_id) for run_id, _ in runs]
+    
+    print(f"\n[2/5] Адаптивный поиск: бюджет {args.budget} backtest'ов...")
+    run_search(sampler, evaluate, budget=args.budget, batch_size=max(1, args.jobs))
     
-    print(f"Загружено {len(df)} записей")
+    print("\n[3/5] Загрузка результатов...")
+    run_ids = [run_id for run_id, _ in searched]
+    mode = execution_mode(args.multi_config)
+    return load_run_results(run_ids, [cache.entry_dir(cache.key(params, mode)) for _, params in searched])
+
+
+def windowed_evaluator(args, cache: RunCache):
+    """
+    Callback для successive halving: прогоняет конфигурации на окне дат
+    и возвращает результаты с optim_run_id исходных конфигураций.
+    """
+    def evaluate(configs, window):
+        runs = []
+        base_ids = {}
+        for run_id, params in configs:
+            params_w = window_params(params, window)
+            window_run_id = make_run_id(params_w)
+            base_ids[window_run_id] = run_id
+            runs.append((window_run_id, params_w))
+        
+        df = run_and_collect(runs, cache, args.jobs, args.no_cache, args.indicator_cache,
+                             args.multi_config)
+        if not df.empty:
+            df["optim_run_id"] = df["optim_run_id"].map(base_ids)
+        return df
+    
+    return evaluate
+
+
+def halving_search(args, cache: RunCache) -> pd.DataFrame:
+    """Successive halving сетки param_space: короткие окна -> полный период."""
+    print("\n[1/5] Генерация прогонов...")
+    runs = generate_runs()
+    windows = fidelity_windows(args.rungs, args.eta)
+    print(f"Сгенерировано {len(runs)} прогонов, ступеней: {len(windows)}")
+    
+    print("\n[2/5] Successive halving...")
+    df = successive_halving(runs, windowed_evaluator(args, cache), windows, args.eta)
+    print("\n[3/5] Загрузка результатов...")
+    return df
+
+
+def hyperband_search(args, cache: RunCache) -> pd.DataFrame:
+    """Hyperband по SEARCH_SPACE со случайными кандидатами."""
+    print("\n[1/5] Подготовка Hyperband...")
+    sampler = TPESampler(seed=args.seed)
+    windows = fidelity_windows(args.rungs, args.eta)
+    
+    def sample_configs(n):
+        configs = [sampler.random_params() for _ in range(n)]
+        return [(make_run_id(params), params) for params in configs]
     
-    # 4. Фильтруем и ранжируем
-    print("\n[4/5] Фильтрация и ранжирование...")
-    ranked = filter_and_rank(df)
+    print("\n[2/5] Hyperband...")
+    df = hyperband(sample_configs, windowed_evaluator(args, cache), windows, args.eta)
+    print("\n[3/5] Загрузка результатов...")
+    return df
+
+
+def main(argv=None):
+    """Главная функция оптимизатора."""
+    args = parse_args(argv)
+    
+    print("=" * 80)
+    print("Lean Optimizer Runner")
+    print("=" * 80)
+    
+    cache = RunCache()
+    if args.prune_cache:
+        print(f"Удалено устаревших записей кэша: {cache.prune_stale()}")
+    
+    if args.from_store:
+        df = pd.DataFrame()
+    elif args.search == "tpe":
+        df = tpe_search(args, cache)
+    elif args.search == "halving":
+        df = halving_search(args, cache)
+    elif args.search == "hyperband":
+        df = hyperband_search(args, cache)
+    else:
+        df = grid_search(args, cache)
+    
+    sort_by = "stability_score" if args.stability else "score"
+    if args.from_store:
+        # 4. Фильтры и сортировка — запросом к хранилищу
+        print("\n[4/5] Фильтрация и ранжирование (results.db)...")
+        period = None if args.period == "all" else args.period
+        if args.stability or args.scoring_profile:
+            # score пересчитывается и окрестность считается по всем прогонам,
+            # а не только прошедшим фильтры
+            ranked = select_period(load_results(), period)
+            if args.scoring_profile and not ranked.empty:
+                ranked["score"] = score_table(ranked, args.scoring_profile)
+            if args.stability:
+                ranked = attach_stability(ranked, args.stability_neighbors)
+        else:
+            ranked = rank_from_store(period=period)
+        if args.robustness and not ranked.empty:
+            robustness = load_robustness(cache, processes=args.jobs, sims=args.robustness_sims)
+            ranked = attach_robustness(ranked, robustness)
+        if args.drawdowns and not ranked.empty:
+            ranked = attach_drawdowns(ranked, load_drawdowns(cache)[0])
+        if (args.stability or args.robustness or args.drawdowns or args.scoring_profile) and not ranked.empty:
+            ranked = filter_and_rank(ranked, sort_by=sort_by)
+    elif df.empty:
+        print("Внимание: метрик прогонов нет")
+        return
+    else:
+        print(f"Загружено {len(df)} записей")
+        
+        if args.robustness:
+            print("Бутстрэп сделок прогонов...")
+            robustness = load_robustness(cache, processes=args.jobs, sims=args.robustness_sims)
+            df = attach_robustness(df, robustness)
+        if args.drawdowns:
+            print("Просадки по кривым equity...")
+            df = attach_drawdowns(df, load_drawdowns(cache)[0])
+        if args.scoring_profile:
+            df["score"] = score_table(df, args.scoring_profile)
+        if args.stability:
+            df = attach_stability(df, args.stability_neighbors)
+        
+        # 4. Фильтруем и ранжируем
+        print("\n[4/5] Фильтрация и ранжирование...")
+        ranked = filter_and_rank(df, sort_by=sort_by)
     
     if ranked.empty:
         print("Внимание: после фильтрации не осталось результатов")
@@ -62,13 +382,24 @@ def main():
     # Выбираем ключевые колонки для вывода
     display_cols = [
         "score",
+        "stability_score",
+        "nbr_count",
+        "nbr_min",
         "calmar",
         "expectancy",
         "avg_R",
         "median_R",
         "profit_factor",
         "max_drawdown_pct",
+        "mcb_max_dd_p95",
+        "mcb_risk_of_ruin",
+        "mcb_cagr_p05",
+        "dd_longest_days",
+        "dd_ulcer_index",
         "total_trades",
+        "dc_entry_len",
+        "dc_exit_len",
+        "atr_period",
         "atr_stop_neutral",
         "trail_start_r",
         "breakeven_r"
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Устойчивость score по окрестности в пространстве параметров.
+
+filter_and_rank сортирует по score одной точки сетки, и одиночный удачный
+выброс среди плохих соседей попадает в топ. Здесь параметры каждого прогона
+нормируются в [0, 1], и окрестность прогона — K_NEIGHBORS ближайших (по
+евклидову расстоянию) прогонов того же периода. Ближайшие соседи, а не ячейки
+сетки: у случайных точек TPE / successive halving / Hyperband и у профилей
+стопов сетки, где несколько параметров меняются вместе, соседей по одной оси
+нет, а ближайшие есть всегда. По score окрестности (сам прогон и соседи):
+
+- nbr_count — число соседей (меньше K_NEIGHBORS, только если прогонов периода мало);
+- nbr_mean, nbr_min, nbr_std — среднее, минимум и разброс score окрестности;
+- stability_score — nbr_mean - DISPERSION_PENALTY * nbr_std, стянутое к
+  медиане score периода с весом PRIOR_WEIGHT.
+
+Соседи ищутся приближенно (nearest_neighbors): кандидаты — точки общих
+листьев нескольких KD-деревьев по случайно повернутым осям и соседи соседей,
+без попарного сравнения O(N²).
+
+Параметры — колонки строки метрик (параметры запуска из GetParameter);
+отсутствующие значения — значения по умолчанию стратегии (STRATEGY_DEFAULTS).
+Диапазон нормировки — SEARCH_SPACE, для остальных параметров — наблюдаемый.
+Период прогона — префикс run_id (rank_results.run_period): окна successive
+halving и walk-forward сравниваются только между собой.
+
+Примеры:
+    python stability.py --top 30
+    python stability.py --neighbors 12 --csv stability.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from collect_results import load_results
+from param_space import SEARCH_SPACE, STRATEGY_DEFAULTS
+from rank_results import run_period
+
+# Соседей в окрестности прогона
+K_NEIGHBORS = 8
+
+# Деревьев поиска соседей и точек в листе (nearest_neighbors)
+N_TREES = 8
+LEAF_SIZE = 32
+
+# Раундов уточнения соседей через соседей соседей
+REFINE_ROUNDS = 2
+
+# Строк за один проход при подсчете расстояний
+CHUNK_ROWS = 4096
+
+# Штраф за разброс score в окрестности
+DISPERSION_PENALTY = 0.5
+
+# Вес медианы периода (в «прогонах»), к которой стягивается оценка окрестности
+PRIOR_WEIGHT = 2.0
+
+STABILITY_COLUMNS = ["nbr_count", "nbr_mean", "nbr_min", "nbr_std", "stability_score"]
+
+
+# ===== PARAMETERS =====
+
+def normalized_params(df: pd.DataFrame) -> np.ndarray:
+    """
+    Параметры стратегии из колонок строки метрик в [0, 1] по диапазону
+    SEARCH_SPACE (иначе наблюдаемому). Пропуски — значения по умолчанию
+    стратегии; параметры с одним значением отбрасываются — они не различают прогоны.
+    """
+    columns = []
+    for name in sorted(STRATEGY_DEFAULTS):
+        if name not in df.columns:
+            continue
+        values = pd.to_numeric(df[name], errors="coerce").fillna(STRATEGY_DEFAULTS[name]).to_numpy(dtype=float)
+        if name in SEARCH_SPACE:
+            _, low, high, _ = SEARCH_SPACE[name]
+        else:
+            low, high = values.min(), values.max()
+        if high <= low or values.min() == values.max():
+            continue
+        columns.append((values - low) / (high - low))
+    if not columns:
+        return np.zeros((len(df), 0))
+    return np.column_stack(columns)
+
+
+def _period(run_id: pd.Series) -> np.ndarray:
+    # Прогоны разных периодов несравнимы по score
+    return pd.factorize(run_period(run_id))[0]
+
+
+# ===== NEIGHBORS =====
+
+def _kd_leaves(points: np.ndarray, leaf_size: int) -> np.ndarray:
+    """
+    Листья KD-дерева: на каждом уровне все отрезки делятся пополам по медиане
+    очередной оси (по кругу), пока в них больше leaf_size точек.
+
+    Returns:
+        np.ndarray: (листья, наибольший лист) номера точек листа; -1 — лист короче
+    """
+    n, dim = points.shape
+    order = np.arange(n)
+    bounds = np.array([0, n])
+    depth = 0
+    while (np.diff(bounds) > leaf_size).any():
+        sizes = np.diff(bounds)
+        # Одна сортировка по ключу (отрезок, значение оси) упорядочивает все отрезки уровня сразу
+        values = points[order, depth % dim]
+        values = values - values.min()
+        segment = np.repeat(np.arange(len(sizes)), sizes)
+        order = order[np.argsort(segment * (values.max() + 1.0) + values)]
+        bounds = np.sort(np.concatenate([bounds, bounds[:-1] + sizes // 2]))
+        depth += 1
+    sizes = np.diff(bounds)
+    slots = np.arange(sizes.max())
+    return np.where(slots < sizes[:, None], order[np.minimum(bounds[:-1, None] + slots, n - 1)], -1)
+
+
+def _leaf_distances(points: np.ndarray, leaves: np.ndarray) -> tuple:
+    """
+    Кандидаты точек из листа: остальные точки того же листа и квадраты расстояний до них.
+
+    Returns:
+        tuple: ((n, ширина листа) номера, (n, ширина листа) расстояния; inf — не кандидат)
+    """
+    block = points[np.maximum(leaves, 0)]
+    norms = (block ** 2).sum(axis=2)
+    # |p - q|² = |p|² + |q|² - 2 p·q — матричное умножение по листам вместо (n, ширина, d) разностей
+    dist = np.maximum(norms[:, :, None] + norms[:, None, :] - 2.0 * (block @ block.transpose(0, 2, 1)), 0.0)
+    width = leaves.shape[1]
+    dist[np.broadcast_to(leaves[:, None, :] < 0, dist.shape)] = np.inf
+    dist[:, np.arange(width), np.arange(width)] = np.inf
+
+    filled = leaves.ravel() >= 0
+    owners = leaves.ravel()[filled]
+    candidates = np.empty((len(points), width), dtype=np.int64)
+    distances = np.empty((len(points), width))
+    candidates[owners] = np.broadcast_to(leaves[:, None, :], dist.shape).reshape(-1, width)[filled]
+    distances[owners] = dist.reshape(-1, width)[filled]
+    return candidates, distances
+
+
+def _distances(points: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """Квадраты расстояний от точек до их кандидатов; до -1 и до самой точки — inf"""
+    n = len(points)
+    dist = np.empty(candidates.shape)
+    for lo in range(0, n, CHUNK_ROWS):
+        diff = points[np.maximum(candidates[lo:lo + CHUNK_ROWS], 0)] - points[lo:lo + CHUNK_ROWS, None, :]
+        dist[lo:lo + CHUNK_ROWS] = np.einsum("ijk,ijk->ij", diff, diff)
+    dist[(candidates < 0) | (candidates == np.arange(n)[:, None])] = np.inf
+    return dist
+
+
+def _merge(best: np.ndarray, best_dist: np.ndarray, candidates: np.ndarray, dist: np.ndarray, k: int) -> tuple:
+    """k ближайших из найденных и новых кандидатов; повторы отбрасываются"""
+    index = np.hstack([best, candidates])
+    dist = np.hstack([best_dist, dist])
+    by_index = np.argsort(index, axis=1, kind="stable")
+    index = np.take_along_axis(index, by_index, axis=1)
+    dist = np.take_along_axis(dist, by_index, axis=1)
+    # Один сосед из нескольких деревьев — учитывается один раз
+    dist[:, 1:][index[:, 1:] == index[:, :-1]] = np.inf
+    nearest = np.argsort(dist, axis=1, kind="stable")[:, :k]
+    best_dist = np.take_along_axis(dist, nearest, axis=1)
+    best = np.where(np.isfinite(best_dist), np.take_along_axis(index, nearest, axis=1), -1)
+    return best, best_dist
+
+
+def nearest_neighbors(points: np.ndarray, k: int = K_NEIGHBORS, n_trees: int = N_TREES,
+                      leaf_size: int = LEAF_SIZE, refine_rounds: int = REFINE_ROUNDS,
+                      seed: int = 0) -> np.ndarray:
+    """
+    Приближенные k ближайших соседей каждой точки (евклидово расстояние, без самой точки).
+
+    Кандидаты — точки того же листа в n_trees KD-деревьях по случайно
+    повернутым осям; затем refine_rounds раз к кандидатам добавляются соседи
+    соседей. Точный поиск в 10+ измерениях почти не отсекает точки и на сотнях
+    тысяч прогонов сводится к O(N²); здесь — O(N log N), а для окрестности
+    score достаточно почти ближайших.
+
+    Returns:
+        np.ndarray: (n, k) номера соседей по возрастанию расстояния; -1, если точек меньше k + 1
+    """
+    n, dim = points.shape
+    best = np.full((n, k), -1, dtype=np.int64)
+    best_dist = np.full((n, k), np.inf)
+    if n < 2 or k < 1:
+        return best
+    if not dim:
+        # Все точки совпадают — соседи любые
+        points = np.zeros((n, 1))
+        dim = 1
+    rng = np.random.default_rng(seed)
+    for _ in range(n_trees):
+        rotated = points @ np.linalg.qr(rng.standard_normal((dim, dim)))[0]
+        candidates, dist = _leaf_distances(rotated, _kd_leaves(rotated, leaf_size))
+        best, best_dist = _merge(best, best_dist, candidates, dist, k)
+    for _ in range(refine_rounds):
+        # Соседи соседей — близкие точки, которые деревья развели по разным листам
+        hops = np.where(best[:, :, None] >= 0, best[np.maximum(best, 0)], -1).reshape(n, -1)
+        best, best_dist = _merge(best, best_dist, hops, _distances(points, hops), k)
+    return best
+
+
+def neighborhood_stats(scores: np.ndarray, neighbors: np.ndarray, groups: np.ndarray = None,
+                       dispersion_penalty: float = DISPERSION_PENALTY,
+                       prior_weight: float = PRIOR_WEIGHT) -> dict:
+    """
+    Статистики score окрестности (сам прогон и его соседи) и stability_score.
+
+    Args:
+        neighbors: (n, k) номера соседей, -1 — нет соседа (см. nearest_neighbors)
+
+    Returns:
+        dict: колонка STABILITY_COLUMNS -> np.ndarray
+    """
+    n = len(scores)
+    groups = np.zeros(n, dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+    members = np.column_stack([np.arange(n), neighbors])
+    valid = members >= 0
+    values = np.where(valid, scores[np.where(valid, members, 0)], np.nan)
+
+    size = valid.sum(axis=1)
+    mean = np.nanmean(values, axis=1)
+    std = np.nanstd(values, axis=1)
+    prior = pd.Series(scores).groupby(groups).transform("median").to_numpy()
+    adjusted = mean - dispersion_penalty * std
+    stability = (size * adjusted + prior_weight * prior) / (size + prior_weight)
+    return {"nbr_count": size - 1, "nbr_mean": mean, "nbr_min": np.nanmin(values, axis=1),
+            "nbr_std": std, "stability_score": stability}
+
+
+def attach_stability(df: pd.DataFrame, k: int = K_NEIGHBORS) -> pd.DataFrame:
+    """
+    Колонки устойчивости к таблице метрик (параметры — ее же колонки).
+    Окрестность считается по всем строкам df, до hard-фильтров; строки без score получают NaN.
+    """
+    df = df.drop(columns=[c for c in STABILITY_COLUMNS if c in df.columns])
+    result = {c: np.full(len(df), np.nan) for c in STABILITY_COLUMNS}
+    valid = df["score"].notna().to_numpy() if "score" in df.columns else np.zeros(len(df), dtype=bool)
+    if valid.any():
+        rows = df[valid]
+        groups = _period(rows["run_id"])
+        scores = rows["score"].to_numpy(dtype=float)
+        points = normalized_params(rows)
+        neighbors = np.full((len(rows), k), -1, dtype=np.int64)
+        # Соседи — только среди прогонов того же периода
+        for group in np.unique(groups):
+            members = np.flatnonzero(groups == group)
+            found = nearest_neighbors(points[members], k)
+            neighbors[members] = np.where(found >= 0, members[np.maximum(found, 0)], -1)
+        for name, values in neighborhood_stats(scores, neighbors, groups).items():
+            result[name][valid] = values
+    return df.assign(**result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Устойчивость score по окрестности параметров")
+    parser.add_argument("--neighbors", type=int, default=K_NEIGHBORS, help="Соседей в окрестности прогона")
+    parser.add_argument("--top", type=int, default=30, help="Сколько прогонов вывести")
+    parser.add_argument("--csv", default=None, help="Сохранить таблицу в CSV")
+    args = parser.parse_args(argv)
+
+    df = load_results()
+    if df.empty:
+        print("Нет результатов в exports/results.db")
+        return 1
+
+    started = time.perf_counter()
+    df = attach_stability(df, args.neighbors)
+    print(f"Прогонов: {len(df)}, окрестности за {time.perf_counter() - started:.2f} с")
+
+    df = df.sort_values(["stability_score", "run_id"], ascending=[False, True], kind="mergesort")
+    columns = ["run_id", "score"] + STABILITY_COLUMNS
+    pd.set_option("display.width", None)
+    print(df[columns].head(args.top).to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    if args.csv:
+        df.to_csv(args.csv, index=False)
+        print(f"\nСохранено в {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
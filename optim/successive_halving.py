@@ -0,0 +1,132 @@
+"""
+Multi-fidelity отбор: successive halving и Hyperband по окнам дат.
+
+Fidelity — длина периода бэктеста. Все кандидаты сначала считаются на коротком
+окне (последние дни полного периода), лучшая доля 1/eta по score переходит
+на окно в eta раз длиннее, и так до полного периода.
+"""
+
+from datetime import datetime, timedelta
+import math
+
+import pandas as pd
+
+FULL_START = datetime(2024, 1, 1)
+FULL_END = datetime(2026, 1, 1)
+
+# Короткие окна часто не набирают 30 сделок и получают score = -999,
+# поэтому при равном score дальше проходят конфигурации с лучшим cagr
+TIE_BREAK_METRIC = "cagr"
+
+
+def fidelity_windows(n_rungs: int, eta: int = 3, start=FULL_START, end=FULL_END) -> list:
+    """
+    Окна дат для ступеней, от короткого к полному.
+
+    Окно ступени r имеет длину full / eta^(n_rungs - 1 - r) и заканчивается в end:
+    на коротких окнах используется самая свежая история.
+
+    Returns:
+        list: [(start_date, end_date), ...] — последнее окно равно полному периоду
+    """
+    total_days = (end - start).days
+    windows = []
+    for rung in range(n_rungs):
+        days = max(1, int(round(total_days / eta ** (n_rungs - 1 - rung))))
+        windows.append((max(start, end - timedelta(days=days)), end))
+    return windows
+
+
+def window_params(params: dict, window) -> dict:
+    """
+    Параметры прогона на окне (start_date / end_date читает стратегия).
+    Для полного периода даты не добавляются — прогон совпадает с обычным и берется из кэша.
+    """
+    start, end = window
+    result = dict(params)
+    if (start, end) == (FULL_START, FULL_END):
+        return result
+    result["start_date"] = start.strftime("%Y-%m-%d")
+    result["end_date"] = end.strftime("%Y-%m-%d")
+    return result
+
+
+def rank_rung(configs: list, df: pd.DataFrame) -> list:
+    """
+    Сортирует конфигурации ступени по score (при равенстве — по cagr, затем по run_id).
+
+    Args:
+        configs: [(run_id, params)] ступени
+        df: результаты в порядке configs с колонками optim_run_id и score
+
+    Returns:
+        list: configs от лучшей к худшей; без результата — в конце
+    """
+    metrics = {}
+    if not df.empty:
+        tie = df[TIE_BREAK_METRIC] if TIE_BREAK_METRIC in df.columns else pd.Series(0.0, index=df.index)
+        for run_id, score, tie_value in zip(df["optim_run_id"], df["score"], tie):
+            metrics[run_id] = (float(score), float(tie_value))
+
+    missing = (-math.inf, -math.inf)
+    return sorted(
+        configs,
+        key=lambda item: tuple(-v for v in metrics.get(item[0], missing)) + (item[0],)
+    )
+
+
+def successive_halving(configs: list, evaluate, windows: list, eta: int = 3) -> pd.DataFrame:
+    """
+    Successive halving по ступеням windows.
+
+    Args:
+        configs: [(run_id, params)] — кандидаты без дат
+        evaluate: callback(configs, window) -> DataFrame результатов (optim_run_id = run_id из configs)
+        windows: окна ступеней от короткого к полному (см. fidelity_windows)
+        eta: во сколько раз сокращается число кандидатов на каждой ступени
+
+    Returns:
+        pd.DataFrame: результаты последней ступени (полный период)
+    """
+    survivors = list(configs)
+    df = pd.DataFrame()
+    for rung, window in enumerate(windows):
+        print(f"\nСтупень {rung + 1}/{len(windows)}: {len(survivors)} конфигураций, "
+              f"окно {window[0]:%Y-%m-%d} — {window[1]:%Y-%m-%d}")
+        df = evaluate(survivors, window)
+
+        if rung == len(windows) - 1:
+            break
+        keep = max(1, int(math.ceil(len(survivors) / eta)))
+        survivors = rank_rung(survivors, df)[:keep]
+
+    return df
+
+
+def hyperband(sample_configs, evaluate, windows: list, eta: int = 3) -> pd.DataFrame:
+    """
+    Hyperband: несколько запусков successive halving с разным стартовым окном.
+
+    Агрессивные скобки начинают много кандидатов на коротком окне, осторожные —
+    меньше кандидатов на длинном; так отбор не зависит только от самого короткого окна.
+
+    Args:
+        sample_configs: callback(n) -> [(run_id, params)] новых случайных кандидатов
+        evaluate: callback(configs, window) -> DataFrame результатов
+        windows: окна ступеней от короткого к полному
+        eta: коэффициент сокращения
+
+    Returns:
+        pd.DataFrame: результаты всех скобок на полном периоде
+    """
+    s_max = len(windows) - 1
+    frames = []
+    for s in range(s_max, -1, -1):
+        n = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        print(f"\n=== Hyperband: скобка s={s}, {n} кандидатов ===")
+        frames.append(successive_halving(sample_configs(n), evaluate, windows[s_max - s:], eta))
+
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True, sort=False)
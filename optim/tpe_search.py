@@ -0,0 +1,197 @@
+"""
+Адаптивный поиск параметров в стиле TPE (Tree-structured Parzen Estimator).
+
+Вместо полного перебора сетки следующий набор параметров выбирается по уже
+собранным score: наблюдения делятся на «хорошие» (верхняя доля gamma) и
+«остальные», по каждой группе строится оценка плотности Парзена, и из кандидатов,
+сэмплированных из плотности хороших, берется максимизирующий l(x) / g(x).
+"""
+
+import math
+
+import numpy as np
+
+from param_space import SEARCH_SPACE, STRATEGY_DEFAULTS
+
+_erf = np.vectorize(math.erf)
+
+# score стратегии при жестких отсечках — провалившиеся прогоны считаем так же
+WORST_SCORE = -999.0
+
+
+def _norm_cdf(x):
+    return 0.5 * (1.0 + _erf(x / math.sqrt(2.0)))
+
+
+class ParzenEstimator:
+    """Смесь усеченных на [0, 1] нормальных распределений + равномерный prior."""
+
+    def __init__(self, points):
+        points = np.asarray(points, dtype=float)
+        n = len(points)
+        # prior в центре с широким sigma, чтобы не терять неисследованные области
+        self.mus = np.append(points, 0.5)
+        bandwidth = 1.06 * (np.std(points) if n > 1 else 0.5) * max(n, 1) ** (-0.2)
+        sigma = np.clip(bandwidth, 1.0 / min(100, n + 1), 1.0)
+        self.sigmas = np.append(np.full(n, sigma), 1.0)
+        self.weights = np.full(n + 1, 1.0 / (n + 1))
+        self.norm = (
+            _norm_cdf((1.0 - self.mus) / self.sigmas) - _norm_cdf((0.0 - self.mus) / self.sigmas)
+        )
+
+    def sample(self, rng, size):
+        component = rng.choice(len(self.mus), size=size, p=self.weights)
+        x = rng.normal(self.mus[component], self.sigmas[component])
+        # Усечение: пересэмплируем вылетевшие за [0, 1]
+        for _ in range(10):
+            out = (x < 0.0) | (x > 1.0)
+            if not out.any():
+                break
+            x[out] = rng.normal(self.mus[component[out]], self.sigmas[component[out]])
+        return np.clip(x, 0.0, 1.0)
+
+    def log_pdf(self, x):
+        x = np.asarray(x, dtype=float)[:, None]
+        z = (x - self.mus) / self.sigmas
+        pdf = np.exp(-0.5 * z ** 2) / (self.sigmas * math.sqrt(2 * math.pi) * self.norm)
+        return np.log(np.maximum((pdf * self.weights).sum(axis=1), 1e-300))
+
+
+class TPESampler:
+    """
+    Предлагает наборы параметров по истории (params, score).
+
+    Args:
+        space: пространство поиска {name: (тип, min, max, шаг)}
+        fixed_params: параметры, которые не ищутся (передаются в каждый прогон как есть)
+        n_startup: сколько первых предложений делать случайно
+        gamma: доля лучших наблюдений, по которым строится l(x)
+        n_candidates: сколько кандидатов сэмплировать из l(x) на одно предложение
+        seed: seed генератора для воспроизводимости
+    """
+
+    def __init__(self, space=None, fixed_params=None, n_startup=10, gamma=0.25,
+                 n_candidates=24, seed=None):
+        self.space = space or SEARCH_SPACE
+        self.names = list(self.space)
+        self.fixed_params = dict(fixed_params or {})
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+        self.rng = np.random.default_rng(seed)
+        self.history = []
+
+    # ===== ENCODING =====
+
+    def _encode(self, params):
+        x = []
+        for name in self.names:
+            _, lo, hi, _ = self.space[name]
+            value = float(params.get(name, STRATEGY_DEFAULTS.get(name, lo)))
+            x.append(min(1.0, max(0.0, (value - lo) / (hi - lo))))
+        return np.array(x)
+
+    def _decode(self, x):
+        params = dict(self.fixed_params)
+        for name, u in zip(self.names, x):
+            kind, lo, hi, step = self.space[name]
+            value = lo + round(u * (hi - lo) / step) * step
+            value = min(hi, max(lo, value))
+            params[name] = int(round(value)) if kind == "int" else round(value, 6)
+        return params
+
+    def _key(self, params):
+        return tuple(params.get(name) for name in self.names)
+
+    # ===== HISTORY =====
+
+    def observe(self, params: dict, score) -> None:
+        """Добавляет результат прогона; None/NaN score считается худшим."""
+        if score is None or (isinstance(score, float) and math.isnan(score)):
+            score = WORST_SCORE
+        self.history.append((dict(params), float(score)))
+
+    def best(self):
+        """Лучший (params, score) из истории или None."""
+        if not self.history:
+            return None
+        return max(self.history, key=lambda item: item[1])
+
+    # ===== SUGGEST =====
+
+    def suggest(self, n: int = 1) -> list:
+        """
+        Предлагает n новых наборов параметров.
+
+        Для пачки используется «constant liar»: уже выбранные в пачке точки временно
+        считаются худшими, чтобы следующие предложения уходили от них.
+        """
+        seen = {self._key(params) for params, _ in self.history}
+        liars = []
+        batch = []
+
+        for _ in range(n):
+            params = self._suggest_one(liars, seen)
+            seen.add(self._key(params))
+            liars.append((params, WORST_SCORE))
+            batch.append(params)
+        return batch
+
+    def random_params(self):
+        """Случайный набор параметров из пространства поиска."""
+        return self._decode(self.rng.uniform(0.0, 1.0, size=len(self.names)))
+
+    def _suggest_one(self, liars, seen):
+        history = self.history + liars
+        if len(self.history) < self.n_startup:
+            candidates = [self.random_params() for _ in range(self.n_candidates)]
+            for params in candidates:
+                if self._key(params) not in seen:
+                    return params
+            return candidates[0]
+
+        # Стабильная сортировка по score: при равенстве раньше — старшие наблюдения
+        ordered = sorted(history, key=lambda item: -item[1])
+        n_good = max(1, int(math.ceil(self.gamma * len(ordered))))
+        good = np.array([self._encode(p) for p, _ in ordered[:n_good]])
+        bad = np.array([self._encode(p) for p, _ in ordered[n_good:]])
+
+        samples = np.empty((self.n_candidates, len(self.names)))
+        score = np.zeros(self.n_candidates)
+        for d in range(len(self.names)):
+            l_est = ParzenEstimator(good[:, d])
+            g_est = ParzenEstimator(bad[:, d] if len(bad) else [])
+            samples[:, d] = l_est.sample(self.rng, self.n_candidates)
+            score += l_est.log_pdf(samples[:, d]) - g_est.log_pdf(samples[:, d])
+
+        for idx in np.argsort(-score, kind="mergesort"):
+            params = self._decode(samples[idx])
+            if self._key(params) not in seen:
+                return params
+        return self.random_params()
+
+
+def run_search(sampler: TPESampler, evaluate, budget: int, batch_size: int = 1) -> list:
+    """
+    Цикл адаптивного поиска: предложить пачку -> прогнать -> учесть score.
+
+    Args:
+        sampler: TPESampler (может быть заранее наполнен observe())
+        evaluate: callback(list[params]) -> list[score] в том же порядке
+        budget: сколько новых backtest'ов можно запустить
+        batch_size: размер пачки (обычно = количеству параллельных воркеров)
+
+    Returns:
+        list: история (params, score) только новых прогонов
+    """
+    done = []
+    while len(done) < budget:
+        batch = sampler.suggest(min(batch_size, budget - len(done)))
+        scores = evaluate(batch)
+        for params, score in zip(batch, scores):
+            sampler.observe(params, score)
+            done.append((params, score))
+
+        best = sampler.best()
+        print(f"TPE: {len(done)}/{budget} backtest'ов, лучший score: {best[1]:.3f}")
+    return done
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Аналитика сделок по всем прогонам оптимизатора.
+
+Сделки всех завершенных прогонов кэша (RunCache.completed) собираются в одну
+колоночную таблицу: признаки входа (_calculate_entry_features), признаки выхода
+(TradeContext.close) и параметры прогона. По таблице считаются векторные
+group-by: число сделок, mean/median R, win rate, profit factor, среднее
+время удержания — по любым признакам и параметрам.
+
+Каждый прогон один раз приводится к колонкам и сохраняется в
+exports/analytics/<key>.npz; при следующем запуске читаются только новые
+или пересчитанные прогоны, остальные берутся из этих файлов.
+
+Примеры:
+    python trade_analytics.py --by session --by volatility_regime
+    python trade_analytics.py --by dc_entry_len --by bucket --min-trades 200
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from collect_results import read_run_trades
+from paths import ANALYTICS_DIR
+from run_cache import RunCache
+
+# Признаки с небольшим числом значений — в таблице это category
+CATEGORICAL = (
+    "session", "bucket", "volatility_regime", "holding_bucket", "exit_reason",
+    "strategy_version_run", "optim_run_id",
+)
+
+# Параметры прогона добавляются колонками с этим префиксом, если имя занято признаком
+PARAM_PREFIX = "param_"
+
+# 2: строковые колонки — фиксированной ширины (U), без pickle в npz
+CACHE_VERSION = 2
+
+
+def _fixed_width(values: np.ndarray) -> np.ndarray:
+    """
+    object-колонка (строки старого trade_log.csv, None в параметрах) -> строки U:
+    npz читается с allow_pickle=False. Пропуски — пустая строка.
+    """
+    if values.dtype != object:
+        return values
+    return pd.Series(values).fillna("").astype(str).to_numpy(dtype=str)
+
+
+def run_columns(meta: dict, entry_dir: str) -> dict:
+    """
+    Колонки сделок одного прогона вместе с параметрами (повторенными на каждую сделку).
+
+    Returns:
+        dict | None: {колонка: np.ndarray}, None если у прогона нет лога сделок
+    """
+    columns = read_run_trades(entry_dir)
+    if not columns:
+        return None
+    n = len(next(iter(columns.values())))
+    columns["optim_run_id"] = np.full(n, meta["run_id"])
+    for name, value in meta["params"].items():
+        column = PARAM_PREFIX + name if name in columns else name
+        columns[column] = np.full(n, value)
+    return {name: _fixed_width(values) for name, values in columns.items()}
+
+
+def cached_run_columns(meta: dict, cache: RunCache, analytics_dir: str = ANALYTICS_DIR) -> dict:
+    """run_columns с кэшем в analytics_dir/<key>.npz (актуальность — по RunCache.entry_mtime)"""
+    path = os.path.join(analytics_dir, meta["key"] + ".npz")
+    mtime = cache.entry_mtime(meta["key"])
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as npz:
+            if int(npz["_version"]) == CACHE_VERSION and int(npz["_source_mtime_ns"]) == mtime:
+                return {name: npz[name] for name in npz.files if not name.startswith("_")}
+
+    columns = run_columns(meta, cache.entry_dir(meta["key"]))
+    if columns is None:
+        return None
+    os.makedirs(analytics_dir, exist_ok=True)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, _version=CACHE_VERSION, _source_mtime_ns=mtime, **columns)
+    os.replace(tmp_path, path)
+    return columns
+
+
+def _missing(sample: np.ndarray, size: int) -> np.ndarray:
+    """Заполнитель колонки, которой нет у прогона: "" / NaT / NaN по типу колонки"""
+    if sample.dtype.kind in "US":
+        return np.full(size, "", dtype=sample.dtype)
+    if sample.dtype.kind == "M":
+        return np.full(size, np.datetime64("NaT"), dtype=sample.dtype)
+    return np.full(size, np.nan)
+
+
+def load_trade_table(cache: RunCache = None, analytics_dir: str = ANALYTICS_DIR) -> pd.DataFrame:
+    """
+    Сделки всех завершенных прогонов одной таблицей.
+
+    Returns:
+        pd.DataFrame: строка на сделку; признаки, параметры, optim_run_id
+    """
+    cache = cache or RunCache()
+    runs = []
+    for meta in cache.completed():
+        columns = cached_run_columns(meta, cache, analytics_dir)
+        if columns:
+            runs.append(columns)
+    if not runs:
+        return pd.DataFrame()
+
+    # Параметры разных версий стратегии могут различаться — отсутствующие заполняем NaN
+    names = []
+    for columns in runs:
+        names.extend(name for name in columns if name not in names)
+    sizes = [len(columns["optim_run_id"]) for columns in runs]
+
+    data = {}
+    for name in names:
+        sample = next(columns[name] for columns in runs if name in columns)
+        parts = [columns[name] if name in columns else _missing(sample, size)
+                 for columns, size in zip(runs, sizes)]
+        values = np.concatenate(parts)
+        data[name] = pd.Categorical(values) if name in CATEGORICAL else values
+    return pd.DataFrame(data)
+
+
+def group_stats(df: pd.DataFrame, by: list, min_trades: int = 1) -> pd.DataFrame:
+    """
+    Статистика сделок по группам.
+
+    Args:
+        df: Таблица из load_trade_table
+        by: Колонки группировки (признаки и/или параметры)
+        min_trades: Не показывать группы с меньшим числом сделок
+
+    Returns:
+        pd.DataFrame: trades, runs, mean_R, median_R, win_rate, profit_factor,
+            total_pnl, avg_holding_hours — по группам, по убыванию mean_R
+    """
+    if df.empty:
+        return pd.DataFrame()
+
+    pnl = df["pnl"].to_numpy(dtype=float)
+    frame = pd.DataFrame({
+        "R": df["R"].to_numpy(dtype=float),
+        "win": (df["R"].to_numpy(dtype=float) > 0).astype(float),
+        "gross_profit": np.where(pnl > 0, pnl, 0.0),
+        "gross_loss": np.where(pnl < 0, -pnl, 0.0),
+        "pnl": pnl,
+        "holding_hours": df["holding_hours"].to_numpy(dtype=float),
+        "optim_run_id": df["optim_run_id"],
+    })
+    for name in by:
+        frame[name] = df[name]
+
+    grouped = frame.groupby(by, observed=True, sort=False)
+    stats = grouped.agg(
+        trades=("R", "size"),
+        runs=("optim_run_id", "nunique"),
+        mean_R=("R", "mean"),
+        median_R=("R", "median"),
+        win_rate=("win", "mean"),
+        gross_profit=("gross_profit", "sum"),
+        gross_loss=("gross_loss", "sum"),
+        total_pnl=("pnl", "sum"),
+        avg_holding_hours=("holding_hours", "mean"),
+    )
+    stats["profit_factor"] = (stats["gross_profit"] / stats["gross_loss"].replace(0, np.nan)).fillna(np.inf)
+    stats = stats.drop(columns=["gross_profit", "gross_loss"])
+    stats = stats[stats["trades"] >= min_trades]
+    return stats.sort_values("mean_R", ascending=False, kind="mergesort").reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Аналитика сделок по всем прогонам оптимизатора")
+    parser.add_argument("--by", action="append", required=True,
+                        help="Колонка группировки (признак или параметр), можно несколько")
+    parser.add_argument("--min-trades", type=int, default=30, help="Минимум сделок в группе")
+    parser.add_argument("--top", type=int, default=50, help="Сколько групп вывести")
+    parser.add_argument("--csv", default=None, help="Сохранить результат в CSV")
+    args = parser.parse_args(argv)
+
+    df = load_trade_table()
+    if df.empty:
+        print("Нет прогонов со сделками в кэше")
+        return 1
+
+    missing = [name for name in args.by if name not in df.columns]
+    if missing:
+        print(f"Нет колонок: {', '.join(missing)}. Доступны: {', '.join(df.columns)}")
+        return 1
+
+    print(f"Сделок: {len(df)}, прогонов: {df['optim_run_id'].nunique()}")
+    stats = group_stats(df, args.by, args.min_trades)
+
+    pd.set_option("display.width", None)
+    print(stats.head(args.top).to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    if args.csv:
+        stats.to_csv(args.csv, index=False)
+        print(f"\nСохранено в {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Walk-forward оптимизация на быстром бэктестере.
+
+История режется на скользящие окна in-sample / out-of-sample. На каждом IS-окне
+выбирается лучшая по score конфигурация сетки (при равном score — по cagr, как
+в successive halving), она же прогоняется на следующем OOS-окне. Окна, где ни
+одна конфигурация не прошла отсечки score, помечаются is_valid = False. OOS-отрезки склеиваются в одну кривую equity и одну строку метрик,
+которая ранжируется тем же filter_and_rank, что и обычные прогоны.
+Окна независимы и считаются параллельно по процессам.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from collect_results import load_walk_forward_results
+from fast_backtest import (
+    END_DATE, INITIAL_CASH, START_DATE, compute_metrics, load_market_data, run_batch
+)
+from generate_runs import generate_runs
+from paths import WALK_FORWARD_DIR
+from rank_results import filter_and_rank
+from successive_halving import rank_rung
+from tpe_search import WORST_SCORE
+
+
+def walk_forward_windows(start: datetime, end: datetime, is_days: int, oos_days: int,
+                         step_days: int = None) -> list:
+    """
+    Скользящие окна (даты включительно, как SetStartDate / SetEndDate).
+
+    Args:
+        start, end: весь период
+        is_days: длина in-sample окна в днях
+        oos_days: длина out-of-sample окна в днях
+        step_days: сдвиг между окнами (по умолчанию = oos_days, OOS идут встык)
+
+    Returns:
+        list: [(is_start, is_end, oos_start, oos_end), ...]
+    """
+    step = timedelta(days=step_days or oos_days)
+    windows = []
+    is_start = start
+    while True:
+        is_end = is_start + timedelta(days=is_days - 1)
+        oos_start = is_end + timedelta(days=1)
+        if oos_start > end:
+            break
+        oos_end = min(oos_start + timedelta(days=oos_days - 1), end)
+        windows.append((is_start, is_end, oos_start, oos_end))
+        is_start += step
+    return windows
+
+
+# ===== WORKER =====
+
+_market = None
+
+
+def _init_worker(bars_path, funding_path):
+    global _market
+    _market = load_market_data(bars_path, funding_path)
+
+
+def optimize_window(market, window, runs: list) -> dict:
+    """
+    Оптимизирует одно IS-окно и проверяет победителя на OOS.
+
+    Returns:
+        dict: выбранный run_id и параметры, IS/OOS score, OOS сделки и дневной equity
+    """
+    is_start, is_end, oos_start, oos_end = window
+    is_metrics, _ = run_batch(market, [params for _, params in runs], is_start, is_end)
+    is_metrics["optim_run_id"] = [run_id for run_id, _ in runs]
+    # Если все конфигурации отсечены (score = -999), победителя выбирает cagr, а не run_id
+    run_id, params = rank_rung(runs, is_metrics)[0]
+    best = is_metrics.index[is_metrics["optim_run_id"] == run_id][0]
+    is_score = float(is_metrics.at[best, "score"])
+
+    oos_metrics, oos_trades, oos_equity = run_batch(
+        market, [params], oos_start, oos_end, with_equity=True
+    )
+    return {
+        "window": window,
+        "run_id": run_id,
+        "params": params,
+        "is_score": is_score,
+        "is_valid": is_score > WORST_SCORE,
+        "oos_metrics": oos_metrics.iloc[0].to_dict(),
+        "oos_trades": oos_trades,
+        "oos_equity": oos_equity[0],
+    }
+
+
+def _optimize_window_worker(args):
+    index, window, runs = args
+    return index, optimize_window(_market, window, runs)
+
+
+# ===== STITCHING =====
+
+def stitch_equity(results: list, initial_cash: float = INITIAL_CASH) -> pd.Series:
+    """
+    Склеивает дневной equity OOS-окон в одну кривую: доходности каждого окна
+    применяются к капиталу на конце предыдущего.
+    """
+    segments = []
+    capital = initial_cash
+    for i, result in enumerate(results):
+        equity = result["oos_equity"]
+        curve = capital * equity / equity.iloc[0]
+        # Стартовая точка окна совпадает с концом предыдущего
+        segments.append(curve if i == 0 else curve.iloc[1:])
+        capital = curve.iloc[-1]
+    return pd.concat(segments)
+
+
+def combine_results(results: list, label: dict, initial_cash: float = INITIAL_CASH):
+    """
+    Строка метрик по склеенному OOS.
+
+    Returns:
+        tuple: (DataFrame из одной строки метрик, DataFrame OOS-сделок, Series equity)
+    """
+    equity = stitch_equity(results, initial_cash)
+    trades = pd.concat([r["oos_trades"] for r in results], ignore_index=True)
+    trades["config"] = 0
+
+    start = results[0]["window"][2]
+    end = results[-1]["window"][3]
+    metrics = compute_metrics([label], trades, equity.values[:, None], initial_cash, start, end)
+    return metrics, trades, equity
+
+
+def windows_frame(results: list) -> pd.DataFrame:
+    rows = []
+    for r in results:
+        is_start, is_end, oos_start, oos_end = r["window"]
+        row = {
+            "is_start": is_start.date(),
+            "is_end": is_end.date(),
+            "oos_start": oos_start.date(),
+            "oos_end": oos_end.date(),
+            "run_id": r["run_id"],
+            "is_score": r["is_score"],
+            "is_valid": r["is_valid"],
+            "oos_score": r["oos_metrics"]["score"],
+            "oos_cagr": r["oos_metrics"]["cagr"],
+            "oos_trades": r["oos_metrics"]["total_trades"],
+        }
+        row.update(r["params"])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def run_walk_forward(runs: list, windows: list, processes: int = 1,
+                     bars_path: str = None, funding_path: str = None) -> list:
+    """
+    Оптимизирует все окна (параллельно при processes > 1).
+
+    Returns:
+        list: результаты optimize_window в порядке окон
+    """
+    if processes <= 1:
+        market = load_market_data(bars_path, funding_path)
+        return [optimize_window(market, window, runs) for window in windows]
+
+    tasks = [(i, window, runs) for i, window in enumerate(windows)]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(bars_path, funding_path)) as pool:
+        results = sorted(pool.map(_optimize_window_worker, tasks), key=lambda r: r[0])
+    return [result for _, result in results]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward оптимизация")
+    parser.add_argument("--start", default=START_DATE.strftime("%Y-%m-%d"), help="Начало истории YYYY-MM-DD")
+    parser.add_argument("--end", default=END_DATE.strftime("%Y-%m-%d"), help="Конец истории YYYY-MM-DD")
+    parser.add_argument("--is-days", type=int, default=180, help="Длина in-sample окна")
+    parser.add_argument("--oos-days", type=int, default=60, help="Длина out-of-sample окна")
+    parser.add_argument("--step-days", type=int, default=None, help="Сдвиг окон (по умолчанию = OOS)")
+    parser.add_argument("--processes", "-p", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    end = datetime.strptime(args.end, "%Y-%m-%d")
+    windows = walk_forward_windows(start, end, args.is_days, args.oos_days, args.step_days)
+    if not windows:
+        print("Период слишком короткий для заданных окон")
+        return
+
+    runs = generate_runs()
+    print(f"Walk-forward: {len(windows)} окон x {len(runs)} конфигураций, процессов: {args.processes}")
+    results = run_walk_forward(runs, windows, args.processes)
+
+    tag = f"wf_{args.is_days}_{args.oos_days}_{start:%Y%m%d}_{end:%Y%m%d}"
+    label = {
+        "run_id": tag,
+        "wf_windows": len(windows),
+        "wf_is_days": args.is_days,
+        "wf_oos_days": args.oos_days,
+    }
+    metrics, trades, equity = combine_results(results, label)
+    windows_df = windows_frame(results)
+
+    out_dir = os.path.join(WALK_FORWARD_DIR, tag)
+    os.makedirs(out_dir, exist_ok=True)
+    metrics.to_csv(os.path.join(out_dir, "run_metrics.csv"), index=False)
+    windows_df.to_csv(os.path.join(out_dir, "windows.csv"), index=False)
+    trades.drop(columns="config").to_csv(os.path.join(out_dir, "trade_log.csv"), index=False)
+    equity.rename("equity").to_csv(os.path.join(out_dir, "equity.csv"), index_label="date")
+
+    print(windows_df[["oos_start", "oos_end", "run_id", "is_score", "is_valid", "oos_score", "oos_trades"]]
+          .to_string(index=False))
+    invalid = int((~windows_df["is_valid"]).sum())
+    if invalid:
+        print(f"\nОкон без конфигурации, прошедшей отсечки на IS: {invalid} — победитель выбран по cagr")
+    row = metrics.iloc[0]
+    print(f"\nOOS: cagr={row['cagr']:.3f}, max_dd={row['max_drawdown_pct']:.3f}, "
+          f"trades={row['total_trades']}, score={row['score']}")
+    print(f"Результаты сохранены в: {out_dir}")
+
+    ranked = filter_and_rank(load_walk_forward_results())
+    print(f"\nWalk-forward конфигураций после фильтрации: {len(ranked)}")
+    if not ranked.empty:
+        print(ranked[["run_id", "score", "cagr", "max_drawdown_pct", "total_trades"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
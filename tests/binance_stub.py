@@ -0,0 +1,95 @@
+"""
+Локальная заглушка Binance API для тестов загрузчиков (--base-url / base_url).
+
+Отдает свечи GET /api/v3/klines из списка klines и историю funding
+GET /fapi/v1/fundingRate из funding (символ -> точки) по startTime / endTime /
+limit, как биржа. Перед ответом берет очередную ошибку из failures (код, заголовки) —
+так проверяются повторы на 429/5xx. Все запросы пишутся в requests.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+from urllib.parse import parse_qs, urlparse
+
+KLINES_PATH = "/api/v3/klines"
+FUNDING_PATH = "/fapi/v1/fundingRate"
+
+
+def make_kline(open_ms: int, interval_ms: int) -> list:
+    """Свеча в формате ответа Binance; цены — детерминированные от времени"""
+    price = 40000 + (open_ms // interval_ms) % 1000
+    return [open_ms, f"{price:.2f}", f"{price + 5:.2f}", f"{price - 5:.2f}", f"{price + 1:.2f}",
+            f"{(open_ms // interval_ms) % 97 + 0.5:.8f}", open_ms + interval_ms - 1, "0", 10, "0", "0", "0"]
+
+
+class BinanceStub:
+    def __init__(self):
+        self.klines = []
+        self.funding = {}
+        self.failures = []
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _respond(self, path: str, params: dict):
+        """(код, заголовки, тело)"""
+        with self._lock:
+            self.requests.append((path, params))
+            if self.failures:
+                status, headers = self.failures.pop(0)
+                return status, headers, {"code": -1, "msg": "stub failure"}
+        if path == KLINES_PATH:
+            return 200, {"X-MBX-USED-WEIGHT-1M": "2"}, self._klines(params)
+        if path == FUNDING_PATH:
+            return 200, {}, self._funding(params)
+        return 404, {}, {"code": -1, "msg": "unknown path"}
+
+    def _klines(self, params: dict) -> list:
+        start = int(params.get("startTime", 0))
+        end = int(params.get("endTime", 2 ** 63))
+        limit = int(params.get("limit", 500))
+        return [row for row in self.klines if start <= row[0] <= end][:limit]
+
+    def _funding(self, params: dict) -> list:
+        start = int(params.get("startTime", 0))
+        end = int(params.get("endTime", 2 ** 63))
+        limit = int(params.get("limit", 100))
+        points = self.funding.get(params.get("symbol"), [])
+        return [item for item in points if start <= item["fundingTime"] <= end][:limit]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                status, headers, body = stub._respond(url.path, params)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
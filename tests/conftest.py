@@ -0,0 +1,35 @@
+"""
+Тесты запускаются из корня проекта: python -m pytest -q
+
+Скрипты optim/ и модули стратегии импортируются плоско, как в самих
+скриптах (sys.path.insert папки optim) — здесь те же пути.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (ROOT, os.path.join(ROOT, "optim"), os.path.join(ROOT, "DonchianWithFunding")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from binance_stub import BinanceStub
+
+
+@pytest.fixture
+def binance_stub():
+    stub = BinanceStub().start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Паузы повторов не ждутся, а записываются"""
+    calls = []
+    monkeypatch.setattr(time, "sleep", calls.append)
+    return calls
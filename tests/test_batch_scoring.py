@@ -0,0 +1,73 @@
+"""
+Паритет batch_scoring.score_table (профиль default) с построчным
+ScoringStrategy.score_strategy: verify считает строки с расхождением.
+"""
+
+import numpy as np
+import pandas as pd
+
+from batch_scoring import verify
+
+COLUMNS = ["cagr", "max_drawdown_pct", "sharpe", "calmar", "profit_factor", "total_trades",
+           "Expectancy", "Average Holding Time"]
+
+
+def random_metrics(count: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "cagr": rng.uniform(-0.5, 1.0, count),
+        "max_drawdown_pct": rng.uniform(-0.6, 0.6, count),
+        "sharpe": rng.normal(1.0, 1.5, count),
+        "calmar": rng.normal(1.0, 2.0, count),
+        "profit_factor": rng.uniform(0.0, 4.0, count),
+        "total_trades": rng.integers(0, 200, count).astype(float),
+        "Expectancy": rng.normal(0.1, 0.5, count),
+        "Average Holding Time": rng.uniform(0, 500, count),
+    })
+    # Пропуски в каждой колонке, в том числе в total_trades (int(NaN) падает построчно)
+    for column in COLUMNS:
+        df.loc[rng.random(count) < 0.05, column] = np.nan
+    return df
+
+
+def neutral(count: int) -> dict:
+    """Строка, в которой все слагаемые score нулевые: отсечки проходит, score = 0"""
+    return {"cagr": [0.0] * count, "max_drawdown_pct": [0.0] * count, "sharpe": [0.0] * count,
+            "calmar": [0.0] * count, "profit_factor": [1.0] * count, "total_trades": [100.0] * count,
+            "Expectancy": [0.0] * count, "Average Holding Time": [0.0] * count}
+
+
+def boundary_metrics() -> pd.DataFrame:
+    trades = [29.0, 29.9, 30.0, 30.5, 31.0]
+    drawdowns = [0.35, -0.35, 0.3500001, -0.36, 0.36, 0.0]
+    count = len(trades) + len(drawdowns)
+    df = pd.DataFrame(neutral(count)).assign(cagr=0.2, calmar=1.1, sharpe=0.9)
+    df.loc[:len(trades) - 1, "total_trades"] = trades
+    df.loc[len(trades):, "max_drawdown_pct"] = drawdowns
+    return df
+
+
+def rounding_ties(count: int, seed: int = 1) -> pd.DataFrame:
+    # Остальные слагаемые нулевые, score = 2 * (calmar / 2) — точно calmar с пятеркой в 4-м знаке
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(neutral(count))
+    df["calmar"] = rng.integers(0, 2999, count) / 1000 + 0.0005
+    return df
+
+
+def test_random_table_matches_row_by_row():
+    assert verify(random_metrics(3000)) == 0
+
+
+def test_cutoff_boundaries():
+    assert verify(boundary_metrics()) == 0
+
+
+def test_rounding_ties():
+    assert verify(rounding_ties(2000)) == 0
+
+
+def test_missing_columns_use_defaults():
+    df = pd.concat([random_metrics(1000, seed=2), boundary_metrics(), rounding_ties(500)], ignore_index=True)
+
+    assert verify(df.drop(columns=["Expectancy", "Average Holding Time"])) == 0
@@ -0,0 +1,147 @@
+import os
+import time
+
+import pytest
+import requests
+
+import download_data_from_binance as binance
+from binance_stub import make_kline
+
+HOUR_MS = binance.INTERVAL_MS["1h"]
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    # Страница в 10 свечей: несколько страниц на кусок уже на сотне свечей
+    monkeypatch.setattr(binance, "KLINES_LIMIT", 10)
+
+
+def hourly(start: str, hours: int) -> list:
+    start_ms = binance.to_ms(start)
+    return [make_kline(start_ms + i * HOUR_MS, HOUR_MS) for i in range(hours)]
+
+
+def expected_lines(klines: list) -> list:
+    return [binance.HEADER] + [binance.format_row(row) for row in klines]
+
+
+def read_lines(path) -> list:
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_initial_download_then_incremental_append(binance_stub, tmp_path):
+    binance_stub.klines = hourly("2024-01-01", 120)
+    output = tmp_path / "BTCUSDT_Binance_1h.csv"
+
+    added = binance.download_klines("BTCUSDT", "1h", binance.to_ms("2024-01-01"),
+                                    binance.to_ms("2024-01-03 23:00"), str(output), workers=3,
+                                    base_url=binance_stub.base_url)
+    assert added == 72
+    assert read_lines(output) == expected_lines(binance_stub.klines[:72])
+
+    binance_stub.requests.clear()
+    added = binance.download_klines("BTCUSDT", "1h", binance.to_ms("2024-01-01"),
+                                    binance.to_ms("2024-01-05 23:00"), str(output), workers=2,
+                                    base_url=binance_stub.base_url)
+    assert added == 48
+    assert read_lines(output) == expected_lines(binance_stub.klines)
+    # Докачка начинается со свечи после последней сохраненной
+    first_start = min(int(params["startTime"]) for _, params in binance_stub.requests)
+    assert first_start == binance_stub.klines[72][0]
+
+
+def test_nothing_new_leaves_file_untouched(binance_stub, tmp_path):
+    binance_stub.klines = hourly("2024-01-01", 24)
+    output = tmp_path / "out.csv"
+    end_ms = binance.to_ms("2024-01-01 23:00")
+    binance.download_klines("BTCUSDT", "1h", binance.to_ms("2024-01-01"), end_ms, str(output),
+                            base_url=binance_stub.base_url)
+    before = output.read_bytes()
+
+    assert binance.download_klines("BTCUSDT", "1h", binance.to_ms("2024-01-01"), end_ms, str(output),
+                                   base_url=binance_stub.base_url) == 0
+    assert output.read_bytes() == before
+
+
+def test_retries_rate_limit_and_server_errors(binance_stub, tmp_path, sleeps):
+    binance_stub.klines = hourly("2024-01-01", 5)
+    binance_stub.failures = [(429, {"Retry-After": "3"}), (503, {}), (418, {"Retry-After": "7"})]
+    output = tmp_path / "out.csv"
+
+    added = binance.download_klines("BTCUSDT", "1h", binance.to_ms("2024-01-01"),
+                                    binance.to_ms("2024-01-01 04:00"), str(output), workers=1,
+                                    base_url=binance_stub.base_url)
+
+    assert added == 5
+    assert read_lines(output) == expected_lines(binance_stub.klines)
+    assert len(binance_stub.requests) == 4
+    # 429/418 — пауза по Retry-After, 5xx — экспоненциальная с джиттером (вторая попытка: 1..2 с)
+    assert sleeps[0] == 3.0
+    assert 1.0 <= sleeps[1] < 2.0
+    assert sleeps[2] == 7.0
+
+
+def test_gives_up_after_retries_and_keeps_file(binance_stub, tmp_path, sleeps):
+    binance_stub.klines = hourly("2024-01-01", 30)
+    output = tmp_path / "out.csv"
+    binance.download_klines("BTCUSDT", "1h", binance.to_ms("2024-01-01"), binance.to_ms("2024-01-01 09:00"),
+                            str(output), base_url=binance_stub.base_url)
+    before = output.read_bytes()
+
+    binance_stub.failures = [(503, {})] * 20
+    with pytest.raises(requests.HTTPError):
+        binance.download_klines("BTCUSDT", "1h", binance.to_ms("2024-01-01"), binance.to_ms("2024-01-02"),
+                                str(output), workers=1, base_url=binance_stub.base_url)
+
+    assert len(sleeps) == 8
+    assert output.read_bytes() == before
+    assert os.listdir(tmp_path) == ["out.csv"]
+
+
+def test_skips_still_open_candle(binance_stub, tmp_path):
+    now_ms = int(time.time() * 1000)
+    if HOUR_MS - now_ms % HOUR_MS < 5000:
+        # Текущая свеча не должна закрыться, пока идет загрузка
+        time.sleep(5)
+        now_ms = int(time.time() * 1000)
+    open_candle = now_ms - now_ms % HOUR_MS
+    start_ms = open_candle - 5 * HOUR_MS
+    binance_stub.klines = [make_kline(start_ms + i * HOUR_MS, HOUR_MS) for i in range(6)]
+    output = tmp_path / "out.csv"
+
+    added = binance.download_klines("BTCUSDT", "1h", start_ms, now_ms + HOUR_MS, str(output),
+                                    base_url=binance_stub.base_url)
+
+    assert added == 5
+    assert read_lines(output) == expected_lines(binance_stub.klines[:5])
+    assert binance.read_last_timestamp(str(output)) == open_candle - HOUR_MS
+
+
+def test_replaces_file_atomically(binance_stub, tmp_path, monkeypatch):
+    binance_stub.klines = hourly("2024-01-01", 20)
+    output = tmp_path / "out.csv"
+    binance.download_klines("BTCUSDT", "1h", binance.to_ms("2024-01-01"), binance.to_ms("2024-01-01 09:00"),
+                            str(output), base_url=binance_stub.base_url)
+
+    replaced = []
+    real_replace = os.replace
+
+    def spy_replace(src, dst):
+        # В момент замены старый файл еще целый, новый дописан полностью рядом с ним
+        assert read_lines(output) == expected_lines(binance_stub.klines[:10])
+        assert read_lines(src) == expected_lines(binance_stub.klines)
+        replaced.append((src, dst))
+        real_replace(src, dst)
+
+    monkeypatch.setattr(binance.os, "replace", spy_replace)
+    binance.download_klines("BTCUSDT", "1h", binance.to_ms("2024-01-01"), binance.to_ms("2024-01-01 19:00"),
+                            str(output), workers=2, base_url=binance_stub.base_url)
+
+    # Одна замена временным файлом из папки рядом с CSV (та же файловая система)
+    assert len(replaced) == 1
+    src, dst = replaced[0]
+    assert dst == str(output)
+    assert os.path.dirname(os.path.dirname(src)) == str(tmp_path)
+    assert read_lines(output) == expected_lines(binance_stub.klines)
+    assert os.listdir(tmp_path) == ["out.csv"]
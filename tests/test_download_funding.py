@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+import download_funding_rates as funding
+from download_data_from_binance import make_session, to_ms
+
+EIGHT_HOURS_MS = 8 * 3600 * 1000
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(funding, "FUNDING_LIMIT", 5)
+
+
+def points(symbol: str, start: str, count: int) -> list:
+    start_ms = to_ms(start)
+    return [{"symbol": symbol, "fundingTime": start_ms + i * EIGHT_HOURS_MS,
+             "fundingRate": f"{0.0001 * (i % 7 - 2):.8f}", "markPrice": "42000.00000000"}
+            for i in range(count)]
+
+
+def update(stub, out_dir, symbol="BTCUSDT", start="2024-01-01", end="2024-02-01") -> int:
+    with make_session(1) as session:
+        return funding.update_symbol(session, symbol, to_ms(start), to_ms(end), str(out_dir), stub.base_url)
+
+
+def test_writes_exact_lines(binance_stub, tmp_path):
+    binance_stub.funding["BTCUSDT"] = points("BTCUSDT", "2024-01-01", 4)
+
+    assert update(binance_stub, tmp_path) == 4
+
+    path = tmp_path / "binance_funding_rate_BTC.csv"
+    assert path.read_text() == (
+        "20240101 000000,-0.00020000\n"
+        "20240101 080000,-0.00010000\n"
+        "20240101 160000,0.00000000\n"
+        "20240102 000000,0.00010000\n"
+    )
+
+
+def test_pages_through_history(binance_stub, tmp_path):
+    binance_stub.funding["BTCUSDT"] = points("BTCUSDT", "2024-01-01", 23)
+
+    assert update(binance_stub, tmp_path) == 23
+
+    starts = [int(params["startTime"]) for _, params in binance_stub.requests]
+    times = [item["fundingTime"] for item in binance_stub.funding["BTCUSDT"]]
+    # Страницы по FUNDING_LIMIT; следующая — с момента после последней точки страницы
+    assert starts == [to_ms("2024-01-01")] + [times[k] + 1 for k in (4, 9, 14, 19)]
+    lines = (tmp_path / "binance_funding_rate_BTC.csv").read_text().splitlines()
+    assert lines == [f"{funding.format_time(item['fundingTime'])},{item['fundingRate']}"
+                     for item in binance_stub.funding["BTCUSDT"]]
+
+
+def test_resumes_after_last_saved_point(binance_stub, tmp_path):
+    history = points("BTCUSDT", "2024-01-01", 12)
+    binance_stub.funding["BTCUSDT"] = history[:7]
+    assert update(binance_stub, tmp_path) == 7
+    path = tmp_path / "binance_funding_rate_BTC.csv"
+    before = path.read_text()
+
+    binance_stub.funding["BTCUSDT"] = history
+    binance_stub.requests.clear()
+    assert update(binance_stub, tmp_path) == 5
+
+    assert int(binance_stub.requests[0][1]["startTime"]) == history[6]["fundingTime"] + 1000
+    text = path.read_text()
+    assert text.startswith(before)
+    assert text.splitlines() == [f"{funding.format_time(item['fundingTime'])},{item['fundingRate']}"
+                                 for item in history]
+    # Нечего докачивать — файл не меняется
+    assert update(binance_stub, tmp_path) == 0
+    assert path.read_text() == text
+
+
+def test_drops_duplicate_moments(binance_stub, tmp_path):
+    history = points("BTCUSDT", "2024-01-01", 8)
+    # Та же выплата повторена и с миллисекундами в fundingTime — в файле один момент
+    repeated = dict(history[3])
+    shifted = dict(history[5], fundingTime=history[5]["fundingTime"] + 7, fundingRate="0.00099999")
+    data = history[:4] + [repeated] + history[4:6] + [shifted] + history[6:]
+    binance_stub.funding["BTCUSDT"] = sorted(data, key=lambda item: item["fundingTime"])
+
+    assert update(binance_stub, tmp_path) == 8
+
+    lines = (tmp_path / "binance_funding_rate_BTC.csv").read_text().splitlines()
+    stamps = [line.split(",")[0] for line in lines]
+    assert stamps == sorted(set(stamps)) and len(stamps) == 8
+    assert lines[5] == f"{funding.format_time(history[5]['fundingTime'])},{history[5]['fundingRate']}"
+
+
+def test_update_all_writes_file_per_symbol(binance_stub, tmp_path, sleeps):
+    binance_stub.funding["BTCUSDT"] = points("BTCUSDT", "2024-01-01", 6)
+    binance_stub.funding["ETHUSDC"] = points("ETHUSDC", "2024-01-01", 3)
+    binance_stub.failures = [(429, {"Retry-After": "1"})]
+
+    results = funding.update_all(["BTCUSDT", "ETHUSDC"], to_ms("2024-01-01"), to_ms("2024-02-01"),
+                                 workers=2, out_dir=str(tmp_path), base_url=binance_stub.base_url)
+
+    assert results == {"BTCUSDT": 6, "ETHUSDC": 3}
+    assert sleeps == [1.0]
+    assert sorted(os.listdir(tmp_path)) == ["binance_funding_rate_BTC.csv", "binance_funding_rate_ETHUSDC.csv"]
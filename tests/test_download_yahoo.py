@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+import threading
+
+import numpy as np
+import pandas as pd
+
+import download_data_from_yahoo as yahoo
+
+HOUR = timedelta(hours=1)
+
+
+class FakeYahoo:
+    """
+    fetch для download: отдает свечи из bars как yfinance — в часовом поясе биржи
+    и с одной свечой до start (ответы соседних кусков перекрываются).
+    """
+
+    def __init__(self, bars: dict, tz: str = "America/New_York"):
+        self.bars = bars
+        self.tz = tz
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, ticker, start, end, interval):
+        with self._lock:
+            self.calls.append((ticker, start, end, interval))
+        df = self.bars[ticker]
+        df = df[(df.index >= pd.Timestamp(start) - HOUR) & (df.index < pd.Timestamp(end))]
+        return df.tz_convert(self.tz)
+
+
+def hourly_bars(start: str, hours: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=hours, freq="h", tz="UTC")
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, hours)), 2)
+    volume = rng.integers(0, 3, hours) * 1000
+    return pd.DataFrame({"Open": close - 0.25, "High": close + 1.0, "Low": close - 1.0, "Close": close,
+                         "Volume": volume, "Dividends": 0.0}, index=index)
+
+
+def expected_lines(df: pd.DataFrame) -> list:
+    return [f"{ts:%Y-%m-%d %H:%M:%S}+00:00,{row.Open!r},{row.High!r},{row.Low!r},{row.Close!r},"
+            f"{row.Volume or 100000}" for ts, row in zip(df.index, df.itertuples())]
+
+
+def read_lines(path) -> list:
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+END = datetime(2024, 3, 1, 10, 30, tzinfo=timezone.utc)
+
+
+def test_initial_fill(tmp_path):
+    bars = {"BTC-USD": hourly_bars("2023-12-01", 24 * 100, seed=1), "SPY": hourly_bars("2024-01-15", 24 * 60, seed=2)}
+    fetch = FakeYahoo(bars)
+
+    added = yahoo.download({"BTC-USD": "btc_1h.csv", "SPY": "spy.csv"}, "1h", end=END,
+                           data_dir=str(tmp_path), workers=3, fetch=fetch)
+
+    # Последняя закрытая свеча к 10:30 — 09:00; история глубже 729 дней не запрашивается
+    for ticker, filename in (("BTC-USD", "btc_1h.csv"), ("SPY", "spy.csv")):
+        stored = bars[ticker][bars[ticker].index <= "2024-03-01 09:00"]
+        assert added[ticker] == len(stored)
+        assert read_lines(tmp_path / filename) == [",".join(yahoo.COLUMNS)] + expected_lines(stored)
+    assert min(start for _, start, _, _ in fetch.calls) == END - timedelta(days=yahoo.HISTORY_DAYS["1h"])
+    assert len(fetch.calls) == 2 * len(yahoo.split_chunks(END - timedelta(days=729), END, "1h"))
+
+
+def test_incremental_merge_appends_only_new_rows(tmp_path):
+    bars = {"BTC-USD": hourly_bars("2023-12-01", 24 * 100, seed=1)}
+    yahoo.download({"BTC-USD": "btc.csv"}, "1h", end=END, data_dir=str(tmp_path), fetch=FakeYahoo(bars))
+    path = tmp_path / "btc.csv"
+    before = path.read_text()
+
+    # Провайдер пересчитал уже сохраненные свечи — история в файле не переписывается
+    revised = bars["BTC-USD"].copy()
+    revised.loc[revised.index <= "2024-03-01 09:00", "Close"] += 1000
+    fetch = FakeYahoo({"BTC-USD": revised})
+    later = END + timedelta(hours=5)
+    added = yahoo.download({"BTC-USD": "btc.csv"}, "1h", end=later, data_dir=str(tmp_path), fetch=fetch)
+
+    assert added == {"BTC-USD": 5}
+    assert fetch.calls == [("BTC-USD", datetime(2024, 3, 1, 10, tzinfo=timezone.utc), later, "1h")]
+    text = path.read_text()
+    assert text.startswith(before)
+    new = revised[(revised.index > "2024-03-01 09:00") & (revised.index <= "2024-03-01 14:00")]
+    assert text[len(before):].splitlines() == expected_lines(new)
+    dates = [line[:19] for line in text.splitlines()[1:]]
+    assert dates == sorted(set(dates))
+
+    assert yahoo.download({"BTC-USD": "btc.csv"}, "1h", end=later, data_dir=str(tmp_path),
+                          fetch=FakeYahoo({"BTC-USD": revised})) == {"BTC-USD": 0}
+    assert path.read_text() == text
+
+
+def test_recovers_from_truncated_last_line(tmp_path):
+    bars = {"BTC-USD": hourly_bars("2024-02-20", 24 * 10, seed=3)}
+    yahoo.download({"BTC-USD": "btc.csv"}, "1h", end=END, data_dir=str(tmp_path), fetch=FakeYahoo(bars))
+    path = tmp_path / "btc.csv"
+    complete = path.read_bytes()
+    # Сбой посреди записи: последняя строка оборвана без \n
+    path.write_bytes(complete[:-20])
+
+    added = yahoo.download({"BTC-USD": "btc.csv"}, "1h", end=END, data_dir=str(tmp_path), fetch=FakeYahoo(bars))
+
+    assert added == {"BTC-USD": 1}
+    assert path.read_bytes() == complete
+
+
+def test_normalize_converts_to_utc_and_drops_duplicates():
+    df = hourly_bars("2024-01-01", 4)
+    doubled = pd.concat([df.iloc[:3], df.iloc[1:]]).tz_convert("Asia/Tokyo")
+
+    out = yahoo.normalize(doubled)
+
+    assert list(out.columns) == yahoo.COLUMNS
+    assert list(out["Date"]) == list(df.index)
+    assert (out["Volume"] > 0).all()
@@ -0,0 +1,104 @@
+"""
+Паритет fast_backtest с алгоритмом DonchianWithFunding на локальном движке
+(local_engine) — по сгенерированным барам и funding: списки сделок должны
+совпадать точно, вплоть до цен стопов.
+"""
+
+from datetime import datetime, timedelta
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import fast_backtest
+import local_engine
+from fast_backtest import py_round
+from TradeSink import read_trade_log
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 9, 30)
+
+CONFIGS = [
+    {},
+    {"dc_entry_len": 14, "dc_exit_len": 7, "atr_period": 10, "breakeven_r": 0.6, "trail_start_r": 1.2,
+     "soft_exit_r": 2.5, "funding_window": 96},
+    {"dc_entry_len": 30, "dc_exit_len": 12, "atr_period": 20, "breakeven_r": 1.1, "trail_start_r": 2.4,
+     "soft_exit_r": 3.5, "funding_window": 240},
+]
+
+TRADE_COLUMNS = ["entry_time", "exit_time", "entry_price", "exit_price", "exit_reason"]
+
+
+@pytest.fixture(scope="module")
+def data_folder(tmp_path_factory):
+    """Папка данных Lean со случайным блужданием цены (с ноября 2023 — под прогрев)"""
+    root = tmp_path_factory.mktemp("Data")
+    rng = np.random.default_rng(1)
+    t0 = datetime(2023, 11, 1)
+    hours = (END - t0).days * 24 + 24
+
+    bars_path = root / "custom" / "Binance" / "BTCUSDT_Binance_1h.csv"
+    bars_path.parent.mkdir(parents=True)
+    price = 40000.0
+    with open(bars_path, "w") as f:
+        f.write("Date,Open,High,Low,Close,Volume\n")
+        for i in range(hours):
+            close = price * np.exp(rng.normal(0.0002, 0.008))
+            high = max(price, close) * (1 + abs(rng.normal(0, 0.003)))
+            low = min(price, close) * (1 - abs(rng.normal(0, 0.003)))
+            f.write(f"{t0 + timedelta(hours=i):%Y-%m-%d %H:%M:%S}+00:00,"
+                    f"{price:.2f},{high:.2f},{low:.2f},{close:.2f},123\n")
+            price = close
+
+    funding_path = root / "custom" / "lean_funding_rates" / "binance_funding_rate_BTC.csv"
+    funding_path.parent.mkdir(parents=True)
+    with open(funding_path, "w") as f:
+        for i in range(0, hours, 8):
+            f.write(f"{t0 + timedelta(hours=i):%Y%m%d %H%M%S},{rng.normal(0.0001, 0.0001):.6f}\n")
+    return root
+
+
+def local_trades(data_folder, tmp_path, params: dict) -> pd.DataFrame:
+    export_path = str(tmp_path / "export")
+    result = local_engine.run_algorithm(
+        "DonchianWithFunding",
+        {**params, "start_date": START.strftime("%Y-%m-%d"), "end_date": END.strftime("%Y-%m-%d"),
+         "export_path": export_path},
+        data_folder=str(data_folder), object_store_root=str(tmp_path / "store"))
+    version = result.runtime_statistics["strategy_version_run"]
+    trades = pd.DataFrame(read_trade_log(os.path.join(export_path, version + ".trades.zip")))
+    trades["entry_time"] = pd.to_datetime(trades["entry_time"])
+    trades["exit_time"] = pd.to_datetime(trades["exit_time"])
+    return trades
+
+
+@pytest.mark.parametrize("config", range(len(CONFIGS)))
+def test_trades_match_strategy(data_folder, tmp_path, config):
+    params = CONFIGS[config]
+    market = fast_backtest.load_market_data(
+        str(data_folder / "custom" / "Binance" / "BTCUSDT_Binance_1h.csv"),
+        str(data_folder / "custom" / "lean_funding_rates" / "binance_funding_rate_BTC.csv"))
+    metrics, fast = fast_backtest.run_batch(market, [params], START, END)
+    lean = local_trades(data_folder, tmp_path, params)
+
+    assert len(lean) > 20
+    pd.testing.assert_frame_equal(
+        lean[TRADE_COLUMNS].reset_index(drop=True),
+        fast[TRADE_COLUMNS].reset_index(drop=True),
+        check_exact=True, check_dtype=False)
+    np.testing.assert_allclose(lean["R"], fast["R"], rtol=0, atol=1e-9)
+
+
+def test_py_round_matches_python_round():
+    rng = np.random.default_rng(3)
+    # Цены с половиной цента в третьем знаке и случайные — как стопы entry - k * ATR
+    values = np.concatenate([
+        np.round(rng.uniform(20000, 120000, 20000), 2) + 0.005,
+        rng.uniform(20000, 120000, 20000),
+        rng.uniform(0, 3, 20000),
+        [np.nan, np.inf, 0.0],
+    ])
+    for decimals in (2, 4):
+        expected = [round(v, decimals) if np.isfinite(v) else v for v in values.tolist()]
+        np.testing.assert_array_equal(py_round(values, decimals), np.array(expected))
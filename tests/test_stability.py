@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from param_space import SEARCH_SPACE
+from stability import K_NEIGHBORS, attach_stability, nearest_neighbors
+
+
+def random_runs(count: int, period: str = "20240101_20260101", seed: int = 0) -> pd.DataFrame:
+    """Случайные точки SEARCH_SPACE (не сетка) со score, плавно падающим от центра диапазона"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"run_id": [f"{period}_{i:06d}" for i in range(count)]})
+    distance = np.zeros(count)
+    for name, (kind, low, high, step) in SEARCH_SPACE.items():
+        values = low + np.round(rng.uniform(0, high - low, count) / step) * step
+        df[name] = values.astype(int) if kind == "int" else values
+        distance += ((values - low) / (high - low) - 0.5) ** 2
+    df["score"] = 3.0 - 4.0 * distance + rng.normal(0, 0.1, count)
+    return df
+
+
+def test_planted_spike_loses_rank():
+    df = random_runs(2000)
+    # Одиночный выброс на краю пространства, среди плохих соседей
+    spike = int(np.argmax(df[list(SEARCH_SPACE)].sub(df[list(SEARCH_SPACE)].mean()).abs().sum(axis=1)))
+    df.loc[spike, "score"] = df["score"].max() + 5.0
+
+    out = attach_stability(df)
+
+    assert (out["nbr_count"] == K_NEIGHBORS).all()
+    score_rank = out["score"].rank(ascending=False)
+    stability_rank = out["stability_score"].rank(ascending=False)
+    assert score_rank[spike] == 1
+    assert stability_rank[spike] > 100
+    # Устойчивые прогоны у центра остаются наверху
+    assert out["score"][stability_rank <= 20].min() > out["score"].quantile(0.9)
+
+
+def test_neighbors_stay_within_period():
+    first = random_runs(300, "20240101_20250101", seed=1)
+    second = random_runs(300, "20250101_20260101", seed=1).assign(score=100.0)
+
+    out = attach_stability(pd.concat([first, second], ignore_index=True))
+
+    alone = attach_stability(first)
+    np.testing.assert_allclose(out["stability_score"][:300], alone["stability_score"])
+    assert (out["nbr_mean"][300:] == 100.0).all()
+
+
+def test_nearest_neighbors_close_to_exact():
+    rng = np.random.default_rng(2)
+    points = np.clip(rng.normal(0.5, 0.1, (3000, 10)) + rng.integers(0, 3, (3000, 1)) * 0.25, 0, 1)
+
+    neighbors = nearest_neighbors(points, 8)
+
+    dist = ((points[:, None] - points[None]) ** 2).sum(axis=2)
+    np.fill_diagonal(dist, np.inf)
+    kth = np.sort(dist, axis=1)[:, 7]
+    assert (neighbors != np.arange(len(points))[:, None]).all()
+    assert all(len(set(row)) == 8 for row in neighbors.tolist())
+    assert (np.take_along_axis(dist, neighbors, axis=1) <= kth[:, None]).mean() > 0.8
@@ -0,0 +1,40 @@
+import json
+import os
+
+import pandas as pd
+
+from run_cache import RunCache
+from trade_analytics import load_trade_table
+
+LEGACY_TRADE_LOG = """entry_time,exit_time,entry_price,exit_price,R,pnl,session,exit_reason
+2024-01-02 10:00:00,2024-01-02 18:00:00,42000.5,42500.0,1.25,499.5,EU,trail
+2024-01-05 02:00:00,2024-01-05 04:00:00,43000.0,42800.0,-0.5,-200.0,ASIA,stop
+2024-01-09 15:00:00,2024-01-10 01:00:00,44000.0,44100.0,0.2,100.0,,soft_exit
+"""
+
+
+def _legacy_cache(tmp_path) -> RunCache:
+    cache = RunCache(str(tmp_path / "cache"), code_digest="code", data_digest="data")
+    entry_dir = tmp_path / "cache" / "k1"
+    entry_dir.mkdir(parents=True)
+    (entry_dir / "trade_log.csv").write_text(LEGACY_TRADE_LOG)
+    meta = {"key": "k1", "run_id": "run_1", "params": {"dc_entry_len": 20, "session": "all", "note": None},
+            "code_digest": "code", "data_digest": "data"}
+    (entry_dir / "meta.json").write_text(json.dumps(meta))
+    return cache
+
+
+def test_legacy_trade_log_reloads_from_npz(tmp_path):
+    cache = _legacy_cache(tmp_path)
+    analytics_dir = str(tmp_path / "analytics")
+
+    first = load_trade_table(cache, analytics_dir)
+    assert os.path.exists(os.path.join(analytics_dir, "k1.npz"))
+    second = load_trade_table(cache, analytics_dir)
+
+    assert len(first) == 3
+    pd.testing.assert_frame_equal(first, second)
+    assert list(second["exit_reason"]) == ["trail", "stop", "soft_exit"]
+    assert list(second["session"]) == ["EU", "ASIA", ""]
+    assert list(second["param_session"]) == ["all"] * 3
+    assert list(second["dc_entry_len"]) == [20] * 3
@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import pandas as pd
+
+import walk_forward
+
+WINDOW = (datetime(2024, 1, 1), datetime(2024, 6, 28), datetime(2024, 6, 29), datetime(2024, 8, 27))
+
+
+def fake_run_batch(is_scores: dict):
+    """run_batch: на IS — score и cagr из is_scores по параметру "id", на OOS — одна строка"""
+    def run_batch(market, params_list, start, end, with_equity=False):
+        if with_equity:
+            metrics = pd.DataFrame([{"score": 1.0, "cagr": 0.1, "total_trades": 40}])
+            return metrics, pd.DataFrame(), [pd.Series([100000.0, 101000.0])]
+        rows = [dict(zip(("score", "cagr"), is_scores[params["id"]])) for params in params_list]
+        return pd.DataFrame(rows), pd.DataFrame()
+    return run_batch
+
+
+def test_rejected_window_picks_winner_by_cagr(monkeypatch):
+    runs = [("a0", {"id": 0}), ("b1", {"id": 1}), ("c2", {"id": 2})]
+    monkeypatch.setattr(walk_forward, "run_batch", fake_run_batch({0: (-999, 0.05), 1: (-999, 0.40), 2: (-999, -0.1)}))
+
+    result = walk_forward.optimize_window(None, WINDOW, runs)
+
+    assert result["run_id"] == "b1"
+    assert result["is_score"] == -999
+    assert not result["is_valid"]
+    assert not walk_forward.windows_frame([result])["is_valid"].iloc[0]
+
+
+def test_best_score_wins(monkeypatch):
+    runs = [("a0", {"id": 0}), ("b1", {"id": 1}), ("c2", {"id": 2})]
+    monkeypatch.setattr(walk_forward, "run_batch", fake_run_batch({0: (-999, 0.9), 1: (2.5, 0.1), 2: (2.5, 0.2)}))
+
+    result = walk_forward.optimize_window(None, WINDOW, runs)
+
+    assert (result["run_id"], result["is_score"], result["is_valid"]) == ("c2", 2.5, True)